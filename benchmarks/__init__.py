@@ -0,0 +1,43 @@
+"""
+History-Friendly Models 的基准测试
+
+scenarios.py 定义各章的固定种子场景（单次模拟、10次重复的多次模拟、小规模敏感性分析），
+run.py 运行这些场景、报告吞吐量、峰值RSS和各阶段耗时，并与 baselines.json 中保存的
+基线比较：
+
+    python -m benchmarks.run
+    python -m benchmarks.run --save-baseline
+
+scaling.py 在对数网格上逐个改变规模参数（企业数、治疗类别数、分子数、买方数、周期数），
+拟合总时间和各阶段的经验复杂度指数：
+
+    python -m benchmarks.scaling -k c5 --factors 1 2 4 8
+
+golden.py 以固定种子运行各章的小场景，将输出文件与 golden/ 中保存的黄金输出比较
+（默认逐字节，可声明数值容差），并检查随机数序列的步数，用于确认优化没有改变结果：
+
+    python -m benchmarks.golden
+    python -m benchmarks.golden --rtol 1e-12
+
+objects.py 比较使用 __slots__ 的智能体类与使用实例字典的对照类的每实例字节数和属性访问时间：
+
+    python -m benchmarks.objects
+
+startup.py 在新的进程中测量各入口模块的冷启动导入时间，并检查没有加载重型依赖：
+
+    python -m benchmarks.startup --budget 0.5
+
+selection.py 在随机生成的小型产业上逐期比较第5章树状数组的项目选择与原始的线性累加实现，
+要求选中的项目和随机数状态完全相同；并比较合并份数的仿制记忆与每份一行的记忆的选择分布：
+
+    python -m benchmarks.selection --cases 200
+
+sa_resume.py 令第4章敏感性分析的一个参数组合出错，检查它在输出中占据自己的一列NaN，
+并且中断后继续的运行与不中断的运行输出相同：
+
+    python -m benchmarks.sa_resume
+
+crn.py 对只相差一个参数的成对场景，比较不使用和使用共同随机数时场景差值在种子之间的方差：
+
+    python -m benchmarks.crn --seeds 12
+"""
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+共同随机数（CRN）模式的方差缩减基准
+
+    python -m benchmarks.crn                  # 第3、4章的成对场景
+    python -m benchmarks.crn -k c4 --seeds 20 --periods 200
+
+每个章节有一对只相差一个参数的场景（第4章：PC企业的进入周期；第3章：PC市场多元化
+的最小阈值）。对每个种子分别运行两个场景的单次模拟，计算各序列在全部周期上的平均值
+之差，并比较不使用和使用共同随机数（模型的 crn 属性）时这些差值在种子之间的方差：
+方差越小，估计场景之间的差异所需的运行次数越少。改变的参数使企业进入的时间或顺序
+不同时（例如多元化企业在微处理器企业之前或之后进入），企业编号不再一一对应，方差
+缩减会小得多，甚至没有。
+"""
+
+import os
+import io
+import re
+import sys
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+
+from benchmarks.scenarios import write_parameters
+from src_py.Chapter3.parameter_file import PERIODS
+
+# 章节 -> (章节目录, 改变的参数, 两个场景的取值)
+PAIRS = {
+    "c4": ("Chapter4", "Entry Period of Firms - PC", ("130", "150")),
+    "c3": ("Chapter3", "Minimum Threshold for Diversification (lambdaDV)", ("2", "8")),
+}
+
+ZERO_VARIANCE = 1e-20
+
+
+def run_pair_member(chapter, value, seed, crn, workdir, periods=None):
+    """
+    运行一对场景中的一个，返回各序列的时间平均值
+
+    Args:
+        chapter: "c3" 或 "c4"
+        value: 改变的参数的取值
+        seed: 随机种子
+        crn: 是否使用共同随机数
+        workdir: 临时目录
+        periods: 周期数（None表示参数文件中的取值）
+
+    Returns:
+        dict: 序列名称 -> 全部周期的平均值
+    """
+    from src_py.cli import load_model_class, set_seed
+    chapter_dir, label, _ = PAIRS[chapter]
+    overrides = {label: value}
+    if periods is not None:
+        overrides[PERIODS] = periods
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = load_model_class(chapter)()
+        model.path_results = workdir
+        model.path_parameters = write_parameters(chapter_dir, os.path.join(workdir, "parameters.txt"), overrides)
+        model.single_text_output = False
+        model.single_panel_formats = ["npz"]
+        model.crn = crn
+        set_seed(model, chapter, seed)
+        model.make_single_simulation(True)
+    with np.load(os.path.join(workdir, "singleSimulation.npz")) as data:
+        return {name: float(np.mean(data[name])) for name in data.files
+                if name != "period" and data[name].ndim == 1}
+
+
+def paired_differences(chapter, seeds, crn, periods=None):
+    """
+    各种子下两个场景的序列平均值之差
+
+    Returns:
+        dict: 序列名称 -> 每个种子一个差值的数组
+    """
+    _, _, (first, second) = PAIRS[chapter]
+    differences = {}
+    for seed in seeds:
+        with tempfile.TemporaryDirectory() as workdir:
+            a = run_pair_member(chapter, first, seed, crn, workdir, periods)
+            b = run_pair_member(chapter, second, seed, crn, workdir, periods)
+        for name in a:
+            differences.setdefault(name, []).append(b[name] - a[name])
+    return {name: np.array(values) for name, values in differences.items()}
+
+
+def report(chapter, independent, common):
+    """打印各序列差值的均值、方差以及方差缩减的倍数"""
+    _, label, (first, second) = PAIRS[chapter]
+    print(f"{chapter}: {label} = {first} -> {second}")
+    print(f"  {'series':<10} {'mean diff (indep/crn)':>25} {'var diff (indep/crn)':>25} {'reduction':>10}")
+    for name in independent:
+        var_indep = independent[name].var(ddof=1)
+        var_crn = common[name].var(ddof=1)
+        # 只差舍入误差的方差视为0（例如两个场景中始终相同的差值）
+        if var_crn <= ZERO_VARIANCE * max(var_indep, 1.0):
+            var_crn = 0.0
+        if var_crn > 0:
+            reduction = f"{var_indep / var_crn:>9.1f}x"
+        else:
+            reduction = f"{'-' if var_indep == 0 else 'inf':>10}"
+        print(f"  {name:<10} {independent[name].mean():>12.4g} / {common[name].mean():<10.4g} "
+              f"{var_indep:>12.4g} / {var_crn:<10.4g} {reduction}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Variance of paired scenario differences with and without "
+                                                 "common random numbers")
+    parser.add_argument("-k", dest="pattern", help="only run chapters matching this regular expression")
+    parser.add_argument("--seeds", type=int, default=12, help="seeds (pairs of runs) per setting")
+    parser.add_argument("--periods", type=int, help="periods per run (default: the parameter file)")
+    args = parser.parse_args(argv)
+
+    seeds = range(1, args.seeds + 1)
+    for chapter in PAIRS:
+        if args.pattern and not re.search(args.pattern, chapter):
+            continue
+        independent = paired_differences(chapter, seeds, False, args.periods)
+        common = paired_differences(chapter, seeds, True, args.periods)
+        report(chapter, independent, common)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
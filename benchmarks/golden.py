@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+黄金输出回归检查
+
+    python -m benchmarks.golden                   # 与 benchmarks/golden/ 中的黄金文件逐字节比较
+    python -m benchmarks.golden --rtol 1e-12      # 不完全相同时，按声明的容差逐个数值比较
+    python -m benchmarks.golden --update          # 重新生成黄金文件（只在有意改变结果时使用）
+    python -m benchmarks.golden --java            # 另外报告单次模拟与 results/ 中Java输出的差异
+
+每个场景以固定种子运行，记录每个输出文件的SHA-256（逐周期的统计都在这些文件中）
+以及各随机数生成器自最近一次设置种子以来的递推步数。黄金文件为 golden/<场景>.json，
+输出内容以gzip保存在 golden/<场景>/ 中，用于定位第一个不同的行和容差比较。
+随机数步数不同说明随机数序列已经偏离，此时即使在容差内也判为失败。
+"""
+
+import os
+import io
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+from benchmarks.scenarios import (ROOT_DIR, SIMULATIONS, ITERATIONS, _run_industry, _run_pharma)
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# 场景名称 -> 运行函数（参数为临时目录）
+CASES = {
+    "c3_single": lambda d: _run_industry("Chapter3", "single", d, {}),
+    "c3_multi3": lambda d: _run_industry("Chapter3", "multi", d, {SIMULATIONS: 3}),
+    "c3_sa2x2": lambda d: _run_industry("Chapter3", "sa", d, {SIMULATIONS: 2, ITERATIONS: 2}),
+    "c4_single": lambda d: _run_industry("Chapter4", "single", d, {}),
+    "c4_multi3": lambda d: _run_industry("Chapter4", "multi", d, {SIMULATIONS: 3}),
+    "c4_sa2x2": lambda d: _run_industry("Chapter4", "sa", d, {SIMULATIONS: 2, ITERATIONS: 2}),
+    "c5_single": lambda d: _run_pharma("single", d, 1),
+    "c5_multi3": lambda d: _run_pharma("multi", d, 3),
+}
+
+# 与Java输出比较的场景 -> (章节, 文件名)
+JAVA_OUTPUTS = {
+    "c3_single": ("Chapter3", "singleSimulation.csv"),
+    "c4_single": ("Chapter4", "singleSimulation.csv"),
+}
+
+# 不属于模拟结果的文件和行
+SKIP_FILES = re.compile(r"^(parameters\.txt|phase_timing\..*)$")
+VOLATILE_LINES = re.compile(r"^Runtime: .*$", re.M)
+FIELD_SEP = re.compile(r"[;,]")
+RNG_NAMES = ("rng", "r", "rand")
+
+
+def run_case(name):
+    """
+    运行一个场景并收集输出
+
+    Args:
+        name: 场景名称
+
+    Returns:
+        tuple: (文件名 -> 文本, 生成器名称 -> 递推步数)
+    """
+    with tempfile.TemporaryDirectory(prefix=f"golden_{name}_") as workdir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            model, _, _ = CASES[name](workdir)
+        outputs = {}
+        for file_name in sorted(os.listdir(workdir)):
+            path = os.path.join(workdir, file_name)
+            if SKIP_FILES.match(file_name) or not os.path.isfile(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                outputs[file_name] = VOLATILE_LINES.sub("Runtime: -", f.read())
+    draws = {rng: getattr(model, rng).draws() for rng in RNG_NAMES if hasattr(getattr(model, rng, None), "draws")}
+    return outputs, draws
+
+
+def digest(text):
+    """文本的SHA-256"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def save_golden(name, outputs, draws):
+    """
+    写入一个场景的黄金文件
+
+    Args:
+        name: 场景名称
+        outputs: 文件名 -> 文本
+        draws: 生成器名称 -> 递推步数
+    """
+    case_dir = os.path.join(GOLDEN_DIR, name)
+    os.makedirs(case_dir, exist_ok=True)
+    for old in os.listdir(case_dir):
+        os.remove(os.path.join(case_dir, old))
+    for file_name, text in outputs.items():
+        # mtime=0 使gzip文件本身也是确定的
+        with gzip.GzipFile(os.path.join(case_dir, file_name + ".gz"), 'wb', mtime=0) as f:
+            f.write(text.encode("utf-8"))
+    record = {"rng_draws": draws,
+              "files": {file_name: {"sha256": digest(text), "lines": text.count("\n")}
+                        for file_name, text in outputs.items()}}
+    with open(os.path.join(GOLDEN_DIR, name + ".json"), 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def load_golden(name):
+    """读取一个场景的黄金记录，不存在时返回None"""
+    try:
+        with open(os.path.join(GOLDEN_DIR, name + ".json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def load_golden_text(name, file_name):
+    """读取黄金输出的文本"""
+    with gzip.open(os.path.join(GOLDEN_DIR, name, file_name + ".gz"), 'rb') as f:
+        return f.read().decode("utf-8")
+
+
+def compare_text(expected, actual, rtol, atol):
+    """
+    逐行逐字段比较两个输出，数值字段按容差比较
+
+    Args:
+        expected: 黄金文本
+        actual: 本次的文本
+        rtol: 相对容差
+        atol: 绝对容差
+
+    Returns:
+        dict: first_line（第一个超出容差的行号，没有时为None）、differing_lines（取值不同的行数）、
+        max_abs（最大绝对差）、max_rel（最大相对差）
+    """
+    expected_lines = expected.splitlines()
+    actual_lines = actual.splitlines()
+    result = {"first_line": None, "differing_lines": 0, "max_abs": 0.0, "max_rel": 0.0}
+    if len(expected_lines) != len(actual_lines):
+        result["first_line"] = min(len(expected_lines), len(actual_lines)) + 1
+    for number, (a, b) in enumerate(zip(expected_lines, actual_lines), start=1):
+        if a == b:
+            continue
+        ok = True
+        changed = False     # 只是数值的写法不同（例如 0 和 0.0）时不计为不同
+        fa, fb = FIELD_SEP.split(a), FIELD_SEP.split(b)
+        if len(fa) != len(fb):
+            ok = False
+            changed = True
+        else:
+            for x, y in zip(fa, fb):
+                if x == y:
+                    continue
+                try:
+                    vx, vy = float(x), float(y)
+                except ValueError:
+                    ok = False
+                    changed = True
+                    continue
+                if vx == vy or (vx != vx and vy != vy):
+                    continue
+                changed = True
+                diff = abs(vx - vy)
+                result["max_abs"] = max(result["max_abs"], diff)
+                if vx != 0:
+                    result["max_rel"] = max(result["max_rel"], diff / abs(vx))
+                if not np.isclose(vy, vx, rtol=rtol, atol=atol, equal_nan=True):
+                    ok = False
+        result["differing_lines"] += changed
+        if not ok and result["first_line"] is None:
+            result["first_line"] = number
+    return result
+
+
+def check_case(name, rtol=None, atol=0.0):
+    """
+    运行一个场景并与黄金文件比较
+
+    Args:
+        name: 场景名称
+        rtol: 相对容差，None表示只接受逐字节相同
+        atol: 绝对容差
+
+    Returns:
+        bool: 是否通过
+    """
+    golden = load_golden(name)
+    if golden is None:
+        print(f"{name}: no golden file, run with --update")
+        return False
+    outputs, draws = run_case(name)
+    passed = True
+
+    if draws != golden["rng_draws"]:
+        print(f"{name}: RNG draws differ: golden {golden['rng_draws']}, now {draws}")
+        passed = False
+
+    for file_name in sorted(set(golden["files"]) | set(outputs)):
+        if file_name not in outputs or file_name not in golden["files"]:
+            print(f"{name}: {file_name} {'missing' if file_name not in outputs else 'not in golden files'}")
+            passed = False
+            continue
+        if digest(outputs[file_name]) == golden["files"][file_name]["sha256"]:
+            continue
+        diff = compare_text(load_golden_text(name, file_name), outputs[file_name],
+                            rtol if rtol is not None else 0.0, atol if rtol is not None else 0.0)
+        within = rtol is not None and diff["first_line"] is None
+        status = "within tolerance" if within else f"differs from line {diff['first_line']}"
+        print(f"{name}: {file_name} {status} ({diff['differing_lines']} lines, "
+              f"max abs {diff['max_abs']:.3g}, max rel {diff['max_rel']:.3g})")
+        passed = passed and within
+
+    if passed:
+        print(f"{name}: ok")
+    return passed
+
+
+def compare_java(name):
+    """
+    报告单次模拟输出与 results/ 中Java输出的差异（仅供参考，不影响结果）
+
+    Args:
+        name: 场景名称（见JAVA_OUTPUTS）
+    """
+    chapter, file_name = JAVA_OUTPUTS[name]
+    with open(os.path.join(ROOT_DIR, "results", chapter, file_name), 'r', encoding='utf-8') as f:
+        java = f.read()
+    outputs, _ = run_case(name)
+    diff = compare_text(java, outputs[file_name], 0.0, 0.0)
+    total = java.count("\n")
+    print(f"{name} vs Java {chapter}/{file_name}: {diff['differing_lines']}/{total} lines differ, "
+          f"first at line {diff['first_line']}, max abs {diff['max_abs']:.3g}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Golden-output regression check for the History-Friendly Models")
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name matches this regular expression")
+    parser.add_argument("--update", action="store_true", help="regenerate the golden files")
+    parser.add_argument("--rtol", type=float, help="accept numeric differences within this relative tolerance")
+    parser.add_argument("--atol", type=float, default=0.0, help="absolute tolerance used together with --rtol")
+    parser.add_argument("--java", action="store_true", help="also report differences from the Java outputs in results/")
+    args = parser.parse_args(argv)
+
+    names = [n for n in CASES if args.pattern is None or re.search(args.pattern, n)]
+    failed = []
+    for name in names:
+        if args.update:
+            outputs, draws = run_case(name)
+            save_golden(name, outputs, draws)
+            print(f"{name}: golden files written ({len(outputs)} outputs, RNG draws {draws})")
+        elif not check_case(name, args.rtol, args.atol):
+            failed.append(name)
+    if args.java:
+        for name in names:
+            if name in JAVA_OUTPUTS:
+                compare_java(name)
+    if failed:
+        print(f"FAILED: {', '.join(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+智能体类的内存和属性访问基准
+
+    python -m benchmarks.objects                  # 全部智能体类
+    python -m benchmarks.objects -k Chapter5      # 只测量名称匹配的类
+    python -m benchmarks.objects --instances 50000
+
+对每个使用 __slots__ 的智能体类，构造一个除 __slots__ 外完全相同的普通（使用实例
+字典的）对照类，把全部属性设为浮点数后比较：
+    - 每个实例占用的字节（tracemalloc测量，属性值本身不计）
+    - 读取和写入一个属性的时间（timeit，取多次中最快的一次）
+"""
+
+import re
+import sys
+import timeit
+import argparse
+import importlib
+import tracemalloc
+
+# 模块 -> 类名（嵌套类用"外部类.内部类"）
+AGENT_CLASSES = {
+    "src_py.Chapter3.firm": ("Firm", "Firm.Trajectory", "Firm.Product"),
+    "src_py.Chapter4.computer_firm": ("ComputerFirm",),
+    "src_py.Chapter4.component_firm": ("ComponentFirm",),
+    "src_py.Chapter4.computer": ("Computer",),
+    "src_py.Chapter4.component": ("Component",),
+    "src_py.Chapter4.sold_component": ("SoldComponent",),
+    "src_py.Chapter4.not_sold_component": ("NotSoldComponent",),
+    "src_py.Chapter4.system_element": ("SystemElement",),
+    "src_py.Chapter4.end_product": ("EndProduct",),
+    "src_py.Chapter5.firm": ("Firm", "Memory", "SearchAction"),
+    "src_py.Chapter5.product": ("Product",),
+    "src_py.Chapter5.molecule": ("Molecule",),
+    "src_py.Chapter5.therapeutic_category": ("SubMarket",),
+}
+
+ACCESS_LOOPS = 200000
+
+
+def load_class(module, qualname):
+    """按模块和限定名称取得类"""
+    obj = importlib.import_module(module)
+    for part in qualname.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+def dict_variant(cls):
+    """
+    构造与 cls 相同但不使用 __slots__ 的对照类
+
+    Args:
+        cls: 使用 __slots__ 的类
+
+    Returns:
+        type: 对照类
+    """
+    slots = set(cls.__slots__)
+    namespace = {name: value for name, value in cls.__dict__.items()
+                 if name not in slots and name not in ("__slots__", "__dict__", "__weakref__")}
+    return type(cls.__name__ + "Dict", cls.__bases__, namespace)
+
+
+def make_instances(cls, slots, count):
+    """不调用构造函数，创建 count 个实例并把每个属性设为一个浮点数"""
+    instances = []
+    for i in range(count):
+        obj = object.__new__(cls)
+        for name in slots:
+            object.__setattr__(obj, name, 0.5)
+        instances.append(obj)
+    return instances
+
+
+def bytes_per_instance(cls, slots, count):
+    """
+    每个实例占用的字节（属性值共享同一个浮点数，不计入）
+
+    Args:
+        cls: 被测量的类
+        slots: 属性名称
+        count: 实例数
+
+    Returns:
+        float: 字节数
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = make_instances(cls, slots, count)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    # 扣除保存实例的列表本身
+    grown -= sys.getsizeof(instances)
+    return grown / count
+
+
+def access_seconds(cls, slots):
+    """
+    读取和写入第一个属性各 ACCESS_LOOPS 次的时间（5次中最快的一次）
+
+    Returns:
+        tuple: (读取秒数, 写入秒数)
+    """
+    obj = make_instances(cls, slots, 1)[0]
+    name = slots[0]
+    read = min(timeit.repeat(f"obj.{name}", globals={"obj": obj}, number=ACCESS_LOOPS, repeat=5))
+    write = min(timeit.repeat(f"obj.{name} = 1.5", globals={"obj": obj}, number=ACCESS_LOOPS, repeat=5))
+    return read, write
+
+
+def measure(module, qualname, count):
+    """
+    比较一个智能体类与其对照类
+
+    Returns:
+        dict: 类名、属性数和两种表示的字节数及访问时间
+    """
+    cls = load_class(module, qualname)
+    slots = tuple(cls.__slots__)
+    plain = dict_variant(cls)
+    slot_read, slot_write = access_seconds(cls, slots)
+    dict_read, dict_write = access_seconds(plain, slots)
+    return {"class": f"{module.split('.')[-2]}.{qualname}", "attributes": len(slots),
+            "slots_bytes": bytes_per_instance(cls, slots, count),
+            "dict_bytes": bytes_per_instance(plain, slots, count),
+            "slots_read_ns": slot_read / ACCESS_LOOPS * 1e9, "dict_read_ns": dict_read / ACCESS_LOOPS * 1e9,
+            "slots_write_ns": slot_write / ACCESS_LOOPS * 1e9, "dict_write_ns": dict_write / ACCESS_LOOPS * 1e9}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare __slots__ agent classes with dict-backed equivalents")
+    parser.add_argument("-k", dest="pattern", help="only measure classes whose name matches this regular expression")
+    parser.add_argument("--instances", type=int, default=20000, help="instances created per class")
+    args = parser.parse_args(argv)
+
+    print(f"{'class':<28} {'attrs':>5} {'bytes (slots/dict)':>20} {'saved':>6} "
+          f"{'read ns (slots/dict)':>21} {'write ns (slots/dict)':>22}")
+    for module, names in AGENT_CLASSES.items():
+        for qualname in names:
+            if args.pattern and not re.search(args.pattern, f"{module}.{qualname}"):
+                continue
+            r = measure(module, qualname, args.instances)
+            saved = 1.0 - r["slots_bytes"] / r["dict_bytes"]
+            print(f"{r['class']:<28} {r['attributes']:>5} {r['slots_bytes']:>9.0f} / {r['dict_bytes']:<8.0f} "
+                  f"{saved:>6.0%} {r['slots_read_ns']:>9.1f} / {r['dict_read_ns']:<9.1f} "
+                  f"{r['slots_write_ns']:>10.1f} / {r['dict_write_ns']:<9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
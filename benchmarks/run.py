@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基准测试运行器
+
+    python -m benchmarks.run                      # 运行全部场景并与保存的基线比较
+    python -m benchmarks.run -k c4                # 只运行名称匹配的场景
+    python -m benchmarks.run --save-baseline      # 运行并把结果保存为新的基线
+    python -m benchmarks.run --repeat 3           # 每个场景运行3次，取最快的一次
+
+每个场景在单独的子进程中运行，因此峰值RSS只反映这个场景。报告每秒周期数、每秒
+重复次数、峰值RSS和各阶段的耗时（来自模型的phase_timer）。墙钟时间或主要阶段
+（占场景时间5%以上且不短于0.05秒）比基线慢超过容差时报告回归，并以退出码1结束。
+基线与机器有关，在新机器上先用 --save-baseline 生成；计时波动较大时使用 --repeat。
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import importlib
+import platform
+import resource
+import tempfile
+import contextlib
+import subprocess
+
+from benchmarks.scenarios import SCENARIOS, ROOT_DIR, scenario_names
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+DEFAULT_TOLERANCE = 0.25
+HOT_PHASE_SHARE = 0.05
+MIN_PHASE_SECONDS = 0.05
+MODEL_MODULES = ("src_py.Chapter3.c3_model", "src_py.Chapter4.c4_model", "src_py.Chapter5.c5_model")
+
+
+def run_scenario(name):
+    """
+    在当前进程中运行一个场景（模型的输出被丢弃）
+
+    Args:
+        name: 场景名称
+
+    Returns:
+        dict: 场景的测量结果
+    """
+    # 模型模块（以及numpy）的导入不计入场景时间
+    for module in MODEL_MODULES:
+        importlib.import_module(module)
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as workdir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            model, periods, replicates = SCENARIOS[name](workdir)
+            seconds = time.perf_counter() - start
+    return {
+        "scenario": name,
+        "seconds": seconds,
+        "periods": periods,
+        "replicates": replicates,
+        "periods_per_second": periods * replicates / seconds,
+        "replicates_per_second": replicates / seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+        "phases": {p["phase"]: p["total_seconds"] for p in model.phase_timer.summary()},
+    }
+
+
+def run_in_subprocess(name):
+    """
+    在新的Python进程中运行一个场景
+
+    Args:
+        name: 场景名称
+
+    Returns:
+        dict: 场景的测量结果，失败时返回None
+    """
+    result = subprocess.run([sys.executable, "-m", "benchmarks.run", "--child", name],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"{name} failed:\n{result.stderr}")
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def load_baselines(path=BASELINE_PATH):
+    """读取保存的基线，文件不存在时返回空字典"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("scenarios", {})
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error reading {path}: {e}")
+        return {}
+
+
+def save_baselines(results, path=BASELINE_PATH):
+    """
+    保存基线（与已有基线合并，只替换本次运行的场景）
+
+    Args:
+        results: 场景名称 -> 测量结果
+        path: 基线文件路径
+    """
+    scenarios = load_baselines(path)
+    scenarios.update(results)
+    data = {"python": platform.python_version(), "machine": platform.machine(),
+            "platform": platform.platform(), "scenarios": scenarios}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def compare(result, baseline, tolerance):
+    """
+    将一次测量与基线比较
+
+    Args:
+        result: 测量结果
+        baseline: 基线结果
+        tolerance: 允许的相对减速（0.25表示慢25%以内不算回归）
+
+    Returns:
+        list: 回归的描述
+    """
+    regressions = []
+    limit = 1.0 + tolerance
+    ratio = result["seconds"] / baseline["seconds"]
+    if ratio > limit:
+        regressions.append(f"total {ratio:.2f}x")
+    for phase, seconds in baseline["phases"].items():
+        if seconds < max(HOT_PHASE_SHARE * baseline["seconds"], MIN_PHASE_SECONDS) or phase not in result["phases"]:
+            continue
+        ratio = result["phases"][phase] / seconds
+        if ratio > limit:
+            regressions.append(f"{phase} {ratio:.2f}x")
+    return regressions
+
+
+def report(result, baseline):
+    """
+    打印一个场景的结果
+
+    Args:
+        result: 测量结果
+        baseline: 基线结果，没有基线时为None
+    """
+    versus = f"  ({result['seconds'] / baseline['seconds']:.2f}x baseline)" if baseline else ""
+    print(f"{result['scenario']}: {result['seconds']:.2f} s{versus}, "
+          f"{result['periods_per_second']:.1f} periods/s, {result['replicates_per_second']:.3f} replicates/s, "
+          f"peak RSS {result['peak_rss_mb']:.1f} MB")
+    for phase, seconds in sorted(result["phases"].items(), key=lambda item: item[1], reverse=True)[:8]:
+        share = seconds / result["seconds"]
+        before = f"  baseline {baseline['phases'][phase]:.3f} s" if baseline and phase in baseline["phases"] else ""
+        print(f"    {phase:<28} {seconds:8.3f} s  {share:6.1%}{before}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the History-Friendly Models")
+    parser.add_argument("-k", dest="pattern", help="only run scenarios whose name matches this regular expression")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario, the fastest one is kept")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="relative slowdown reported as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child)))
+        return 0
+
+    baselines = {} if args.save_baseline else load_baselines()
+    results = {}
+    failed = []
+    for name in scenario_names(args.pattern):
+        runs = [r for r in (run_in_subprocess(name) for _ in range(max(1, args.repeat))) if r is not None]
+        if not runs:
+            failed.append(name)
+            continue
+        result = min(runs, key=lambda r: r["seconds"])
+        result["peak_rss_mb"] = max(r["peak_rss_mb"] for r in runs)
+        results[name] = result
+        baseline = baselines.get(name)
+        report(result, baseline)
+        if baseline:
+            regressions = compare(result, baseline, args.tolerance)
+            if regressions:
+                failed.append(name)
+                print(f"    REGRESSION: {', '.join(regressions)}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    if args.save_baseline:
+        save_baselines(results)
+        print(f"Baselines saved to {BASELINE_PATH}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
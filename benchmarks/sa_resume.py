@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+第4章敏感性分析在参数组合出错和中断恢复时的检查
+
+    python -m benchmarks.sa_resume
+    python -m benchmarks.sa_resume --combinations 8 --fail 3 --stop 6
+
+以较小的规模运行三次敏感性分析：没有出错的对照运行；第 --fail 个组合抛出异常的
+运行；同样出错、并在第 --stop 个组合开始时中断、随后以 resume=True 继续的运行。
+出错的组合在各数据系列中必须是一列NaN，其余各列和 sa_parameters.csv 与对照运行
+相同（组合的种子只取决于组合序号）；中断后继续的运行的输出必须与不中断的运行
+逐字节相同。
+"""
+
+import os
+import io
+import sys
+import argparse
+import tempfile
+import contextlib
+
+from benchmarks.scenarios import write_parameters
+from src_py.Chapter3.parameter_file import PERIODS, SIMULATIONS, ITERATIONS
+
+
+class _Interrupted(BaseException):
+    """模拟进程被中断（不被模型的 except Exception 捕获）"""
+
+
+def run_sa(workdir, combinations, periods, fail=None, stop=None, resume=False):
+    """
+    运行一次敏感性分析，可令某个组合出错或在某个组合开始时中断
+
+    Args:
+        workdir: 结果目录
+        combinations: 参数组合数
+        periods: 周期数
+        fail: 抛出异常的组合序号
+        stop: 中断的组合序号
+        resume: 是否从上次中断处继续
+
+    Returns:
+        bool: 运行是否完成（False表示被中断）
+    """
+    from src_py.Chapter4.c4_model import C4Model
+    model = C4Model()
+    model.path_results = workdir
+    model.path_parameters = write_parameters("Chapter4", os.path.join(workdir, "parameters.txt"),
+                                             {SIMULATIONS: 1, ITERATIONS: combinations, PERIODS: periods})
+    # 每个组合都持久化，中断时已完成的组合全部保留
+    model.sa_fsync_interval = 1
+    base_seed = model.rng_seed
+    make_multiple_simulation = model.make_multiple_simulation
+
+    def failing_multiple_simulation(is_multi, resume=False):
+        # 每个组合的种子为 基础种子 + 1000 + 组合序号
+        counter = model.rng_seed - base_seed - 1000
+        if counter == stop:
+            raise _Interrupted()
+        if counter == fail:
+            raise RuntimeError("injected failure")
+        return make_multiple_simulation(is_multi, resume)
+
+    model.make_multiple_simulation = failing_multiple_simulation
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.make_sensitivity_simulation(False, resume)
+    except _Interrupted:
+        for f in model.sens.writer.files.values():
+            f.close()
+        return False
+    return True
+
+
+def read_outputs(workdir):
+    """结果目录中的敏感性分析输出文件：文件名 -> 内容"""
+    outputs = {}
+    for name in sorted(os.listdir(workdir)):
+        if name.startswith("sa_") and name.endswith(".csv"):
+            with open(os.path.join(workdir, name), 'r', encoding='utf-8') as f:
+                outputs[name] = f.read()
+    return outputs
+
+
+def columns(text):
+    """时间序列文件的各列（每个组合一列，不含首列的时间）"""
+    rows = [line.rstrip(",").split(",")[1:] for line in text.splitlines()[1:]]
+    return [list(column) for column in zip(*rows)]
+
+
+def check(combinations, periods, fail, stop):
+    """
+    Returns:
+        list: 发现的问题（没有问题时为空）
+    """
+    problems = []
+    with tempfile.TemporaryDirectory() as clean_dir, tempfile.TemporaryDirectory() as failed_dir, \
+            tempfile.TemporaryDirectory() as resumed_dir:
+        run_sa(clean_dir, combinations, periods)
+        run_sa(failed_dir, combinations, periods, fail=fail)
+        if run_sa(resumed_dir, combinations, periods, fail=fail, stop=stop):
+            problems.append(f"combination {stop} did not interrupt the run")
+        run_sa(resumed_dir, combinations, periods, fail=fail, resume=True)
+        clean, failed, resumed = (read_outputs(d) for d in (clean_dir, failed_dir, resumed_dir))
+
+    for name in sorted(clean):
+        if name == "sa_parameters.csv":
+            if failed.get(name) != clean[name]:
+                problems.append(f"{name}: parameter rows differ from the run without failures")
+            continue
+        expected = columns(clean[name])
+        actual = columns(failed.get(name, ""))
+        if len(actual) != len(expected):
+            problems.append(f"{name}: {len(actual)} combinations, expected {len(expected)}")
+            continue
+        for k, (a, e) in enumerate(zip(actual, expected), start=1):
+            if k == fail and any(v != "nan" for v in a):
+                problems.append(f"{name}: failed combination {k} is not NaN")
+            elif k != fail and a != e:
+                problems.append(f"{name}: combination {k} differs from the run without failures")
+    for name in sorted(failed):
+        if resumed.get(name) != failed[name]:
+            problems.append(f"{name}: resumed output differs from the uninterrupted run")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that a failed SA combination keeps its row, "
+                                                 "also across an interrupted and resumed run")
+    parser.add_argument("--combinations", type=int, default=6, help="parameter combinations")
+    parser.add_argument("--periods", type=int, default=20, help="periods per run")
+    parser.add_argument("--fail", type=int, default=2, help="combination that raises")
+    parser.add_argument("--stop", type=int, default=4, help="combination at which the run is interrupted")
+    args = parser.parse_args(argv)
+
+    problems = check(args.combinations, args.periods, args.fail, args.stop)
+    for problem in problems:
+        print(problem)
+    print(f"{args.combinations} combinations, failure at {args.fail}, interrupted at {args.stop}: "
+          f"{'ok' if not problems else f'{len(problems)} problems'}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
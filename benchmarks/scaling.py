@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+规模扩展基准
+
+    python -m benchmarks.scaling                       # 全部章节，规模因子 0.5, 1, 2, 4
+    python -m benchmarks.scaling -k c5 --factors 1 2 4 8
+    python -m benchmarks.scaling --out /tmp/scaling    # 报告写入 /tmp/scaling/scaling_report.{csv,json}
+
+每次只改变一个规模参数（其余参数保持基准取值），在对数网格上运行单次模拟，
+用 log(时间) 对 log(规模) 的最小二乘斜率估计总时间和每个阶段的经验复杂度指数：
+指数约为1表示线性，约为2表示二次。指数不低于 SUPERLINEAR 的阶段在报告中标出。
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import numpy as np
+
+from benchmarks.scenarios import run_single, C5_SIZE, PERIODS
+
+SUPERLINEAR = 1.5
+DEFAULT_FACTORS = (0.5, 1, 2, 4)
+MIN_SECONDS = 1e-3      # 短于这个时间的阶段不拟合指数
+
+# 章节 -> 规模参数名称 -> (参数文件的行标签或模型属性, 基准取值)
+SWEEPS = {
+    "c3": ("Chapter3", {
+        "end_time": (PERIODS, 150),
+        "num_of_firm_tr": ("Number of Firms (F) - TR", 6),
+        "num_of_firm_mp": ("Number of Firms (F) - MP", 20),
+        "num_of_potential_buyers": ("Number of Buyers (G)", 2500),
+    }),
+    "c4": ("Chapter4", {
+        "end_time": (PERIODS, 250),
+        "num_of_firm_cmp": ("Number Of Firms (F) - CMP", 12),
+        "num_of_firm_mf": ("Number of Firms (F) - MF", 12),
+        "num_of_firm_pc": ("Number of Firms (F) - PC", 12),
+        "buyers_mf": ("Number of Buyers (G) - MF", 100),
+        "buyers_pc": ("Number of Buyers (G) - PC", 100),
+    }),
+    "c5": ("Chapter5", {name: (name, value) for name, value in C5_SIZE.items()}),
+}
+
+
+def measure(chapter, overrides):
+    """
+    运行一次单次模拟并返回总时间和各阶段时间
+
+    Args:
+        chapter: "Chapter3"、"Chapter4" 或 "Chapter5"
+        overrides: 规模参数
+
+    Returns:
+        dict: {"seconds": 总时间, "phases": 阶段 -> 时间}
+    """
+    with tempfile.TemporaryDirectory(prefix="scaling_") as workdir:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            model, _, _ = run_single(chapter, workdir, overrides)
+            seconds = time.perf_counter() - start
+    return {"seconds": seconds, "phases": {p["phase"]: p["total_seconds"] for p in model.phase_timer.summary()}}
+
+
+def fit_exponent(sizes, seconds):
+    """
+    用 log(时间) = a + k log(规模) 拟合经验复杂度指数k
+
+    Args:
+        sizes: 规模取值
+        seconds: 对应的时间
+
+    Returns:
+        tuple: (指数, R²)，有效点少于两个时返回 (None, None)
+    """
+    points = [(n, t) for n, t in zip(sizes, seconds) if t is not None and t >= MIN_SECONDS]
+    if len(points) < 2 or len({n for n, _ in points}) < 2:
+        return None, None
+    x = np.log([n for n, _ in points])
+    y = np.log([t for _, t in points])
+    slope, intercept = np.polyfit(x, y, 1)
+    residual = y - (slope * x + intercept)
+    total = np.sum((y - y.mean()) ** 2)
+    r2 = 1.0 - np.sum(residual ** 2) / total if total > 0 else 1.0
+    return float(slope), float(r2)
+
+
+def sweep(key, factors):
+    """
+    对某章的每个规模参数运行网格并拟合指数
+
+    Args:
+        key: "c3"、"c4" 或 "c5"
+        factors: 相对于基准取值的规模因子
+
+    Returns:
+        list: 每个规模参数一个字典（parameter、sizes、seconds、phases、fits）
+    """
+    chapter, parameters = SWEEPS[key]
+    results = []
+    for name, (target, base) in parameters.items():
+        sizes = sorted({max(2, int(round(base * f))) for f in factors})
+        runs = []
+        for size in sizes:
+            run = measure(chapter, {target: size})
+            runs.append(run)
+            print(f"  {key} {name}={size}: {run['seconds']:.2f} s", file=sys.stderr)
+
+        phases = sorted({p for run in runs for p in run["phases"]})
+        fits = {"total": fit_exponent(sizes, [run["seconds"] for run in runs])}
+        for phase in phases:
+            fits[phase] = fit_exponent(sizes, [run["phases"].get(phase) for run in runs])
+        results.append({"chapter": key, "parameter": name, "sizes": sizes,
+                        "seconds": [run["seconds"] for run in runs],
+                        "phases": {p: [run["phases"].get(p) for run in runs] for p in phases},
+                        "fits": fits})
+    return results
+
+
+def report(results):
+    """
+    打印各规模参数的指数：总时间以及按最大规模时耗时排列的阶段
+
+    Args:
+        results: sweep 的结果
+    """
+    for result in results:
+        exponent, r2 = result["fits"]["total"]
+        total = f"{exponent:.2f} (R² {r2:.2f})" if exponent is not None else "n/a"
+        print(f"{result['chapter']} {result['parameter']} {result['sizes']}: total exponent {total}")
+        largest = {p: values[-1] or 0.0 for p, values in result["phases"].items()}
+        for phase in sorted(largest, key=largest.get, reverse=True):
+            exponent, r2 = result["fits"][phase]
+            if exponent is None:
+                continue
+            flag = "  superlinear" if exponent >= SUPERLINEAR else ""
+            print(f"    {phase:<28} {exponent:5.2f}  R² {r2:4.2f}  {largest[phase]:8.3f} s{flag}")
+
+
+def write_report(results, out_dir):
+    """
+    写入 scaling_report.json（全部测量值）和 scaling_report.csv（每个参数和阶段的指数）
+
+    Args:
+        results: sweep 的结果
+        out_dir: 输出目录
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "scaling_report.json"), 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    lines = ["chapter,parameter,phase,exponent,r2,sizes\n"]
+    for result in results:
+        sizes = " ".join(map(str, result["sizes"]))
+        for phase, (exponent, r2) in result["fits"].items():
+            if exponent is not None:
+                lines.append(f"{result['chapter']},{result['parameter']},{phase},{exponent:.4f},{r2:.4f},{sizes}\n")
+    with open(os.path.join(out_dir, "scaling_report.csv"), 'w', encoding='utf-8') as f:
+        f.write("".join(lines))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit empirical complexity exponents of the History-Friendly Models")
+    parser.add_argument("-k", dest="chapters", nargs="+", choices=sorted(SWEEPS), default=sorted(SWEEPS),
+                        help="chapters to sweep")
+    parser.add_argument("-p", dest="parameters", nargs="+", help="only sweep these size parameters")
+    parser.add_argument("--factors", type=float, nargs="+", default=list(DEFAULT_FACTORS),
+                        help="size multipliers relative to the base values")
+    parser.add_argument("--out", default=".", help="directory for scaling_report.csv and scaling_report.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    for key in args.chapters:
+        if args.parameters:
+            chapter, parameters = SWEEPS[key]
+            selected = {n: v for n, v in parameters.items() if n in args.parameters}
+            if not selected:
+                continue
+            SWEEPS[key] = (chapter, selected)
+        results.extend(sweep(key, args.factors))
+    report(results)
+    write_report(results, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+基准测试场景
+
+每个场景用固定的随机种子运行一个章节模型，结果写入临时目录，返回运行的周期数和
+重复次数。第3、4章的运行次数和周期数通过改写参数文件中的相应行设置（模型在每次
+运行前都会重新读取参数文件）；第5章的规模通过模型属性设置。第5章模型没有敏感性分析。
+"""
+
+import os
+import re
+
+from src_py.Chapter3.parameter_file import PERIODS, SIMULATIONS, ITERATIONS, write_parameter_file
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 第5章场景的规模（默认参数下单次运行约需数十秒，基准测试使用较小的规模）
+C5_SIZE = {"end_time": 50, "num_of_tc": 60, "num_of_firm": 20, "num_of_mol": 100}
+
+
+def write_parameters(chapter, path, overrides):
+    """
+    复制某章的参数文件，并替换 overrides 中给出的行
+
+    Args:
+        chapter: "Chapter3" 或 "Chapter4"
+        path: 新参数文件的路径
+        overrides: 字典，行标签 -> 新的取值
+
+    Returns:
+        str: 新参数文件的路径
+    """
+    return write_parameter_file(os.path.join(ROOT_DIR, "parameters", chapter, "parameters.txt"), path, overrides)
+
+
+def run_single(chapter, workdir, overrides=None):
+    """
+    以给定的规模运行一次单次模拟（用于规模扩展基准）
+
+    Args:
+        chapter: "Chapter3"、"Chapter4" 或 "Chapter5"
+        workdir: 临时目录
+        overrides: 第3、4章为参数文件的行标签 -> 取值，第5章为模型属性 -> 取值
+
+    Returns:
+        tuple: (模型, 周期数, 重复次数)
+    """
+    if chapter == "Chapter5":
+        return _run_pharma("single", workdir, 1, overrides)
+    return _run_industry(chapter, "single", workdir, overrides or {})
+
+
+def _chapter_model(chapter):
+    if chapter == "Chapter3":
+        from src_py.Chapter3.c3_model import C3Model
+        return C3Model
+    from src_py.Chapter4.c4_model import C4Model
+    return C4Model
+
+
+def _run_industry(chapter, mode, workdir, overrides):
+    """
+    运行第3或第4章模型
+
+    Args:
+        chapter: "Chapter3" 或 "Chapter4"
+        mode: "single"、"multi" 或 "sa"
+        workdir: 参数文件和结果使用的临时目录
+        overrides: 参数文件中需要替换的行
+
+    Returns:
+        tuple: (模型, 周期数, 重复次数)
+    """
+    model = _chapter_model(chapter)()
+    model.path_results = workdir
+    model.path_parameters = write_parameters(chapter, os.path.join(workdir, "parameters.txt"), overrides)
+    model.phase_timer.enable()
+    if mode == "single":
+        model.make_single_simulation(True)
+        replicates = 1
+    elif mode == "multi":
+        model.make_multiple_simulation(True)
+        replicates = model.multi_time
+    else:
+        model.make_sensitivity_simulation(False)
+        replicates = model.multi_time * model.multi_sens
+    return model, model.end_time, replicates
+
+
+def _run_pharma(mode, workdir, multi_time, size=None):
+    """
+    运行第5章模型
+
+    Args:
+        mode: "single" 或 "multi"
+        workdir: 结果目录
+        multi_time: 多次模拟的运行次数
+        size: 覆盖C5_SIZE中部分取值的字典
+
+    Returns:
+        tuple: (模型, 周期数, 重复次数)
+    """
+    from src_py.Chapter5.c5_model import C5Model
+    model = C5Model()
+    model.path_results = workdir
+    for name, value in dict(C5_SIZE, **(size or {})).items():
+        setattr(model, name, value)
+    model.phase_timer.enable()
+    if mode == "single":
+        model.make_single_simulation()
+        return model, model.end_time, 1
+    model.mt = multi_time
+    model.make_multiple_simulation()
+    return model, model.end_time, model.mt
+
+
+# 场景名称 -> 运行函数（参数为临时目录）
+SCENARIOS = {
+    "c3_single": lambda d: _run_industry("Chapter3", "single", d, {}),
+    "c3_multi10": lambda d: _run_industry("Chapter3", "multi", d, {SIMULATIONS: 10}),
+    "c3_sa_small": lambda d: _run_industry("Chapter3", "sa", d, {SIMULATIONS: 2, ITERATIONS: 3}),
+    "c4_single": lambda d: _run_industry("Chapter4", "single", d, {}),
+    "c4_multi10": lambda d: _run_industry("Chapter4", "multi", d, {SIMULATIONS: 10}),
+    "c4_sa_small": lambda d: _run_industry("Chapter4", "sa", d, {SIMULATIONS: 2, ITERATIONS: 3}),
+    "c5_single": lambda d: _run_pharma("single", d, 1),
+    "c5_multi10": lambda d: _run_pharma("multi", d, 10),
+}
+
+
+def scenario_names(pattern=None):
+    """
+    按正则表达式筛选场景名称
+
+    Args:
+        pattern: 正则表达式，None表示全部场景
+
+    Returns:
+        list: 场景名称
+    """
+    return [name for name in SCENARIOS if pattern is None or re.search(pattern, name)]
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+第5章研发项目选择的差分检查
+
+    python -m benchmarks.selection                  # 默认200个随机场景
+    python -m benchmarks.selection --cases 1000 --periods 80
+
+MultiProjectSelection.order_value 用树状数组按权重抽取项目，研发记忆每期先用
+Memory.compact() 清除已进入研发的项目。本检查在随机生成的小型产业（治疗类别、
+分子、专利归属和企业的研发记忆，包括 record_memory_imi 重复记录的仿制项目）上
+逐期运行它，并与不清除记忆、逐项线性累加概率的原始实现（linear_order_value）
+比较：两者从相同的随机数状态开始，每一次选择后各分子和治疗类别的研发计数
+（即选中的项目）、尚未进入研发的项目以及随机数生成器的状态都必须相同。
+
+record_memory_imi 把重复记录的仿制项目合并为同一行的份数，原来每份占一行。两种
+记忆中各份的排列顺序不同，选中的项目无法逐次相同，因此另外比较选择的分布：
+对随机生成的仿制记忆，两种表示用相同的随机数各选择多次，抽取的随机数个数必须
+相同，各分子被选中的次数之差不能超过 Z_LIMIT 个标准差。
+"""
+
+import sys
+import copy
+import random
+import argparse
+
+from src_py.Chapter5.firm import Firm, Memory
+from src_py.Chapter5.java_compatible_random import JavaCompatibleRandom
+from src_py.Chapter5.multiprojectselection import MultiProjectSelection
+
+NUM_OF_TC = 6
+NUM_OF_MOL = 12
+PATENT_DURATION = 20
+Z_LIMIT = 5.0
+
+
+class _Molecule:
+    def __init__(self):
+        self.patent_time = 0
+        self.patent_by = 0
+        self.on_mol_res = 0
+        self.q = 0.0
+        self.patent = False
+        self.patent_expired = False
+
+
+class _TherapeuticCategory:
+    def __init__(self):
+        self.mol = [None] + [_Molecule() for _ in range(NUM_OF_MOL)]
+        self.on_ta_res = 0
+        self.value = 100.0
+
+
+class _Firm:
+    select_mol = Firm.select_mol
+
+    def __init__(self, innovatort):
+        self.innovatort = innovatort
+        self.on_pro_inno = Memory(0)
+        self.on_pro_imi = Memory(0)
+
+
+class _Model:
+    """order_value 用到的模型属性"""
+
+    def __init__(self, seed):
+        self.num_of_tc = NUM_OF_TC
+        self.num_of_mol = NUM_OF_MOL
+        self.patent_duration = PATENT_DURATION
+        self.tc = [None] + [_TherapeuticCategory() for _ in range(NUM_OF_TC)]
+        self.f = [None, _Firm(True), _Firm(False)]
+        self.r = JavaCompatibleRandom(seed)
+
+
+def linear_order_value(cap, f, t, model):
+    """
+    原始的项目选择：每个容量单位重新线性计算总价值，再逐项累加概率直到超过随机数
+    （有多份的行按份数计算权重和可选项目数，与每份单独一行相同）
+
+    Args:
+        cap: 容量（最多选择的项目数）
+        f: 企业ID
+        t: 当前时间
+        model: 模型
+    """
+    firm = model.f[f]
+    inno = firm.on_pro_inno
+    memory = inno if firm.innovatort else firm.on_pro_imi
+    for count in range(cap):
+        weights = []
+        c = 0
+        ta = [0] * model.num_of_tc
+        for i in range(memory.size):
+            weight = None
+            copies = int(memory.count[i])
+            if memory.on[i] == 0:
+                tc_id = memory.mem_of_tc[i]
+                mol_id = memory.mem_of_mol[i]
+                if firm.innovatort:
+                    mol = model.tc[tc_id].mol[mol_id]
+                    multiplier = (model.patent_duration - (t - mol.patent_time)) / model.patent_duration
+                    if not (mol.patent_by == f and multiplier > 0):
+                        multiplier = 0
+                    weight = memory.value[i] * multiplier * copies
+                elif not MultiProjectSelection.in_vet(inno.mem_of_tc, inno.mem_of_mol, tc_id, mol_id):
+                    weight = memory.value[i] * copies
+            weights.append(weight)
+            if weight is not None:
+                c += copies
+                if tc_id < len(ta):
+                    ta[tc_id] += copies
+        if c == 0:
+            continue
+
+        vtot = 0.0
+        for weight in weights:
+            if weight is not None:
+                vtot += weight
+        casual = model.r.random()
+        ti = 0.0
+        pos_best = -1
+        for i, weight in enumerate(weights):
+            if weight is None:
+                continue
+            if vtot > 0:
+                ti += weight / vtot
+            if ti > casual:
+                pos_best = firm.select_mol(ta, i, memory)
+                break
+
+        if pos_best != -1:
+            MultiProjectSelection._switch_on(memory, pos_best, model)
+
+
+def evolve(model, rng, t):
+    """
+    随机改变一期的产业状态：企业发现新的项目，部分分子的专利易主或更新
+
+    Args:
+        model: 模型
+        rng: random.Random，两个被比较的模型使用状态相同的生成器
+        t: 当前时间
+    """
+    for _ in range(rng.randint(0, 4)):
+        tc_id = rng.randint(1, NUM_OF_TC)
+        mol_id = rng.randint(1, NUM_OF_MOL)
+        value = rng.choice((0.0, rng.random() * 10.0))
+        model.f[1].on_pro_inno.append(tc_id, mol_id, value)
+    for _ in range(rng.randint(0, 3)):
+        tc_id = rng.randint(1, NUM_OF_TC)
+        mol_id = rng.randint(1, NUM_OF_MOL)
+        model.f[2].on_pro_imi.append(tc_id, mol_id, rng.random() * 10.0)
+    for _ in range(rng.randint(0, 3)):
+        mol = model.tc[rng.randint(1, NUM_OF_TC)].mol[rng.randint(1, NUM_OF_MOL)]
+        mol.patent_by = rng.choice((1, 1, 2))
+        mol.patent_time = t - rng.randint(0, PATENT_DURATION + 5)
+        mol.q = rng.random() * 50.0
+        mol.patent = True
+        mol.patent_expired = t - mol.patent_time >= PATENT_DURATION
+    if rng.random() < 0.2:
+        # 与模型相同，已记录过的分子会再次记录（合并为份数）
+        model.f[2].on_pro_imi.record_memory_imi(model)
+
+
+def research_state(model):
+    """
+    各分子和治疗类别的研发计数（每选中一个项目加1），以及各记忆中尚未进入研发的项目
+    （按顺序；清除已进入研发的项目不改变它们）
+    """
+    waiting = []
+    for f in (1, 2):
+        for memory in (model.f[f].on_pro_inno, model.f[f].on_pro_imi):
+            waiting.append([(int(memory.mem_of_tc[i]), int(memory.mem_of_mol[i]), float(memory.value[i]),
+                             int(memory.count[i])) for i in range(memory.size) if memory.on[i] == 0])
+    counters = [(tc.on_ta_res, [mol.on_mol_res for mol in tc.mol[1:]]) for tc in model.tc[1:]]
+    return counters, waiting
+
+
+def record_imitation_copies(memory, model):
+    """原来的 record_memory_imi：每次记录的每个可仿制分子另起一行"""
+    for tc_id in range(1, model.num_of_tc + 1):
+        for mol_id in range(1, model.num_of_mol + 1):
+            mol = model.tc[tc_id].mol[mol_id]
+            if mol.q > 0 and mol.patent and mol.patent_expired:
+                memory.append(tc_id, mol_id, model.tc[tc_id].value * mol.q * 0.8 / 100.0)
+
+
+def check_copies(seed, draws, cap=3):
+    """
+    比较合并份数的仿制记忆与每份一行的记忆的选择分布
+
+    Args:
+        seed: 场景的随机种子
+        draws: 每种表示的选择次数
+        cap: 每次选择的容量
+
+    Returns:
+        tuple: (各分子被选中次数之差的最大标准化值, 第一个不同之处的说明，没有时为None)
+    """
+    model = _Model(seed)
+    rng = random.Random(seed)
+    merged = Memory(0)
+    copies = Memory(0)
+    # 多次记录，每次之前随机改变部分分子的专利状态，使各分子的份数不同
+    for _ in range(rng.randint(2, 6)):
+        for _ in range(rng.randint(3, 10)):
+            mol = model.tc[rng.randint(1, NUM_OF_TC)].mol[rng.randint(1, NUM_OF_MOL)]
+            mol.q = rng.random() * 50.0
+            mol.patent = True
+            mol.patent_expired = rng.random() < 0.7
+        merged.record_memory_imi(model)
+        record_imitation_copies(copies, model)
+
+    picks = ({}, {})
+    for trial in range(draws):
+        # 相邻种子的线性同余生成器的第一个随机数高度相关，每次选择的种子另外随机抽取
+        trial_seed = rng.getrandbits(48)
+        seeds = []
+        for template, counts in zip((merged, copies), picks):
+            memory = copy.deepcopy(template)
+            model.f[2].on_pro_imi = memory
+            model.r = JavaCompatibleRandom(trial_seed)
+            before = memory.count.copy()
+            MultiProjectSelection.order_value(None, cap, 2, 1, model)
+            for i in range(memory.size):
+                if memory.count[i] < before[i]:
+                    key = (int(memory.mem_of_tc[i]), int(memory.mem_of_mol[i]))
+                    counts[key] = counts.get(key, 0) + int(before[i] - memory.count[i])
+            seeds.append(model.r.seed)
+        if seeds[0] != seeds[1]:
+            return 0.0, f"seed {seed}, draw {trial}: RNG state {seeds[0]} != {seeds[1]}"
+
+    z = 0.0
+    for key in set(picks[0]) | set(picks[1]):
+        a = picks[0].get(key, 0)
+        b = picks[1].get(key, 0)
+        z = max(z, abs(a - b) / (a + b) ** 0.5)
+    if z > Z_LIMIT:
+        return z, f"seed {seed}: selection frequencies differ by {z:.1f} standard deviations"
+    return z, None
+
+
+def check_case(seed, periods):
+    """
+    比较一个随机场景中两种实现的每一次选择
+
+    Returns:
+        tuple: (比较的选择次数, 第一个不同之处的说明，相同时为None)
+    """
+    ours = _Model(seed)
+    reference = copy.deepcopy(ours)
+    rng_ours = random.Random(seed)
+    rng_reference = random.Random(seed)
+    steps = 0
+    for t in range(1, periods + 1):
+        evolve(ours, rng_ours, t)
+        evolve(reference, rng_reference, t)
+        for f in (1, 2):
+            ours.f[f].on_pro_inno.compact()
+            ours.f[f].on_pro_imi.compact()
+            cap = rng_ours.randint(0, 5)
+            rng_reference.randint(0, 5)
+            MultiProjectSelection.order_value(None, cap, f, t, ours)
+            linear_order_value(cap, f, t, reference)
+            steps += cap
+            if ours.r.seed != reference.r.seed:
+                return steps, f"seed {seed}, period {t}, firm {f}: RNG state {ours.r.seed} != {reference.r.seed}"
+            if research_state(ours) != research_state(reference):
+                return steps, f"seed {seed}, period {t}, firm {f}: selected projects differ"
+    return steps, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the Fenwick-tree project selection on compacted "
+                                                 "memories with the linear scan")
+    parser.add_argument("--cases", type=int, default=200, help="random industries to replay")
+    parser.add_argument("--periods", type=int, default=60, help="periods per industry")
+    parser.add_argument("--copy-cases", type=int, default=10,
+                        help="imitation memories compared with one row per recorded copy")
+    parser.add_argument("--draws", type=int, default=1000, help="selections per imitation memory")
+    args = parser.parse_args(argv)
+
+    total = 0
+    failures = 0
+    for seed in range(1, args.cases + 1):
+        steps, difference = check_case(seed, args.periods)
+        total += steps
+        if difference is not None:
+            failures += 1
+            print(difference)
+    print(f"{args.cases} cases, {total} selection steps, {failures} with differences")
+
+    largest = 0.0
+    copy_failures = 0
+    for seed in range(1, args.copy_cases + 1):
+        z, difference = check_copies(seed, args.draws)
+        largest = max(largest, z)
+        if difference is not None:
+            copy_failures += 1
+            print(difference)
+    print(f"{args.copy_cases} imitation memories x {args.draws} selections: merged copies vs one row per copy, "
+          f"largest difference {largest:.2f} standard deviations, {copy_failures} failing")
+    return 1 if failures or copy_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
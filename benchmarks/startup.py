@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+冷启动导入时间基准
+
+    python -m benchmarks.startup                  # 测量全部入口，超出预算时退出码为1
+    python -m benchmarks.startup --budget 0.3     # 每个入口的时间预算（秒）
+    python -m benchmarks.startup --top 10         # 另外列出导入最慢的模块（python -X importtime）
+
+每个入口模块在新的Python进程中导入若干次，取最快的一次作为冷启动时间（字节码缓存
+已生成，与工作进程的启动情况一致）。同时检查导入后是否加载了不应在启动时加载的
+重型依赖（scipy、pandas、matplotlib）。
+"""
+
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+from benchmarks.scenarios import ROOT_DIR
+
+# 需要快速启动的入口模块
+ENTRY_MODULES = (
+    "src_py.manager",
+    "src_py.cli",
+    "src_py.Chapter3",
+    "src_py.Chapter3.c3_model",
+    "src_py.Chapter4.c4_model",
+    "src_py.Chapter5.c5_model",
+)
+
+HEAVY_MODULES = ("scipy", "pandas", "matplotlib")
+DEFAULT_BUDGET = 0.5
+DEFAULT_REPEAT = 5
+
+_CHILD = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=DEFAULT_REPEAT):
+    """
+    在新进程中导入一个模块
+
+    Args:
+        module: 模块名称
+        repeat: 重复次数
+
+    Returns:
+        dict: seconds（最快一次的导入时间）、heavy（导入后已加载的重型依赖）
+    """
+    runs = []
+    for _ in range(max(1, repeat)):
+        result = subprocess.run([sys.executable, "-c", _CHILD.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    return {"seconds": min(r["seconds"] for r in runs), "heavy": runs[-1]["heavy"]}
+
+
+def slowest_imports(module, top):
+    """
+    用 python -X importtime 找出导入最慢的模块
+
+    Args:
+        module: 入口模块
+        top: 列出的模块数
+
+    Returns:
+        list: (累计微秒, 模块名称)，从慢到快
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), match.group(4)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the model entry points")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds allowed per entry point")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="fresh processes per entry point")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports of each entry point")
+    args = parser.parse_args(argv)
+
+    failed = []
+    for module in ENTRY_MODULES:
+        result = measure(module, args.repeat)
+        problems = []
+        if result["seconds"] > args.budget:
+            problems.append(f"over budget {args.budget:.2f} s")
+        if result["heavy"]:
+            problems.append(f"loads {', '.join(result['heavy'])}")
+        status = "; ".join(problems) if problems else "ok"
+        print(f"{module:<28} {result['seconds'] * 1000:8.1f} ms  {status}")
+        if problems:
+            failed.append(module)
+        for micros, name in slowest_imports(module, args.top) if args.top else ():
+            print(f"    {micros / 1000:8.1f} ms  {name}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
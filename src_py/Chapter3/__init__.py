@@ -5,11 +5,28 @@
 Chapter3包 - 为了将目录转变为Python包而创建的初始化文件
 """
 
-from .firm import Firm
-from .industry import Industry
-from .parameter import Parameter
-from .technology import Technology
-from .user_class import UserClass
-from .c3_model import C3Model
-from .statistics import Statistics
-from .sa_statistics import SA_Statistics 
\ No newline at end of file
+import importlib
+
+# 包中可直接导入的类 -> 所在模块（首次访问时才导入，见 __getattr__）
+_EXPORTS = {
+    "Firm": ".firm",
+    "Industry": ".industry",
+    "Parameter": ".parameter",
+    "Technology": ".technology",
+    "UserClass": ".user_class",
+    "C3Model": ".c3_model",
+    "Statistics": ".statistics",
+    "SA_Statistics": ".sa_statistics",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """按需导入包中的类，导入包本身不会加载模型及其依赖"""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
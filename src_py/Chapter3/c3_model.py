@@ -9,6 +9,8 @@ C3Model模块 - C3Model类的Python实现
 import os
 import random
 import sys
+import pickle
+import zlib
 import numpy as np
 
 from .parameter import Parameter
@@ -18,6 +20,13 @@ from .user_class import UserClass
 from .statistics import Statistics
 from .sa_statistics import SA_Statistics
 from .java_compatible_random import JavaCompatibleRandom
+from .checkpoint import Checkpoint, CHECKPOINT_NAME
+from .phase_timer import PhaseTimer
+from .memory_tracker import MemoryTracker
+from .firm import Firm
+from .online_stats import OnlineStatistics
+from .result_cache import normalize_value
+from .parameter_file import SIMULATIONS, ITERATIONS
 
 """
 @author Gianluca Capone & Davide Sgobba
@@ -31,6 +40,9 @@ Python转换
 """
 class C3Model:
     
+    # 不保存在模型快照中的属性（敏感性分析对象持有打开的输出文件）
+    SNAPSHOT_EXCLUDE = ("sens", "phase_timer", "memory_tracker")
+    
     def __init__(self):
         """
         构造函数
@@ -53,6 +65,17 @@ class C3Model:
         print(f"参数文件路径: {self.path_parameters}")
         print(f"结果目录: {self.path_results}")
         
+        # 单次模拟的输出格式：文本CSV，以及可选的列式二进制格式（"npz"、"npy"、"parquet"）
+        self.single_text_output = True
+        self.single_panel_formats = []
+        
+        # 分阶段计时（默认关闭，phase_timer.enable() 启用，结果见 write_phase_timing）
+        self.phase_timer = PhaseTimer("C3Model")
+        
+        # 内存分析（默认关闭，memory_tracker.enable() 启用，结果见 write_memory_profile）
+        self.memory_tracker = MemoryTracker("C3Model", (Firm, Technology, UserClass, Industry,
+                                                        Statistics, OnlineStatistics))
+        
         # 使用与Java相同的种子
         # 创建一个Java风格的随机数生成器
         self.rng = JavaCompatibleRandom(13)
@@ -81,6 +104,12 @@ class C3Model:
         self.entry_time_mp = 0     # 基于微处理器的企业的进入周期(T-AD)
         self.intro_time_mp = 0     # 计算机企业可以采用微处理器的周期(T_MP)
         self.aware_div = 0.0       # PC市场多元化的最小阈值(lambda-DV)
+        self.sa_fsync_interval = 10  # 敏感性分析每完成多少个参数组合执行一次fsync
+        self.sa_memmap = False  # 敏感性分析结果矩阵是否保存为磁盘上的memmap (.npy)
+        self.checkpoint_interval = 10  # 多次模拟每完成多少次运行保存一次检查点
+        self.multi_dispersion = False  # 多次模拟是否同时输出各序列在运行之间的离散程度
+        self.dispersion_quantiles = (0.05, 0.5, 0.95)  # 离散程度输出中估计的分位数
+        self.crn = False  # 共同随机数模式：各随机决策点使用各自的随机数子序列（见JavaCompatibleRandom.substream）
         
         # 变量
         self.timer = 0             # 时间指示器(t)
@@ -260,8 +289,9 @@ class C3Model:
         self.intro_time_mp = int(self.parameters[5].get_value())
         self.aware_div = float(self.parameters[6].get_value())
 
-        self.large_orgs = UserClass(self.param_cd, self.param_lo, self.rng)
-        self.small_users = UserClass(self.param_cd, self.param_sui, self.rng)
+        # 共同随机数模式下两个用户类使用各自的子序列
+        self.large_orgs = UserClass(self.param_cd, self.param_lo, self.rng.substream("large_orgs"))
+        self.small_users = UserClass(self.param_cd, self.param_sui, self.rng.substream("small_users"))
         
         self.tr_tec = Technology(self.param_tr)
         self.mp_tec = Technology(self.param_mp)
@@ -301,9 +331,11 @@ class C3Model:
             is_single: 是否为单次模拟
         """
         if is_single:
+            self.rng.enable_substreams(self.crn)
             self.import_parameters(False, True)
             self.stat = Statistics(self, True)
-            self.stat.open_file("/singleSimulation.csv")
+            if self.single_text_output:
+                self.stat.open_file("/singleSimulation.csv")
         else:
             self.import_parameters(False, False)
         
@@ -312,47 +344,208 @@ class C3Model:
         
         # 使用NumPy数组存储比率计算，提高性能
         for self.timer in range(1, self.end_time + 1):
-            if self.timer == self.entry_time_mp:
+            self.simulate_period(is_single, sim_info)
+        self.phase_timer.end_replicate()
+        self.memory_tracker.end_replicate()
+        
+        if is_single:
+            if self.single_text_output:
+                self.stat.print_single_statistics()
+                self.stat.close_file()
+            for panel_format in self.single_panel_formats:
+                self.stat.print_single_panels(panel_format)
+            self.write_phase_timing()
+            self.write_memory_profile()
+    
+    def simulate_period(self, is_single, sim_info=None):
+        """
+        运行当前周期(self.timer)的所有步骤并收集统计数据
+        
+        Args:
+            is_single: 是否为单次模拟
+            sim_info: 当前模拟标识
+        """
+        phase = self.phase_timer.phase
+        self.phase_timer.period = self.timer
+        
+        if self.timer == self.entry_time_mp:
+            with phase("second_generation_creation"):
                 self.computer_industry.second_generation_creation(self.timer, self.mp_tec, sim_info)
-            
-            # 使用NumPy的矢量化操作优化比率计算
-            if self.small_users.size > 0 and self.large_orgs.size > 0:
-                ratio = self.small_users.size / self.large_orgs.size
-                if ratio > self.aware_div:
+        
+        # 使用NumPy的矢量化操作优化比率计算
+        if self.small_users.size > 0 and self.large_orgs.size > 0:
+            ratio = self.small_users.size / self.large_orgs.size
+            if ratio > self.aware_div:
+                with phase("diversification"):
                     self.computer_industry.diversification(self.timer, self.mp_tec, self.small_users, self.large_orgs, sim_info)
-            
+        
+        with phase("rd_invest"):
             self.computer_industry.rd_invest(self.timer)
+        with phase("mkting_invest"):
             self.computer_industry.mkting_invest(self.timer)
-            
-            if self.timer > self.intro_time_mp:
+        
+        if self.timer > self.intro_time_mp:
+            with phase("adoption"):
                 self.computer_industry.adoption(self.mp_tec)
-            
+        
+        with phase("innovation"):
             self.computer_industry.innovation()
-            
+        
+        with phase("market_small_users"):
             self.small_users.market(self.computer_industry, self.timer)
+        with phase("market_large_orgs"):
             self.large_orgs.market(self.computer_industry, self.timer)
-            
+        
+        with phase("accounting"):
             self.computer_industry.accounting(self.timer)
-            
+        
+        with phase("statistics"):
             if is_single:
                 self.stat.make_single_statistics()
             else:
                 self.stat.make_statistics()
         
-        if is_single:
-            self.stat.print_single_statistics()
-            self.stat.close_file()
+        self.memory_tracker.sample(self.timer)
+    
+    def write_phase_timing(self, name="phase_timing"):
+        """
+        写入分阶段计时结果（name.csv、name.json 和 cProfile格式的 name.prof）
+        
+        Args:
+            name: 结果目录中的文件名（不含扩展名）
+        """
+        if self.phase_timer.enabled:
+            self.phase_timer.write(os.path.join(self.path_results, name))
+    
+    def write_memory_profile(self, name="memory_profile"):
+        """
+        写入内存分析结果（name.csv 和 name.json）
+        
+        Args:
+            name: 结果目录中的文件名（不含扩展名）
+        """
+        if self.memory_tracker.enabled:
+            self.memory_tracker.write(os.path.join(self.path_results, name))
+    
+    def make_snapshot(self, period=None):
+        """
+        从参数文件开始运行单次模拟的前 period-1 个周期，并返回第 period 期开始时的模型快照。
+        默认的 period 为参数文件中的 entry_time_mp，快照位于微处理器企业进入之前，分支可以修改此后的参数
+        
+        Args:
+            period: 快照所在的周期（该周期尚未运行），取值范围为 1 到 end_time，
+                None表示参数文件中微处理器企业的进入周期
+        
+        Returns:
+            bytes: 模型快照（见snapshot方法）
+        
+        Raises:
+            ValueError: period 不在 1 到 end_time 之间
+        """
+        self.rng.enable_substreams(self.crn)
+        self.import_parameters(False, True)
+        if period is None:
+            period = self.entry_time_mp
+        if not 1 <= period <= self.end_time:
+            raise ValueError(f"snapshot period must be between 1 and end_time ({self.end_time}), got {period}")
+        self.stat = Statistics(self, True)
+        for self.timer in range(1, period):
+            self.simulate_period(True, "快照")
+        self.timer = period - 1
+        return self.snapshot()
     
-    def make_multiple_simulation(self, is_multi):
+    def snapshot(self):
+        """
+        将当前模型状态（参数、技术、行业与企业、用户类、随机数生成器、单次模拟统计）
+        序列化为压缩的字节串。对象之间共享的引用（例如共用的随机数生成器）在恢复后保持共享
+        
+        Returns:
+            bytes: zlib压缩的pickle数据
+        """
+        state = {name: value for name, value in self.__dict__.items() if name not in self.SNAPSHOT_EXCLUDE}
+        return zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+    
+    def restore_snapshot(self, data):
+        """
+        从snapshot方法生成的字节串恢复模型状态
+        
+        Args:
+            data: 模型快照
+        """
+        state = pickle.loads(zlib.decompress(data))
+        self.__dict__.update(state)
+        if self.stat is not None:
+            self.stat.model = self
+    
+    def fork(self, data, branches):
+        """
+        从同一个快照运行多个分支直到end_time，各分支共享快照之前的模拟历史
+        
+        Args:
+            data: 模型快照（见make_snapshot）
+            branches: 字典列表，每个分支可包含：
+                "name": 输出文件名中的分支名称（默认为序号）
+                "seed": 分支使用的随机种子（默认延续快照中的随机数序列）
+                "overrides": 字典，属性路径 -> 新取值，例如
+                    {"aware_div": 0.2, "computer_industry.mark_up": 0.1, "mp_tec.perf_lim": 5000.0}
+        
+        Returns:
+            list: 各分支的Statistics对象
+        """
+        results = []
+        for k, branch in enumerate(branches, 1):
+            name = branch.get("name", str(k))
+            self.restore_snapshot(data)
+            start = self.timer + 1
+            
+            for path, value in branch.get("overrides", {}).items():
+                target = self
+                attrs = path.split(".")
+                for attr in attrs[:-1]:
+                    target = getattr(target, attr)
+                if not hasattr(target, attrs[-1]):
+                    print(f"Unknown attribute in branch {name}: {path}")
+                    continue
+                setattr(target, attrs[-1], value)
+            
+            if branch.get("seed") is not None:
+                self.rng.setSeed(branch["seed"])
+            
+            if self.single_text_output:
+                self.stat.open_file(f"/singleSimulation_{name}.csv")
+            for self.timer in range(start, self.end_time + 1):
+                self.simulate_period(True, f"分支 {name}")
+            
+            if self.single_text_output:
+                self.stat.print_single_statistics()
+                self.stat.close_file()
+            for panel_format in self.single_panel_formats:
+                self.stat.print_single_panels(panel_format, f"singleSimulation_{name}")
+            results.append(self.stat)
+        return results
+    
+    def parameter_values(self):
+        """
+        参数取值的规范形式（不含运行次数和组合数），用于检查点的设置键
+        
+        Returns:
+            list: 按参数文件顺序排列的取值
+        """
+        return [normalize_value(p.get_value()) for p in self.parameters
+                if p is not None and p.get_name() and p.get_name() not in (SIMULATIONS, ITERATIONS)]
+    
+    def make_multiple_simulation(self, is_multi, resume=False):
         """
         此方法自动化多次模拟运行。如果is_multi控制为"True"，
         使用特定方法上传参数并创建输出，并显示运行次数
         
         Args:
             is_multi: 是否为多次模拟
+            resume: 是否从检查点继续中断的多次模拟（仅在is_multi为True时有效）
         """
         if is_multi:
             # 仅在直接多次模拟时导入参数
+            self.rng.enable_substreams(self.crn)
             self.import_parameters(False, True)
         
         # 创建统计对象
@@ -362,8 +555,25 @@ class C3Model:
             # 仅在直接多次模拟时打开文件
             self.stat.open_file("/multiSimulation.csv")
         
+        # 直接多次模拟时定期保存检查点（敏感性分析按参数组合恢复，不使用检查点）
+        checkpoint = None
+        completed = 0
+        if is_multi:
+            checkpoint = Checkpoint(os.path.join(self.path_results, CHECKPOINT_NAME), self.checkpoint_interval,
+                                    {"multi_time": self.multi_time, "end_time": self.end_time,
+                                     "rng_seed": self.rng.origin, "parameters": self.parameter_values(),
+                                     "dispersion": self.multi_dispersion, "crn": self.crn})
+            state = checkpoint.load() if resume else None
+            if state is not None:
+                completed = state["completed"]
+                Checkpoint.restore(self.stat, state["arrays"])
+                self.rng.set_state(state["rng"])
+                if self.stat.dispersion is not None:
+                    self.stat.dispersion.load_state(state["extra"])
+                print(f"从第 {completed + 1} 次运行继续多次模拟")
+        
         # 运行多次模拟
-        for multi_counter in range(1, self.multi_time + 1):
+        for multi_counter in range(completed + 1, self.multi_time + 1):
             # 生成当前模拟的标识
             current_sim_info = None
             if is_multi:
@@ -376,6 +586,12 @@ class C3Model:
             # 修改make_single_simulation方法，使其使用当前模拟标识
             self._current_sim_info = current_sim_info
             self.make_single_simulation(False)
+            self.stat.end_run()
+            
+            if checkpoint is not None and multi_counter < self.multi_time and checkpoint.due(multi_counter):
+                checkpoint.save(multi_counter, Checkpoint.capture(self.stat, self.stat.multi_series),
+                                self.rng.get_state(),
+                                self.stat.dispersion.state() if self.stat.dispersion is not None else None)
         
         # 在敏感性分析模式下，保存统计数据
         if not is_multi:
@@ -384,32 +600,47 @@ class C3Model:
         # 仅在直接多次模拟时打印结果并关闭文件
         if is_multi:
             self.stat.print_multi_statistics()
+            if self.stat.dispersion is not None:
+                self.stat.print_dispersion_statistics()
             self.stat.close_file()
+            checkpoint.remove()
+            self.write_phase_timing()
+            self.write_memory_profile()
     
-    def make_sensitivity_simulation(self, print_sens_counter):
+    def make_sensitivity_simulation(self, print_sens_counter, resume=False):
         """
         此方法自动化敏感性分析模拟运行。如果print_sens_counter控制为"True"，
         则应显示敏感性运行的次数
         
         Args:
             print_sens_counter: 是否打印敏感性计数器
+            resume: 是否从中断的敏感性分析继续，跳过输出中已完成的参数组合
         """
         # 完全按照Java版本实现
         # 导入参数但不恢复自定义设置，使用文件中的值
+        self.rng.enable_substreams(self.crn)
         self.import_parameters(True, True)
         
-        # 创建敏感性统计对象
+        # 创建敏感性统计对象，每个参数组合完成后立即写入结果
         self.sens = SA_Statistics(self)
-        self.sens.open_file()
+        completed = self.sens.open_file(resume)
+        
+        # 恢复到最后一个已完成组合之后的随机数状态
+        if completed > 0 and self.sens.resume_state is not None:
+            self.rng.set_state(self.sens.resume_state)
+            if print_sens_counter:
+                print(f"从第 {completed + 1} 个参数组合继续敏感性分析")
         
         if print_sens_counter:
             print(f"开始敏感性分析, 参数组合数: {self.multi_sens}, 每组运行次数: {self.multi_time}, 每次周期数: {self.end_time}")
             print(f"总模拟次数: {self.multi_sens * self.multi_time}，与Java版本行为一致")
         
         # 运行多次敏感性模拟
-        for sens_counter in range(1, self.multi_sens + 1):
+        for sens_counter in range(completed + 1, self.multi_sens + 1):
             # 每次敏感性分析循环重新导入参数并随机化
             self.import_parameters(True, True)
+            # 参数取值从主序列抽取；共同随机数模式下各参数组合的模拟从相同的子序列状态开始
+            self.rng.reset_substreams()
             
             # 改进敏感性分析的进度输出
             if print_sens_counter:
@@ -423,4 +654,6 @@ class C3Model:
         if print_sens_counter:
             print(f"敏感性分析完成")
         self.sens.print_statistics()
-        self.sens.close_file() 
\ No newline at end of file
+        self.sens.close_file()
+        self.write_phase_timing()
+        self.write_memory_profile() 
\ No newline at end of file
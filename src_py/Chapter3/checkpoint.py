@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多次模拟检查点模块
+
+多次模拟每完成 interval 次运行，就把累计的统计数组、随机数生成器状态和已完成
+的运行次数原子地写入检查点文件（先写临时文件并fsync，再用os.replace替换）。
+中断后以 resume=True 重新运行时，从检查点恢复这些状态并从下一次运行继续，
+输出与不中断的运行逐字节相同。浮点数以JSON的最短往返表示保存，恢复后数值不变。
+"""
+
+import os
+import json
+import numpy as np
+
+CHECKPOINT_NAME = "multi_checkpoint.json"
+
+
+class Checkpoint:
+
+    def __init__(self, path, interval=10, key=None):
+        """
+        Args:
+            path: 检查点文件路径
+            interval: 每完成多少次运行保存一次检查点
+            key: 字典，描述本次运行的设置（如运行次数、周期数），设置不同的检查点不会被恢复
+        """
+        self.path = path
+        self.interval = max(1, int(interval))
+        self.key = key or {}
+
+    def due(self, completed):
+        """
+        判断完成 completed 次运行后是否需要保存检查点
+
+        Args:
+            completed: 已完成的运行次数
+
+        Returns:
+            bool: 是否需要保存
+        """
+        return completed % self.interval == 0
+
+    def load(self):
+        """
+        读取检查点
+
+        Returns:
+            dict: 包含 completed、arrays、rng 和 extra 的字典，没有可用的检查点时返回None
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading {self.path}: {e}")
+            return None
+
+        if state.get("key") != self.key:
+            print(f"Checkpoint {self.path} was written with different settings, starting from the first run")
+            return None
+        return state
+
+    def save(self, completed, arrays, rng_state=None, extra=None):
+        """
+        原子地写入检查点
+
+        Args:
+            completed: 已完成的运行次数
+            arrays: 字典，名称 -> 累计的统计数组（列表或numpy数组）
+            rng_state: 随机数生成器状态（JavaCompatibleRandom.get_state()）
+            extra: 其他可JSON序列化的状态（例如在线统计量）
+        """
+        state = {
+            "key": self.key,
+            "completed": completed,
+            "rng": rng_state,
+            "arrays": {name: _to_list(values) for name, values in arrays.items()},
+            "extra": extra,
+        }
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error writing {self.path}: {e}")
+
+    def remove(self):
+        """运行全部完成后删除检查点文件"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(e)
+
+    @staticmethod
+    def capture(obj, names):
+        """
+        收集对象上的统计数组
+
+        Args:
+            obj: 统计对象
+            names: 属性名列表
+
+        Returns:
+            dict: 名称 -> 数组
+        """
+        return {name: getattr(obj, name) for name in names}
+
+    @staticmethod
+    def restore(obj, arrays):
+        """
+        把检查点中的数组写回统计对象，保持属性原来的类型（列表或numpy数组）
+
+        Args:
+            obj: 统计对象
+            arrays: 名称 -> 列表
+        """
+        for name, values in arrays.items():
+            current = getattr(obj, name, None)
+            if isinstance(current, np.ndarray):
+                setattr(obj, name, np.asarray(values, dtype=current.dtype))
+            else:
+                setattr(obj, name, list(values))
+
+
+def _to_list(values):
+    """将数组转换为可JSON序列化的Python列表"""
+    if values is None:
+        return None
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return [v.item() if isinstance(v, np.generic) else v for v in values]
@@ -9,7 +9,6 @@ Firm模块 - Firm类的Python实现
 import random
 import math
 import numpy as np
-from scipy import stats
 
 """
 @author Gianluca Capone & Davide Sgobba
@@ -19,6 +18,13 @@ Python转换
 """
 class Firm:
     
+    __slots__ = ("alive", "adopted", "entered", "mother", "rng", "id", "time_birth", "served_user_class",
+                 "computer", "generation", "tec", "init_bud", "bud", "debt", "mkting_capab",
+                 "computer_industry", "traj", "adv_expend", "exit_var", "experience", "mod", "norm_nw",
+                 "share", "number_of_bl_returns", "number_of_breakdowns", "number_of_new_buyers",
+                 "number_of_served_buyers", "cheap_rd_input", "perf_rd_input", "price", "production_cost",
+                 "profit", "q_sold", "u")
+    
     def __init__(self, id_num, time_birth, generation, tec, computer_industry=None, 
                  rng=None, user_class=None, init_bud=None, ebw=None):
         """
@@ -77,7 +83,7 @@ class Firm:
         else:  # 常规企业构造函数
             self.generation = generation
             self.tec = tec
-            self.init_bud = tec.min_init_bud + rng.random() * tec.range_init_bud
+            self.init_bud = tec.min_init_bud + rng.substream("firm_entry", id_num).random() * tec.range_init_bud
             self.bud = self.init_bud
             self.debt = self.init_bud
             self.mkting_capab = 0
@@ -131,7 +137,7 @@ class Firm:
         
         # 情况3: 企业利润不允许保持当前研发支出水平
         elif cur_rd_invest_prof < ante_rd * self.computer_industry.rd_cost:
-            decrease = self.computer_industry.phi_rd_tild_min + self.rng.random() * self.computer_industry.phi_rd_tild_bias
+            decrease = self.computer_industry.phi_rd_tild_min + self.rng.substream("rd_budget", self.id).random() * self.computer_industry.phi_rd_tild_bias
             self.cheap_rd_input = int(math.floor(self.cheap_rd_input * decrease))
             self.perf_rd_input = int(math.floor(self.perf_rd_input * decrease))
         
@@ -201,9 +207,11 @@ class Firm:
         self.number_of_new_buyers = 0
         
         if self.number_of_served_buyers > 0:
-            # 使用scipy.stats替代Java的Binomial类
-            n_b = stats.binom(int(self.number_of_served_buyers), self.served_user_class.theta)
-            self.number_of_breakdowns = n_b.rvs(random_state=int(self.rng.random() * 1000000))
+            # 替代Java的Binomial类：与 scipy.stats.binom(n, theta).rvs(random_state=seed) 的抽样相同，
+            # 但不需要导入scipy，也不必每次构造冻结分布
+            seed = int(self.rng.substream("breakdowns", self.id).random() * 1000000)
+            self.number_of_breakdowns = np.random.RandomState(seed).binomial(
+                int(self.number_of_served_buyers), self.served_user_class.theta)
             self.number_of_bl_returns = int(self.number_of_breakdowns * self.served_user_class.brand_loyalty)
             self.number_of_served_buyers -= self.number_of_breakdowns
             self.number_of_new_buyers = self.number_of_bl_returns
@@ -265,7 +273,8 @@ class Firm:
                              0.5 * math.pow(best_mp, self.computer_industry.alpha_mp), 
                              self.computer_industry.alpha_ado)
         
-        if self.rng.random() < probability:
+        rng = self.rng.substream("adoption", self.id)
+        if rng.random() < probability:
             # 方程13
             budget_after_adoption = self.bud * (1 - self.computer_industry.phi_ado) - self.computer_industry.fixed_ado
             
@@ -274,7 +283,7 @@ class Firm:
                 self.tec = new_tec
                 self.adopted = True
                 
-                e = (self.computer_industry.phi_exp_min + self.rng.random() * 
+                e = (self.computer_industry.phi_exp_min + rng.random() * 
                      self.computer_industry.phi_exp_bias) * self.experience
                 
                 if e < self.experience:
@@ -305,10 +314,11 @@ class Firm:
         """
         # 在Java中，随机变量是按特定顺序生成的：先为cheap生成，再为perf生成
         # 生成随机变量，严格按照Java代码相同的顺序
+        rng = self.rng.substream("innovation", self.id)
         # 在Java中: double randomCheap = MU_INN + rng.nextGaussian() * SIGMA_INN;
-        random_cheap = self.computer_industry.mu_inn + self.rng.nextGaussian() * self.computer_industry.sigma_inn
+        random_cheap = self.computer_industry.mu_inn + rng.nextGaussian() * self.computer_industry.sigma_inn
         # 在Java中: double randomPerf = MU_INN + rng.nextGaussian() * SIGMA_INN;
-        random_perf = self.computer_industry.mu_inn + self.rng.nextGaussian() * self.computer_industry.sigma_inn
+        random_perf = self.computer_industry.mu_inn + rng.nextGaussian() * self.computer_industry.sigma_inn
         
         # 方程1.a - 确保按照Java方式进行计算
         # 1) Java会全部转换为double进行计算
@@ -444,6 +454,8 @@ class Firm:
         此类包含有关企业技术轨迹的信息，确定研发投资资源如何分配给成本和性能
         """
         
+        __slots__ = ("cheap_mix", "perf_mix")
+        
         def __init__(self, firm):
             """
             构造函数
@@ -452,7 +464,7 @@ class Firm:
                 firm: 外部Firm类的实例
             """
             # 参数
-            self.cheap_mix = firm.rng.random()          # 分配给成本研究的资源比例
+            self.cheap_mix = firm.rng.substream("firm_entry", firm.id).random()  # 分配给成本研究的资源比例
             self.perf_mix = (1 - self.cheap_mix)         # 分配给性能研究的资源比例
     
     class Product:
@@ -460,6 +472,8 @@ class Firm:
         此类包含有关企业生产的计算机在两个属性(成本和性能)中的技术水平的信息
         """
         
+        __slots__ = ("cheap", "perf")
+        
         def __init__(self):
             """
             构造函数
@@ -78,9 +78,10 @@ class Industry:
         # 初始化第一代企业
         for f in range(1, self.number_of_firms + 1):
             # 计算企业的随机属性 - 使用NumPy的随机数生成器提高精度
-            cheap_mix = self.rng.random()
+            entry_rng = self.rng.substream("firm_entry", f)
+            cheap_mix = entry_rng.random()
             perf_mix = 1.0 - cheap_mix
-            init_bud = tec.min_init_bud + self.rng.random() * tec.range_init_bud
+            init_bud = tec.min_init_bud + entry_rng.random() * tec.range_init_bud
             
             # 创建企业实例
             self.firms[f] = Firm(f, 1, 1, tec, self, rng)
@@ -293,9 +294,10 @@ class Industry:
         orient_array = np.empty(self.batch_firms, dtype=object)
         
         # 预先决定所有企业的取向
+        entry_rng = self.rng.substream("firm_entry")
         for i in range(self.batch_firms):
             if i % 2 == 0:  # 偶数企业标识符 - 随机取向
-                if self.rng.random() < self.perf_orient_ratio:
+                if entry_rng.random() < self.perf_orient_ratio:
                     orient_array[i] = "PERF_ORIENT"
                 else:
                     orient_array[i] = "CHEAP_ORIENT"
@@ -307,8 +309,8 @@ class Industry:
         
         for i in range(self.batch_firms):
             # 使用NumPy高精度随机数生成
-            init_computer_cheap = np.float64(self.tec.cheap_lim) * np.float64(self.rng.random())
-            init_computer_perf = np.float64(self.tec.perf_lim) * np.float64(self.rng.random())
+            init_computer_cheap = np.float64(self.tec.cheap_lim) * np.float64(entry_rng.random())
+            init_computer_perf = np.float64(self.tec.perf_lim) * np.float64(entry_rng.random())
             
             # 获取企业取向
             orient = orient_array[i]
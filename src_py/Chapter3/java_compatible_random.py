@@ -6,6 +6,8 @@ JavaCompatibleRandom模块 - 精确模拟Java Random类行为的随机数生成
 """
 
 import math
+import hashlib
+import numpy as np
 
 class JavaCompatibleRandom:
     """
@@ -31,10 +33,14 @@ class JavaCompatibleRandom:
         
         # 初始化种子，与Java相同的处理
         self.seed = (seed ^ self.multiplier) & self.mask
+        self.origin = self.seed  # 最近一次设置种子后的初始状态，用于计算已生成的随机数个数
         
         # 高斯分布变量，与Java的nextGaussian()相同
         self.haveNextNextGaussian = False
         self.nextNextGaussian = 0.0
+        
+        # 命名子序列（共同随机数模式，见substream），None表示未启用
+        self.substreams = None
     
     def setSeed(self, seed):
         """
@@ -44,7 +50,92 @@ class JavaCompatibleRandom:
             seed: 新的随机种子
         """
         self.seed = (seed ^ self.multiplier) & self.mask
+        self.origin = self.seed
         self.haveNextNextGaussian = False
+        self.reset_substreams()
+    
+    def get_state(self):
+        """
+        返回生成器的完整状态（可JSON序列化），用于保存和恢复
+        
+        Returns:
+            dict: 种子和缓存的高斯随机数
+        """
+        state = {
+            "seed": self.seed,
+            "origin": self.origin,
+            "haveNextNextGaussian": self.haveNextNextGaussian,
+            "nextNextGaussian": self.nextNextGaussian,
+        }
+        if self.substreams is not None:
+            state["substreams"] = {name: stream.get_state() for name, stream in self.substreams.items()}
+        return state
+    
+    def set_state(self, state):
+        """
+        恢复由 get_state() 返回的状态
+        
+        Args:
+            state: 生成器状态
+        """
+        self.seed = int(state["seed"]) & self.mask
+        self.origin = int(state.get("origin", self.seed)) & self.mask
+        self.haveNextNextGaussian = bool(state["haveNextNextGaussian"])
+        self.nextNextGaussian = float(state["nextNextGaussian"])
+        if "substreams" in state:
+            self.substreams = {}
+            for name, stream_state in state["substreams"].items():
+                stream = JavaCompatibleRandom(0)
+                stream.set_state(stream_state)
+                self.substreams[name] = stream
+    
+    def enable_substreams(self, enabled=True):
+        """
+        启用或关闭命名子序列（已启用时再次启用不改变已有的子序列）
+        
+        Args:
+            enabled: 是否启用
+        """
+        if not enabled:
+            self.substreams = None
+        elif self.substreams is None:
+            self.substreams = {}
+    
+    def substream(self, *names):
+        """
+        随机数子序列，每个随机决策点（例如创新抽样、买家进入、合同期限）使用自己的名称，
+        名称可以包含企业编号等，使每个企业的决策各自使用一个子序列
+        
+        未启用子序列时返回生成器本身，随机数序列与原来完全相同。启用后每个名称对应一个独立的
+        生成器，种子只取决于本生成器最近一次设置的种子和名称：两个场景使用相同的种子时，同一个
+        决策点得到相同的随机数，不受其他决策点消耗了多少随机数的影响（共同随机数）。子序列
+        本身也可以再划分子序列
+        
+        Args:
+            names: 名称的各部分，例如 ("innovation", 3)
+            
+        Returns:
+            JavaCompatibleRandom: 子序列的生成器
+        """
+        if self.substreams is None:
+            return self
+        name = ".".join(str(part) for part in names)
+        stream = self.substreams.get(name)
+        if stream is None:
+            stream = self.substreams[name] = JavaCompatibleRandom(self._substream_seed(name))
+            stream.enable_substreams()
+        return stream
+    
+    def reset_substreams(self):
+        """把已有的子序列恢复到各自的初始状态（setSeed时自动调用），主序列不变"""
+        if self.substreams:
+            for name, stream in self.substreams.items():
+                stream.setSeed(self._substream_seed(name))
+    
+    def _substream_seed(self, name):
+        """子序列的种子：本生成器设置种子时的状态和名称的哈希（48位）"""
+        digest = hashlib.sha256(f"{self.origin}:{name}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:6], "big")
     
     def next(self, bits):
         """
@@ -163,6 +254,133 @@ class JavaCompatibleRandom:
         self.haveNextNextGaussian = True
         return v1 * multiplier
     
+    def _jump(self, seed, steps):
+        """
+        返回从seed开始递推steps步之后的种子（按二进制位倍增，O(log steps)）
+        
+        Args:
+            seed: 起始种子
+            steps: 步数
+            
+        Returns:
+            int: 递推后的种子
+        """
+        mult, plus = 1, 0
+        cur_mult, cur_plus = self.multiplier, self.addend
+        while steps:
+            if steps & 1:
+                mult = (mult * cur_mult) & self.mask
+                plus = (plus * cur_mult + cur_plus) & self.mask
+            cur_plus = ((cur_mult + 1) * cur_plus) & self.mask
+            cur_mult = (cur_mult * cur_mult) & self.mask
+            steps >>= 1
+        return (mult * seed + plus) & self.mask
+    
+    def draws(self):
+        """
+        最近一次设置种子以来next()被调用的次数（nextDouble计2次，nextInt计1次以上）
+        
+        生成器的周期为2^48，第k位的周期为2^(k+1)，因此可以从低位到高位逐位确定步数，
+        不需要在next()中计数
+        
+        Returns:
+            int: 递推的步数
+        """
+        steps = 0
+        for k in range(48):
+            bit = 1 << k
+            if (self._jump(self.origin, steps) ^ self.seed) & bit:
+                steps |= bit
+        return steps
+    
+    @classmethod
+    def _jump_table(cls, steps):
+        """
+        返回前 steps 步线性同余递推的跳跃系数
+        
+        第k步之后的种子为 (a[k-1] * seed + c[k-1]) & mask。系数表按倍增方式
+        用uint64数组计算（溢出按2^64取模，再截取低48位结果不变），并在类上缓存。
+        
+        Args:
+            steps: 所需的步数
+            
+        Returns:
+            tuple: (a, c) 两个uint64数组，长度至少为 steps
+        """
+        mask = np.uint64((1 << 48) - 1)
+        a = getattr(cls, '_jump_a', None)
+        c = getattr(cls, '_jump_c', None)
+        if a is None:
+            a = np.array([0x5DEECE66D], dtype=np.uint64)
+            c = np.array([0xB], dtype=np.uint64)
+        
+        while len(a) < steps:
+            # 第m+k步 = 第k步作用在第m步之后的种子上
+            a_m = a[-1]
+            c_m = c[-1]
+            a = np.concatenate((a, (a * a_m) & mask))
+            c = np.concatenate((c, (c[:len(a) // 2] + a[:len(a) // 2] * c_m) & mask))
+        
+        cls._jump_a = a
+        cls._jump_c = c
+        return a, c
+    
+    def _seeds(self, steps):
+        """
+        计算接下来 steps 步的种子序列，不改变生成器状态
+        
+        Args:
+            steps: 步数
+            
+        Returns:
+            numpy.ndarray: 长度为 steps 的uint64种子数组
+        """
+        a, c = self._jump_table(steps)
+        return (a[:steps] * np.uint64(self.seed) + c[:steps]) & np.uint64(self.mask)
+    
+    def peekDoubles(self, n):
+        """
+        预览接下来n次nextDouble()的结果，不改变生成器状态
+        
+        Args:
+            n: 随机数个数
+            
+        Returns:
+            numpy.ndarray: 0.0到1.0之间的n个随机数
+        """
+        if n <= 0:
+            return np.zeros(0)
+        seeds = self._seeds(2 * n)
+        high = seeds[0::2] >> np.uint64(48 - 26)
+        low = seeds[1::2] >> np.uint64(48 - 27)
+        return ((high << np.uint64(27)) + low).astype(np.float64) / float(1 << 53)
+    
+    def skipDoubles(self, n):
+        """
+        跳过接下来n次nextDouble()，状态与连续调用n次相同
+        
+        Args:
+            n: 跳过的随机数个数
+        """
+        if n <= 0:
+            return
+        a, c = self._jump_table(2 * n)
+        self.seed = (int(a[2 * n - 1]) * self.seed + int(c[2 * n - 1])) & self.mask
+    
+    def nextDoubles(self, n):
+        """
+        一次生成n个随机双精度数，结果和状态与连续调用n次nextDouble()完全相同
+        
+        Args:
+            n: 随机数个数
+            
+        Returns:
+            numpy.ndarray: 0.0到1.0之间的n个随机数
+        """
+        values = self.peekDoubles(n)
+        self.skipDoubles(n)
+        return values
+    
     # 为了方便使用，提供一些Python风格的别名
     def random(self):
         """
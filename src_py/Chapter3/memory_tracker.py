@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模拟循环的内存分析模块
+
+模型在每个周期结束时调用 tracker.sample(周期)，在每次运行（重复）结束时调用
+tracker.end_replicate()。启用后（启用时开始tracemalloc跟踪）每个周期记录
+tracemalloc跟踪的当前字节数和本次运行中的峰值以及进程当前的RSS；每隔 class_every
+个周期和每次运行结束时，另外统计各模型类（Firm、Product、Molecule、Memory、
+Statistics等）存活的对象数和字节数（需要遍历所有对象，比较慢）。
+
+某个类的字节数是其实例本身、实例字典以及直接属于它的容器（list、dict、set、
+tuple、ndarray）和其中的数值所占的字节（近似值：被多个对象共享的数值会被重复计算，
+解释器缓存的小整数和布尔值不计）；
+容器中引用的其他模型对象计入各自的类。统计前先回收循环垃圾，因此上一次运行
+留下的对象只有在仍被引用时才会出现。未启用时 sample 直接返回，不影响模拟速度。
+
+结果可以导出为：
+    CSV   - 每次采样一行（运行、周期、tracemalloc、RSS、各类的对象数和字节数）
+    JSON  - 每次运行的峰值和增长、各类的最终大小，以及运行结束时的内存随运行次数的增长
+"""
+
+import os
+import gc
+import sys
+import json
+import tracemalloc
+
+_CONTAINERS = (list, dict, set, tuple)
+_SCALARS = (float, int, complex)
+
+
+def current_rss():
+    """
+    进程当前的RSS（字节），无法读取 /proc 时返回进程的最大RSS，
+    两者都不可用时（例如Windows上没有 resource 模块）返回0
+    """
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        # resource 只在Unix上可用，只在需要时导入，使模型在其他平台上也能导入
+        import resource
+    except ImportError:
+        return 0
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _scalar_size(value):
+    """数值对象的字节数，解释器共享的小整数和布尔值不计"""
+    if type(value) is bool or (type(value) is int and -5 <= value <= 256):
+        return 0
+    return sys.getsizeof(value)
+
+
+def _attribute_values(obj):
+    """对象的属性值（实例字典和 __slots__）"""
+    values = list(getattr(obj, "__dict__", {}).values())
+    for cls in type(obj).__mro__:
+        for slot in cls.__dict__.get("__slots__", ()):
+            if slot not in ("__dict__", "__weakref__"):
+                try:
+                    values.append(getattr(obj, slot))
+                except AttributeError:
+                    pass
+    return values
+
+
+def owned_size(obj):
+    """
+    对象本身及其直接拥有的容器和数值的字节数
+
+    Args:
+        obj: 模型对象
+
+    Returns:
+        int: 字节数
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    for value in _attribute_values(obj):
+        if isinstance(value, _SCALARS):
+            size += _scalar_size(value)
+        elif isinstance(value, _CONTAINERS):
+            size += sys.getsizeof(value)
+            items = value.values() if isinstance(value, dict) else value
+            # 容器中的元素通常类型相同：按第一个元素判断是否为数值
+            first = next(iter(items), None)
+            if isinstance(first, _SCALARS):
+                size += sum(map(_scalar_size, items))
+        elif hasattr(value, "nbytes"):
+            size += sys.getsizeof(value)
+    return size
+
+
+class MemoryTracker:
+
+    def __init__(self, name="model", classes=(), enabled=False, class_every=10):
+        """
+        Args:
+            name: 模型名称
+            classes: 需要统计的模型类
+            enabled: 是否启用内存分析
+            class_every: 每隔多少个周期统计一次各类的对象
+        """
+        self.name = name
+        self.classes = {cls: cls.__name__ for cls in classes}
+        self.class_every = max(1, int(class_every))
+        self.enabled = False
+        self.started_tracing = False
+        self.reset()
+        self.enable(enabled)
+
+    def enable(self, enabled=True):
+        """启用（或关闭）内存分析，启用时开始tracemalloc跟踪"""
+        self.enabled = enabled
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        elif not enabled and self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def reset(self):
+        """清空已记录的结果"""
+        self.replicate = 1
+        self.samples = []       # 每次采样一个字典
+        self.replicates = []    # 每次运行结束时一个字典
+        self.rss_peak = 0
+
+    def count_objects(self):
+        """
+        统计各模型类当前存活的对象
+
+        Returns:
+            dict: 类名 -> [对象数, 字节数]
+        """
+        gc.collect()
+        result = {name: [0, 0] for name in self.classes.values()}
+        for obj in gc.get_objects():
+            name = self.classes.get(type(obj))
+            if name is not None:
+                entry = result[name]
+                entry[0] += 1
+                entry[1] += owned_size(obj)
+        return result
+
+    def sample(self, period):
+        """
+        在一个周期结束时采样
+
+        Args:
+            period: 当前周期
+        """
+        if not self.enabled:
+            return
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        rss = current_rss()
+        self.rss_peak = max(self.rss_peak, rss)
+        self.samples.append({"replicate": self.replicate, "period": period, "traced_bytes": traced,
+                             "traced_peak_bytes": traced_peak, "rss_bytes": rss,
+                             "classes": self.count_objects() if period % self.class_every == 0 else None})
+
+    def end_replicate(self):
+        """标记一次运行结束，记录本次运行的峰值和增长，并开始下一次运行的峰值统计"""
+        if not self.enabled:
+            return
+        samples = [s for s in self.samples if s["replicate"] == self.replicate]
+        _, traced_peak = tracemalloc.get_traced_memory()
+        rss = current_rss()
+        counted = [s["classes"] for s in samples if s["classes"] is not None]
+        last = self.count_objects()     # 其中的 gc.collect() 也使下面的字节数不含循环垃圾
+        traced = tracemalloc.get_traced_memory()[0]
+        first = counted[0] if counted else last
+        self.replicates.append({
+            "replicate": self.replicate,
+            "traced_bytes": traced,
+            "traced_peak_bytes": traced_peak,
+            "rss_bytes": rss,
+            "rss_peak_bytes": max(self.rss_peak, rss),
+            "growth_bytes": samples[-1]["traced_bytes"] - samples[0]["traced_bytes"] if samples else 0,
+            "classes": {name: {"objects": last[name][0], "bytes": last[name][1],
+                               "growth_bytes": last[name][1] - first[name][1]}
+                        for name in self.classes.values()},
+        })
+        self.replicate += 1
+        self.rss_peak = 0
+        tracemalloc.reset_peak()
+
+    def summary(self):
+        """
+        汇总
+
+        Returns:
+            dict: 峰值、每次运行的记录，以及运行结束时tracemalloc字节数随运行次数的增长
+            （从第一次到最后一次运行结束平均每次的增加量，持续为正说明运行之间有对象没有释放）
+        """
+        ends = [r["traced_bytes"] for r in self.replicates]
+        leak = (ends[-1] - ends[0]) / (len(ends) - 1) if len(ends) > 1 else 0.0
+        return {"model": self.name,
+                "class_every": self.class_every,
+                "replicates": len(self.replicates),
+                "traced_peak_bytes": max((r["traced_peak_bytes"] for r in self.replicates), default=0),
+                "rss_peak_bytes": max((r["rss_peak_bytes"] for r in self.replicates), default=0),
+                "growth_per_replicate_bytes": leak,
+                "per_replicate": self.replicates}
+
+    def write_csv(self, path):
+        """
+        每次采样一行：replicate,period,traced_bytes,traced_peak_bytes,rss_bytes，
+        然后是每个类的 <类>_objects,<类>_bytes（没有统计各类对象的周期为空）
+
+        Args:
+            path: 输出文件路径
+        """
+        names = list(self.classes.values())
+        header = ["replicate", "period", "traced_bytes", "traced_peak_bytes", "rss_bytes"]
+        header += [f"{name}_{column}" for name in names for column in ("objects", "bytes")]
+        lines = [",".join(header) + "\n"]
+        for s in self.samples:
+            row = [s["replicate"], s["period"], s["traced_bytes"], s["traced_peak_bytes"], s["rss_bytes"]]
+            for name in names:
+                row += s["classes"][name] if s["classes"] is not None else ["", ""]
+            lines.append(",".join(map(str, row)) + "\n")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("".join(lines))
+
+    def write_json(self, path):
+        """
+        汇总写入JSON
+
+        Args:
+            path: 输出文件路径
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=1)
+
+    def write(self, path_base):
+        """
+        写入 path_base.csv 和 path_base.json
+
+        Args:
+            path_base: 输出路径（不含扩展名）
+        """
+        try:
+            os.makedirs(os.path.dirname(path_base) or ".", exist_ok=True)
+            self.write_csv(path_base + ".csv")
+            self.write_json(path_base + ".json")
+        except Exception as e:
+            print(f"Error writing memory profile: {e}")
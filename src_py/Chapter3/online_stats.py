@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多次模拟的在线统计模块
+
+对每个时间序列逐次运行累计均值、方差（Welford算法）、最小值/最大值，以及用P²算法
+（Jain & Chlamtac, 1985）估计的分位数，内存占用与运行次数无关。所有周期一起向量化
+更新：每个序列的状态是若干长度为周期数的数组。
+
+不同进程中的累计器可以用merge合并：均值、方差、最小值和最大值的合并是精确的
+（Chan等人的并行算法）；P²分位数不能精确合并，合并时按观测数加权平均两组标记的
+高度并相加标记位置，得到近似值。
+"""
+
+import math
+from statistics import NormalDist
+import numpy as np
+
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+DEFAULT_LEVEL = 0.95
+
+
+class OnlineSeries:
+    """一个时间序列在各次运行之间的在线统计"""
+
+    def __init__(self, length, quantiles=DEFAULT_QUANTILES):
+        """
+        Args:
+            length: 序列长度（周期数）
+            quantiles: 需要估计的分位数
+        """
+        self.length = length
+        self.quantiles = tuple(quantiles)
+        self.count = 0
+        self.mean = np.zeros(length, dtype=np.float64)
+        self.m2 = np.zeros(length, dtype=np.float64)       # 离差平方和
+        self.min = np.full(length, np.inf, dtype=np.float64)
+        self.max = np.full(length, -np.inf, dtype=np.float64)
+
+        # P²状态：前5次观测直接保存，之后每个分位数维护5个标记的高度和位置
+        self.initial = np.zeros((5, length), dtype=np.float64)
+        self.heights = np.zeros((len(self.quantiles), 5, length), dtype=np.float64)
+        self.positions = np.zeros((len(self.quantiles), 5, length), dtype=np.float64)
+        self.increments = np.array([[0.0, p / 2.0, p, (1.0 + p) / 2.0, 1.0] for p in self.quantiles])
+
+    def update(self, values):
+        """
+        加入一次运行的序列
+
+        Args:
+            values: 长度为length的数组
+        """
+        x = np.asarray(values, dtype=np.float64)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        np.minimum(self.min, x, out=self.min)
+        np.maximum(self.max, x, out=self.max)
+        self._update_quantiles(x, self.count)
+
+    def _update_quantiles(self, x, count):
+        """
+        P²算法的一步（count为加入x之后的观测数）
+
+        Args:
+            x: 一次运行的序列
+            count: 观测数
+        """
+        if count <= 5:
+            self.initial[count - 1] = x
+            if count == 5:
+                self._init_markers()
+            return
+
+        marker = np.arange(5)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for j in range(len(self.quantiles)):
+                q = self.heights[j]
+                n = self.positions[j]
+                np.minimum(q[0], x, out=q[0])
+                np.maximum(q[4], x, out=q[4])
+                cell = (x >= q[1]).astype(np.int64) + (x >= q[2]) + (x >= q[3])
+                n += marker > cell
+                desired = 1.0 + (count - 1) * self.increments[j][:, None]
+
+                for i in range(1, 4):
+                    d = desired[i] - n[i]
+                    move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+                    if not move.any():
+                        continue
+                    s = np.sign(d)
+                    parabolic = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                        (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                        + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                    neighbour = np.where(s > 0, q[i + 1], q[i - 1])
+                    neighbour_pos = np.where(s > 0, n[i + 1], n[i - 1])
+                    linear = q[i] + s * (neighbour - q[i]) / (neighbour_pos - n[i])
+                    adjusted = np.where((q[i - 1] < parabolic) & (parabolic < q[i + 1]), parabolic, linear)
+                    q[i] = np.where(move, adjusted, q[i])
+                    n[i] = np.where(move, n[i] + s, n[i])
+
+    def _init_markers(self):
+        """用前5次观测初始化P²标记"""
+        ordered = np.sort(self.initial, axis=0)
+        for j in range(len(self.quantiles)):
+            self.heights[j] = ordered
+            self.positions[j] = np.arange(1, 6, dtype=np.float64)[:, None]
+
+    def merge(self, other):
+        """
+        合并另一个累计器（例如另一个工作进程的结果）
+
+        Args:
+            other: 相同长度和分位数的OnlineSeries
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.__dict__.update(other.copy().__dict__)
+            return
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 = self.m2 + other.m2 + delta * delta * (self.count * other.count / total)
+        self.mean = self.mean + delta * (other.count / total)
+        np.minimum(self.min, other.min, out=self.min)
+        np.maximum(self.max, other.max, out=self.max)
+
+        if other.count < 5:
+            # 另一方仍处于初始阶段：逐个加入它保存的观测
+            for k in range(other.count):
+                self._update_quantiles(other.initial[k], self.count + k + 1)
+        elif self.count < 5:
+            own = self.initial[:self.count].copy()
+            self.initial = other.initial.copy()
+            self.heights = other.heights.copy()
+            self.positions = other.positions.copy()
+            for k in range(len(own)):
+                self._update_quantiles(own[k], other.count + k + 1)
+        else:
+            weight = self.count / total
+            self.heights = weight * self.heights + (1.0 - weight) * other.heights
+            self.positions = self.positions + other.positions
+            self.heights[:, 0] = self.min
+            self.heights[:, 4] = self.max
+            self.positions[:, 0] = 1.0
+            self.positions[:, 4] = total
+        self.count = total
+
+    def copy(self):
+        """返回一个独立的副本"""
+        result = OnlineSeries(self.length, self.quantiles)
+        result.load_state(self.state())
+        return result
+
+    def variance(self):
+        """样本方差（少于2次运行时为0）"""
+        if self.count < 2:
+            return np.zeros(self.length, dtype=np.float64)
+        return self.m2 / (self.count - 1)
+
+    def std(self):
+        """样本标准差"""
+        return np.sqrt(self.variance())
+
+    def confidence_band(self, level=DEFAULT_LEVEL):
+        """
+        均值的置信区间（正态近似）
+
+        Args:
+            level: 置信水平
+
+        Returns:
+            tuple: (下限数组, 上限数组)
+        """
+        z = NormalDist().inv_cdf(0.5 + level / 2.0)
+        half = z * self.std() / math.sqrt(max(self.count, 1))
+        return self.mean - half, self.mean + half
+
+    def quantile(self, p):
+        """
+        分位数估计
+
+        Args:
+            p: 分位数，必须是构造时给出的分位数之一
+
+        Returns:
+            numpy.ndarray: 各周期的分位数估计
+        """
+        j = self.quantiles.index(p)
+        if self.count == 0:
+            return np.full(self.length, np.nan)
+        if self.count < 5:
+            return np.quantile(self.initial[:self.count], p, axis=0)
+        return self.heights[j, 2].copy()
+
+    def state(self):
+        """
+        可JSON序列化的状态（用于检查点和进程间传递）
+
+        Returns:
+            dict: 状态
+        """
+        return {
+            "count": self.count,
+            "quantiles": list(self.quantiles),
+            "mean": self.mean.tolist(),
+            "m2": self.m2.tolist(),
+            "min": self.min.tolist(),
+            "max": self.max.tolist(),
+            "initial": self.initial.tolist(),
+            "heights": self.heights.tolist(),
+            "positions": self.positions.tolist(),
+        }
+
+    def load_state(self, state):
+        """
+        从state方法的结果恢复
+
+        Args:
+            state: 状态字典
+        """
+        self.count = int(state["count"])
+        self.quantiles = tuple(state["quantiles"])
+        for name in ("mean", "m2", "min", "max", "initial", "heights", "positions"):
+            setattr(self, name, np.asarray(state[name], dtype=np.float64))
+        self.length = len(self.mean)
+        self.increments = np.array([[0.0, p / 2.0, p, (1.0 + p) / 2.0, 1.0] for p in self.quantiles])
+
+
+class OnlineStatistics:
+    """多个命名时间序列的在线统计"""
+
+    def __init__(self, names, length, quantiles=DEFAULT_QUANTILES):
+        """
+        Args:
+            names: 序列名称
+            length: 序列长度（周期数）
+            quantiles: 需要估计的分位数
+        """
+        self.series = {name: OnlineSeries(length, quantiles) for name in names}
+
+    def update(self, name, values):
+        """加入某个序列一次运行的取值"""
+        self.series[name].update(values)
+
+    def merge(self, other):
+        """
+        合并另一个OnlineStatistics（序列名称相同）
+
+        Args:
+            other: OnlineStatistics对象
+        """
+        for name, series in other.series.items():
+            self.series[name].merge(series)
+
+    def summary(self, name, level=DEFAULT_LEVEL):
+        """
+        某个序列的汇总统计
+
+        Args:
+            name: 序列名称
+            level: 置信区间的置信水平
+
+        Returns:
+            list: (标签, 数组) 列表，依次为均值、标准差、置信区间上下限、最小值、最大值和各分位数
+        """
+        s = self.series[name]
+        low, high = s.confidence_band(level)
+        rows = [("mean", s.mean), ("sd", s.std()), (f"ci{level * 100:g} low", low), (f"ci{level * 100:g} high", high),
+                ("min", s.min), ("max", s.max)]
+        for p in s.quantiles:
+            rows.append((f"q{p:g}", s.quantile(p)))
+        return rows
+
+    def state(self):
+        """可JSON序列化的状态"""
+        return {name: series.state() for name, series in self.series.items()}
+
+    def load_state(self, state):
+        """从state方法的结果恢复"""
+        for name, series_state in state.items():
+            self.series[name].load_state(series_state)
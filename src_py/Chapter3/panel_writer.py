@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+列式输出模块 - 将单次模拟的企业面板数据保存为二进制列式格式
+
+面板数据按(周期, 企业)排列：第t行对应第t+1期，第f列对应第f+1家企业，
+尚未进入的企业用NaN（字符串序列用空字符串）填充。支持的格式：
+    npz     - 所有序列保存在一个 .npz 文件中
+    npy     - 每个序列一个 .npy 文件，可用 np.load(..., mmap_mode='r') 零拷贝读取
+    parquet - (period, firm) 长表，每个面板序列一列，需要安装pyarrow
+"""
+
+import os
+import numpy as np
+
+PANEL_FORMATS = ("npz", "npy", "parquet")
+
+
+def panel_to_matrix(rows):
+    """
+    将按周期存储的不等长列表转换为(周期, 企业)矩阵
+
+    Args:
+        rows: 列表的列表，rows[t] 为第t+1期各企业的取值
+
+    Returns:
+        numpy.ndarray: 数值序列为float64矩阵（NaN填充），字符串序列为unicode矩阵
+    """
+    num_periods = len(rows)
+    num_firms = max((len(r) for r in rows), default=0)
+    is_text = any(isinstance(v, str) for r in rows for v in r[:1])
+
+    if is_text:
+        width = max((len(v) for r in rows for v in r), default=1)
+        matrix = np.full((num_periods, num_firms), "", dtype=f"<U{width}")
+    else:
+        matrix = np.full((num_periods, num_firms), np.nan, dtype=np.float64)
+
+    for t, r in enumerate(rows):
+        if r:
+            matrix[t, :len(r)] = r
+    return matrix
+
+
+def write_panels(path_base, panels, series=None, fmt="npz"):
+    """
+    以列式二进制格式保存面板数据和按周期的序列
+
+    Args:
+        path_base: 输出路径（不含扩展名）
+        panels: 字典，名称 -> 按周期存储的企业取值列表（见panel_to_matrix）
+        series: 字典，名称 -> 按周期的标量序列
+        fmt: 输出格式，"npz"、"npy" 或 "parquet"
+
+    Returns:
+        str: 实际写入的路径，失败时返回None
+    """
+    if fmt not in PANEL_FORMATS:
+        print(f"Unknown panel format: {fmt}")
+        return None
+
+    series = series or {}
+    arrays = {name: panel_to_matrix(rows) for name, rows in panels.items()}
+    num_periods = max([len(m) for m in arrays.values()] + [len(s) for s in series.values()] + [0])
+    arrays["period"] = np.arange(1, num_periods + 1, dtype=np.int64)
+    for name, values in series.items():
+        arrays[name] = np.asarray(values, dtype=np.float64)
+
+    try:
+        if fmt == "npz":
+            path = path_base + ".npz"
+            np.savez(path, **arrays)
+        elif fmt == "npy":
+            path = path_base
+            os.makedirs(path, exist_ok=True)
+            for name, values in arrays.items():
+                np.save(os.path.join(path, name + ".npy"), values)
+        else:
+            path = path_base + ".parquet"
+            _write_parquet(path, arrays, list(panels))
+        return path
+    except ImportError:
+        print("pyarrow is not installed, writing npz instead")
+        return write_panels(path_base, panels, series, "npz")
+    except Exception as e:
+        print(f"Error writing panel data: {e}")
+        return None
+
+
+def _write_parquet(path, arrays, panel_names):
+    """
+    将面板数据写成(period, firm)长表的Parquet文件，只保留有取值的单元格
+
+    Args:
+        path: 输出文件路径
+        arrays: write_panels 中整理好的数组
+        panel_names: 面板序列的名称
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    num_periods = len(arrays["period"])
+    num_firms = max((arrays[n].shape[1] for n in panel_names), default=0)
+    period = np.repeat(np.arange(1, num_periods + 1, dtype=np.int64), num_firms)
+    firm = np.tile(np.arange(1, num_firms + 1, dtype=np.int64), num_periods)
+
+    present = np.zeros(num_periods * num_firms, dtype=bool)
+    columns = {}
+    for name in panel_names:
+        matrix = arrays[name]
+        full = np.full((num_periods, num_firms), "" if matrix.dtype.kind == "U" else np.nan, dtype=matrix.dtype)
+        full[:matrix.shape[0], :matrix.shape[1]] = matrix
+        values = full.ravel()
+        present |= (values != "") if matrix.dtype.kind == "U" else ~np.isnan(values)
+        columns[name] = values
+
+    table = {"period": period[present], "firm": firm[present]}
+    for name, values in columns.items():
+        table[name] = values[present]
+    pq.write_table(pa.table(table), path)
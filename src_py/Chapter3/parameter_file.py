@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+参数文件改写模块
+
+第3、4章模型在每次运行前都会重新读取参数文件（import_parameters），运行次数、
+敏感性分析的组合数和周期数也来自参数文件，因此在模型上直接设置这些属性会被覆盖。
+需要改变它们（或其他参数）时，复制参数文件并替换相应的行，再把模型的
+path_parameters 指向新文件。
+"""
+
+# 参数文件中的行标签
+PERIODS = "Number of Periods (T)"
+SIMULATIONS = "Number of Simulations"
+ITERATIONS = "Number of Iterations"
+
+
+def write_parameter_file(source, path, overrides):
+    """
+    复制参数文件，并替换 overrides 中给出的行
+
+    Args:
+        source: 原参数文件路径
+        path: 新参数文件的路径
+        overrides: 字典，行标签 -> 新的取值
+
+    Returns:
+        str: 新参数文件的路径
+
+    Raises:
+        KeyError: overrides 中有参数文件里不存在的行标签
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    found = set()
+    for i, line in enumerate(lines):
+        label, _, value = line.rstrip("\n").partition(" = ")
+        if label in overrides:
+            # 保留敏感性分析的变化幅度和类型（"12@0.1§i" 中 @ 之后的部分）
+            suffix = value[value.index("@"):] if "@" in value else ""
+            lines[i] = f"{label} = {overrides[label]}{suffix}\n"
+            found.add(label)
+    missing = [label for label in overrides if label not in found]
+    if missing:
+        raise KeyError(f"not in {source}: {', '.join(missing)}")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(lines)
+    return path
+
+
+def read_parameter(path, label):
+    """
+    读取参数文件中某一行的取值（不含敏感性分析的 @ 部分）
+
+    Args:
+        path: 参数文件路径
+        label: 行标签
+
+    Returns:
+        str: 取值，参数文件中没有这一行时为None
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            name, _, value = line.rstrip("\n").partition(" = ")
+            if name == label:
+                return value.partition("@")[0].strip()
+    return None
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+模拟循环的分阶段计时模块
+
+模型在每个周期中用 with timer.phase("名称"): 包住各个步骤（例如 rd_invest、
+innovation、market、mf.contract_engine、calc_share）。启用后记录每个阶段在每个
+周期的累计墙钟时间和调用次数，并在多次运行（重复）之间累加；未启用时 phase 返回
+一个共享的空上下文管理器，不读时钟也不分配内存。
+
+结果可以导出为：
+    CSV   - 每个(阶段, 周期)一行
+    JSON  - 每个阶段的总时间、调用次数和按周期的时间
+    .prof - 与cProfile相同的marshal格式，可用 pstats.Stats(path) 或 snakeviz 读取
+"""
+
+import os
+import json
+import time
+import marshal
+import contextlib
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+class PhaseTimer:
+
+    def __init__(self, name="model", enabled=False):
+        """
+        Args:
+            name: 模型名称（写入 .prof 文件的"文件名"字段）
+            enabled: 是否启用计时
+        """
+        self.name = name
+        self.enabled = enabled
+        self.period = 0
+        self.replicates = 0
+        self.order = []         # 阶段首次出现的顺序
+        self.totals = {}        # 阶段 -> {周期: 累计秒数}
+        self.calls = {}         # 阶段 -> {周期: 调用次数}
+
+    def enable(self, enabled=True):
+        """启用（或关闭）计时"""
+        self.enabled = enabled
+
+    def reset(self):
+        """清空已记录的结果"""
+        self.replicates = 0
+        self.order = []
+        self.totals = {}
+        self.calls = {}
+
+    def phase(self, name):
+        """
+        一个阶段的计时上下文
+
+        Args:
+            name: 阶段名称
+
+        Returns:
+            上下文管理器，未启用时为共享的空上下文
+        """
+        if not self.enabled:
+            return _NULL_PHASE
+        return _Phase(self, name)
+
+    def add(self, name, seconds):
+        """
+        记录当前周期中某个阶段的一次调用
+
+        Args:
+            name: 阶段名称
+            seconds: 墙钟时间（秒）
+        """
+        totals = self.totals.get(name)
+        if totals is None:
+            self.order.append(name)
+            totals = self.totals[name] = {}
+            self.calls[name] = {}
+        calls = self.calls[name]
+        totals[self.period] = totals.get(self.period, 0.0) + seconds
+        calls[self.period] = calls.get(self.period, 0) + 1
+
+    def end_replicate(self):
+        """标记一次运行结束（用于计算每次运行的平均时间）"""
+        if self.enabled:
+            self.replicates += 1
+
+    def summary(self):
+        """
+        各阶段的汇总
+
+        Returns:
+            list: 每个阶段一个字典（phase、calls、total_seconds、mean_seconds_per_replicate、share），
+            按总时间从大到小排列
+        """
+        grand_total = sum(sum(t.values()) for t in self.totals.values()) or 1.0
+        replicates = max(self.replicates, 1)
+        result = []
+        for name in self.order:
+            total = sum(self.totals[name].values())
+            result.append({
+                "phase": name,
+                "calls": sum(self.calls[name].values()),
+                "total_seconds": total,
+                "mean_seconds_per_replicate": total / replicates,
+                "share": total / grand_total,
+            })
+        result.sort(key=lambda r: r["total_seconds"], reverse=True)
+        return result
+
+    def write_csv(self, path):
+        """
+        每个(阶段, 周期)一行：phase,period,calls,total_seconds,mean_seconds_per_replicate
+
+        Args:
+            path: 输出文件路径
+        """
+        replicates = max(self.replicates, 1)
+        lines = ["phase,period,calls,total_seconds,mean_seconds_per_replicate\n"]
+        for name in self.order:
+            calls = self.calls[name]
+            for period, total in sorted(self.totals[name].items()):
+                lines.append(f"{name},{period},{calls[period]},{total:.9f},{total / replicates:.9f}\n")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("".join(lines))
+
+    def write_json(self, path):
+        """
+        各阶段的汇总以及按周期的时间和调用次数
+
+        Args:
+            path: 输出文件路径
+        """
+        per_period = {name: {"seconds": {str(p): s for p, s in sorted(self.totals[name].items())},
+                             "calls": {str(p): c for p, c in sorted(self.calls[name].items())}}
+                      for name in self.order}
+        report = {"model": self.name, "replicates": self.replicates,
+                  "phases": self.summary(), "per_period": per_period}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=1)
+
+    def write_pstats(self, path):
+        """
+        以cProfile的格式写入各阶段的统计（每个阶段作为一个"函数"，文件名字段为模型名称），
+        可用 pstats.Stats(path).sort_stats("cumulative").print_stats() 查看
+
+        Args:
+            path: 输出文件路径
+        """
+        stats = {}
+        for name in self.order:
+            calls = sum(self.calls[name].values())
+            total = sum(self.totals[name].values())
+            stats[(self.name, 0, name)] = (calls, calls, total, total, {})
+        with open(path, 'wb') as f:
+            marshal.dump(stats, f)
+
+    def write(self, path_base):
+        """
+        写入 path_base.csv、path_base.json 和 path_base.prof
+
+        Args:
+            path_base: 输出路径（不含扩展名）
+        """
+        try:
+            os.makedirs(os.path.dirname(path_base) or ".", exist_ok=True)
+            self.write_csv(path_base + ".csv")
+            self.write_json(path_base + ".json")
+            self.write_pstats(path_base + ".prof")
+        except Exception as e:
+            print(f"Error writing phase timing: {e}")
+
+
+class _Phase:
+    """PhaseTimer.phase 返回的计时上下文"""
+
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+按内容寻址的单次运行结果缓存
+
+多次模拟（以及敏感性分析中每个参数组合的多次模拟）的每次运行完全由模型代码、
+参数取值、随机种子、运行序号和周期数决定。缓存以这些内容的SHA-256为键，把一次
+运行的各统计序列（未除以运行次数的原始取值）保存为磁盘上的 .npy 文件；再次遇到
+相同的运行时直接读回这些序列并按原来的顺序累加，输出与重新模拟逐字节相同。
+
+模型代码的版本是相关源文件内容的哈希，修改代码后旧的缓存条目自然失效。缓存的
+总大小超过上限时按最近使用时间（命中时更新文件的修改时间）删除最久未用的条目，
+直到总大小降到上限的 EVICT_TO 倍。写入先写临时文件再用os.replace替换，多个进程
+可以共用一个缓存目录。
+"""
+
+import os
+import json
+import hashlib
+import functools
+import importlib
+import numpy as np
+
+EVICT_TO = 0.9
+ENTRY_SUFFIX = ".npy"
+
+
+@functools.lru_cache(maxsize=None)
+def source_version(*packages):
+    """
+    若干包的源代码版本
+
+    Args:
+        packages: 包名（例如 "src_py.Chapter4"）
+
+    Returns:
+        str: 包中全部 .py 文件内容的SHA-256
+    """
+    digest = hashlib.sha256()
+    for package in packages:
+        directory = os.path.dirname(importlib.import_module(package).__file__)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                digest.update(name.encode("utf-8"))
+                with open(os.path.join(directory, name), 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+def normalize_value(value):
+    """
+    参数取值的规范形式：数值统一为float的最短表示（"12"、"12.0" 和 12 相同），其他为去掉空白的字符串
+    """
+    try:
+        return repr(float(value))
+    except (TypeError, ValueError):
+        return str(value).strip()
+
+
+class ResultCache:
+
+    def __init__(self, path, max_bytes=1 << 30):
+        """
+        Args:
+            path: 缓存目录
+            max_bytes: 缓存的总大小上限（字节），None表示不限制
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.total_bytes = None     # 首次写入时统计
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(**fields):
+        """
+        缓存键
+
+        Args:
+            fields: 决定运行结果的全部内容（可JSON序列化）
+
+        Returns:
+            str: 十六进制SHA-256
+        """
+        text = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """
+        读取一次运行的结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            list: 每个统计序列一个float列表，没有缓存时返回None
+        """
+        path = self._entry_path(key)
+        try:
+            values = np.load(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return values.tolist()
+
+    def put(self, key, series):
+        """
+        保存一次运行的结果
+
+        Args:
+            key: 缓存键
+            series: 各统计序列（长度相同的数值列表）
+        """
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.asarray(series, dtype=np.float64))
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing cache entry {path}: {e}")
+            return
+        self.stored += 1
+        if self.max_bytes is None:
+            return
+        if self.total_bytes is None:
+            self.total_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self.total_bytes += size
+        if self.total_bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * EVICT_TO))
+
+    def _entries(self):
+        """缓存中的全部条目：(路径, 字节数, 最近使用时间)"""
+        entries = []
+        for directory in os.scandir(self.path):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, target_bytes):
+        """
+        删除最久未用的条目，直到总大小不超过 target_bytes
+
+        Args:
+            target_bytes: 目标总大小（字节）
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= target_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self.total_bytes = total
+
+    def summary(self):
+        """
+        本次运行的缓存统计
+
+        Returns:
+            dict: hits、misses、stored、evicted
+        """
+        return {"path": self.path, "hits": self.hits, "misses": self.misses,
+                "stored": self.stored, "evicted": self.evicted}
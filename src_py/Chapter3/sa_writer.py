@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+敏感性分析流式写入模块
+
+每个参数组合完成后立即把它的各行写入对应的输出文件，内存占用与组合数量无关。
+文件使用较大的写缓冲，每完成 fsync_interval 个组合执行一次 flush + fsync，
+随后原子地更新状态文件（已完成的组合数以及调用方需要的附加状态，例如随机数
+生成器状态）。中断后以 resume=True 重新打开时，各文件被截断到状态文件记录的
+行数，已完成的组合不再重复运行。
+
+open_matrix 和 load_rows 用于把结果同时保存为按组合排列的float64矩阵（可选
+memmap），恢复时从已写入的文本中读回已完成的组合。
+"""
+
+import os
+import json
+import numpy as np
+
+STATE_NAME = "sa_resume.json"
+BUFFER_SIZE = 1 << 16
+
+
+class SARowWriter:
+
+    def __init__(self, paths, state_path, fsync_interval=10, header_lines=None):
+        """
+        Args:
+            paths: 字典，名称 -> 输出文件路径，每个参数组合在每个文件中写一行
+            state_path: 状态文件路径
+            fsync_interval: 每完成多少个组合执行一次fsync并更新状态文件
+            header_lines: 字典，名称 -> 文件开头的表头行数（不计入组合行）
+        """
+        self.paths = paths
+        self.state_path = state_path
+        self.fsync_interval = max(1, int(fsync_interval))
+        self.header_lines = header_lines or {}
+        self.files = {}
+        self.completed = 0      # 已写入的组合数量
+        self.synced = 0         # 已持久化（fsync）的组合数量
+        self.extra = None       # 最近一次持久化时保存的附加状态
+        self.pending_extra = None  # 尚未持久化的附加状态
+
+    def open(self, resume=False):
+        """
+        打开所有输出文件
+
+        Args:
+            resume: 为True时从状态文件恢复，保留已完成的组合并在其后追加
+
+        Returns:
+            int: 已完成的组合数量
+        """
+        self.completed = 0
+        self.extra = None
+        if resume:
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self.completed = int(state.get("completed", 0))
+                self.extra = state.get("extra")
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Error reading {self.state_path}: {e}")
+
+        for name, path in self.paths.items():
+            try:
+                if self.completed > 0:
+                    self._truncate(path, self.completed + self.header_lines.get(name, 0))
+                    self.files[name] = open(path, 'a', encoding='utf-8', buffering=BUFFER_SIZE)
+                else:
+                    self.files[name] = open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE)
+            except Exception as e:
+                print(f"Error opening {path}: {e}")
+
+        if self.completed == 0:
+            self._remove_state()
+        self.synced = self.completed
+        return self.completed
+
+    @staticmethod
+    def _truncate(path, num_lines):
+        """
+        将文件截断到前 num_lines 行，丢弃最后一次持久化之后写入的内容
+
+        Args:
+            path: 文件路径
+            num_lines: 保留的行数
+        """
+        offset = 0
+        with open(path, 'rb') as f:
+            for _ in range(num_lines):
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    raise ValueError(f"{path} has fewer than {num_lines} complete lines")
+                offset += len(line)
+        with open(path, 'r+b') as f:
+            f.truncate(offset)
+
+    def write(self, name, text):
+        """
+        写入一个文件（带缓冲）
+
+        Args:
+            name: 文件名称
+            text: 要写入的文本
+        """
+        try:
+            self.files[name].write(text)
+        except Exception as e:
+            print(e)
+
+    def end_combination(self, extra=None):
+        """
+        标记一个参数组合的所有行已写入
+
+        Args:
+            extra: 需要与已完成组合一起保存的附加状态（可JSON序列化）
+        """
+        self.completed += 1
+        if self.completed - self.synced >= self.fsync_interval:
+            self.sync(extra)
+        else:
+            self.pending_extra = extra
+
+    def sync(self, extra=None):
+        """
+        flush并fsync所有文件，然后原子地更新状态文件
+
+        Args:
+            extra: 附加状态
+        """
+        for f in self.files.values():
+            try:
+                f.flush()
+                os.fsync(f.fileno())
+            except Exception as e:
+                print(e)
+
+        state = {"completed": self.completed, "extra": extra}
+        tmp_path = self.state_path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            print(f"Error writing {self.state_path}: {e}")
+        self.synced = self.completed
+        self.extra = extra
+
+    def close(self):
+        """持久化剩余的组合并关闭所有文件"""
+        if self.completed > self.synced:
+            self.sync(self.pending_extra)
+        for f in self.files.values():
+            try:
+                f.close()
+            except Exception as e:
+                print(e)
+        self.files = {}
+
+    def _remove_state(self):
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(e)
+
+
+def open_matrix(path, shape, memmap=False):
+    """
+    分配保存敏感性分析结果的float64矩阵（每个参数组合一行），初始值为NaN
+
+    Args:
+        path: memmap为True时使用的 .npy 文件路径
+        shape: (参数组合数, 周期数+1)
+        memmap: 为True时矩阵保存在磁盘上的 .npy 文件中（np.load(path, mmap_mode='r') 可直接读取）
+
+    Returns:
+        numpy.ndarray: 矩阵（或numpy.memmap）
+    """
+    if memmap:
+        try:
+            matrix = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=shape)
+            matrix[:] = np.nan
+            return matrix
+        except Exception as e:
+            print(f"Error creating {path}: {e}, keeping the matrix in memory")
+    return np.full(shape, np.nan, dtype=np.float64)
+
+
+def load_rows(path, num_rows, sep, skip=0):
+    """
+    读取已写入文本文件的前 num_rows 行数值（用于恢复中断的敏感性分析）
+
+    Args:
+        path: 文本文件路径
+        num_rows: 读取的行数
+        sep: 分隔符
+        skip: 每行开头跳过的字段数（例如组合编号）
+
+    Returns:
+        list: 每行的float列表，空字段为NaN
+    """
+    rows = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for _ in range(num_rows):
+            fields = f.readline().rstrip("\n").split(sep)[skip:]
+            if fields and fields[-1] == "":
+                fields = fields[:-1]
+            rows.append([float(v) if v != "" else np.nan for v in fields])
+    return rows
@@ -4,6 +4,9 @@
 import os
 import io
 import numpy as np
+from .panel_writer import write_panels
+from .online_stats import OnlineStatistics
+from .text_rows import row, table, panel
 
 """
 @author Gianluca Capone & Davide Sgobba
@@ -15,6 +18,11 @@ multiple runs
 """
 class Statistics:
     
+    # 多次模拟中跨运行累计的统计数组（检查点保存这些数组）
+    multi_series = ("herf_LO", "herf_SUI", "enter_firms_1st_LO", "enter_firms_2nd_LO",
+                    "enter_firms_2nd_SUI", "enter_firms_3rd_SUI", "share_1st_LO", "share_2nd_LO",
+                    "share_3rd_SUI", "share_2nd_SUI", "share_best2nd_SUI")
+    
     def __init__(self, model, is_single=False):
         """
         Initialize Statistics class
@@ -74,6 +82,19 @@ class Statistics:
             self.share_3rd_SUI = np.zeros(model.end_time + 1, dtype=np.float64)
             self.share_2nd_SUI = np.zeros(model.end_time + 1, dtype=np.float64)
             self.share_best2nd_SUI = np.zeros(model.end_time + 1, dtype=np.float64)
+        
+        # 可选：各序列在运行之间的离散程度（在线累计，不保存各次运行）
+        self.dispersion = None
+        if not is_single and getattr(model, "multi_dispersion", False):
+            self.dispersion = OnlineStatistics(self.multi_series, model.end_time + 1, model.dispersion_quantiles)
+            self.run_values = np.zeros((len(self.multi_series), model.end_time + 1), dtype=np.float64)
+    
+    def __getstate__(self):
+        """Model snapshots store the data only: the output file and the model reference are dropped"""
+        state = self.__dict__.copy()
+        state["file_output"] = None
+        state["model"] = None
+        return state
     
     def close_file(self):
         """This is a method to close the output file object"""
@@ -176,195 +197,146 @@ class Statistics:
         # 提前计算除数，减少重复计算
         div_factor = 1.0 / multi_time
         
+        # 本次运行的取值，顺序与multi_series一致
+        lo = self.model.large_orgs
+        sui = self.model.small_users
+        values = (lo.herfindahl, sui.herfindahl, lo.num_of_first_gen_firms, lo.num_of_second_gen_firms,
+                  sui.num_of_second_gen_firms, sui.num_of_diversified_firms, lo.share_1st_gen, lo.share_2nd_gen,
+                  sui.share_div, sui.share_2nd_gen, sui.share_best_2nd)
+        
         # 使用高效的NumPy数组原位操作
-        self.herf_LO[timer] += self.model.large_orgs.herfindahl * div_factor
-        self.herf_SUI[timer] += self.model.small_users.herfindahl * div_factor
-        self.enter_firms_1st_LO[timer] += self.model.large_orgs.num_of_first_gen_firms * div_factor
-        self.enter_firms_2nd_LO[timer] += self.model.large_orgs.num_of_second_gen_firms * div_factor
-        self.enter_firms_2nd_SUI[timer] += self.model.small_users.num_of_second_gen_firms * div_factor
-        self.enter_firms_3rd_SUI[timer] += self.model.small_users.num_of_diversified_firms * div_factor
-        self.share_1st_LO[timer] += self.model.large_orgs.share_1st_gen * div_factor
-        self.share_2nd_LO[timer] += self.model.large_orgs.share_2nd_gen * div_factor
-        self.share_2nd_SUI[timer] += self.model.small_users.share_2nd_gen * div_factor
-        self.share_best2nd_SUI[timer] += self.model.small_users.share_best_2nd * div_factor
-        self.share_3rd_SUI[timer] += self.model.small_users.share_div * div_factor
+        for name, value in zip(self.multi_series, values):
+            getattr(self, name)[timer] += value * div_factor
+        
+        if self.dispersion is not None:
+            self.run_values[:, timer] = values
+    
+    def end_run(self):
+        """
+        This method is called at the end of each run of a multiple
+        simulation and adds the run to the dispersion statistics
+        """
+        if self.dispersion is not None:
+            for i, name in enumerate(self.multi_series):
+                self.dispersion.update(name, self.run_values[i])
+    
+    def print_dispersion_statistics(self, level=0.95):
+        """
+        This method writes the dispersion of each series across runs
+        (confidence bands of the mean, min/max and quantiles)
+        
+        Args:
+            level: confidence level of the bands
+        """
+        end = self.model.end_time + 1
+        out = ["\nDispersion across runs\n"]
+        for name in self.multi_series:
+            for label, values in self.dispersion.summary(name, level):
+                out.append(row(f"{name} {label}", values[1:end]))
+        self.print("".join(out))
     
     def print_multi_statistics(self):
         """
         This method writes data in the output file in case of multiple
-        simulation
+        simulation. Each row is formatted in one go and the whole report
+        is written with a single call
         """
+        end = self.model.end_time + 1
+        out = []
+        
         # Herfindahl indices
-        self.print("Herfindahl in PC and mainframe markets\n")
-        self.print("MF;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.herf_LO[t]};")
-        self.print("\n")
-        self.print("PC;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.herf_SUI[t]};")
-        self.print("\n")
+        out.append("Herfindahl in PC and mainframe markets\n")
+        out.append(row("MF", self.herf_LO[1:end]))
+        out.append(row("PC", self.herf_SUI[1:end]))
         
         # Mainframe market firms
-        self.print("\nNumber of firms in mainframe market\n")
-        self.print("1st gen firms;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.enter_firms_1st_LO[t]};")
-        self.print("\n")
-        self.print("2nd gen firms;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.enter_firms_2nd_LO[t]};")
-        self.print("\n")
-        self.print("Total number;")
-        
-        # 使用NumPy向量化操作加速计算
-        if isinstance(self.enter_firms_1st_LO, np.ndarray) and isinstance(self.enter_firms_2nd_LO, np.ndarray):
-            # 使用NumPy的矢量化操作一次计算所有总数
-            total_mf = self.enter_firms_1st_LO[1:self.model.end_time+1] + self.enter_firms_2nd_LO[1:self.model.end_time+1]
-            for t in range(self.model.end_time):
-                self.print(f"{total_mf[t]};")
-        else:
-            # 如果不是NumPy数组，则使用循环计算
-            for t in range(1, self.model.end_time + 1):
-                total_mf = self.enter_firms_1st_LO[t] + self.enter_firms_2nd_LO[t]
-                self.print(f"{total_mf};")
-        
-        self.print("\n")
+        out.append("\nNumber of firms in mainframe market\n")
+        out.append(row("1st gen firms", self.enter_firms_1st_LO[1:end]))
+        out.append(row("2nd gen firms", self.enter_firms_2nd_LO[1:end]))
+        out.append(row("Total number", np.add(self.enter_firms_1st_LO[1:end], self.enter_firms_2nd_LO[1:end])))
         
         # PC market firms
-        self.print("\nNumber of firms in PC market\n")
-        self.print("MP start-ups;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.enter_firms_2nd_SUI[t]};")
-        self.print("\n")
-        self.print("Diversified firms;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.enter_firms_3rd_SUI[t]};")
-        self.print("\n")
-        self.print("Total number;")
-        
-        # 使用NumPy向量化操作加速计算
-        if isinstance(self.enter_firms_2nd_SUI, np.ndarray) and isinstance(self.enter_firms_3rd_SUI, np.ndarray):
-            # 使用NumPy的矢量化操作一次计算所有总数
-            total_pc = self.enter_firms_2nd_SUI[1:self.model.end_time+1] + self.enter_firms_3rd_SUI[1:self.model.end_time+1]
-            for t in range(self.model.end_time):
-                self.print(f"{total_pc[t]};")
-        else:
-            # 如果不是NumPy数组，则使用循环计算
-            for t in range(1, self.model.end_time + 1):
-                total_pc = self.enter_firms_2nd_SUI[t] + self.enter_firms_3rd_SUI[t]
-                self.print(f"{total_pc};")
-                
-        self.print("\n")
+        out.append("\nNumber of firms in PC market\n")
+        out.append(row("MP start-ups", self.enter_firms_2nd_SUI[1:end]))
+        out.append(row("Diversified firms", self.enter_firms_3rd_SUI[1:end]))
+        out.append(row("Total number", np.add(self.enter_firms_2nd_SUI[1:end], self.enter_firms_3rd_SUI[1:end])))
         
         # PC market share
-        self.print("\nMarket share in PC market\n")
-        self.print("Total MP start-ups;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.share_2nd_SUI[t]};")
-        self.print("\n")
-        self.print("Diversified firms;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.share_3rd_SUI[t]};")
-        self.print("\n")
-        self.print("Best MP start-up;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.share_best2nd_SUI[t]};")
-        self.print("\n")
+        out.append("\nMarket share in PC market\n")
+        out.append(row("Total MP start-ups", self.share_2nd_SUI[1:end]))
+        out.append(row("Diversified firms", self.share_3rd_SUI[1:end]))
+        out.append(row("Best MP start-up", self.share_best2nd_SUI[1:end]))
         
         # Mainframe market share
-        self.print("\nMarket share in Mainframe market\n")
-        self.print("1st gen firms;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.share_1st_LO[t]};")
-        self.print("\n")
-        self.print("2nd gen firms;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.share_2nd_LO[t]};")
-        self.print("\n")
+        out.append("\nMarket share in Mainframe market\n")
+        out.append(row("1st gen firms", self.share_1st_LO[1:end]))
+        out.append(row("2nd gen firms", self.share_2nd_LO[1:end]))
+        
+        self.print("".join(out))
     
     def print_single_statistics(self):
         """
         This method writes data in the output file in case of single
-        simulation
+        simulation. Each row is formatted in one go and the whole report
+        is written with a single call
         """
+        end_time = self.model.end_time
+        out = []
+        
         # Main statistics
-        self.print("Main Statistics\n\n")
-        self.print("T;HLO;F1stLO;F2ndLO;S1stLO;S2ndLO;HSUI;F2ndSUI;F3rdSUI;S2ndSUI;S3rdSUI;SB2ndSUI\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            self.print(f"{self.herf_LO[t-1]};")
-            self.print(f"{self.enter_firms_1st_LO[t-1]};")
-            self.print(f"{self.enter_firms_2nd_LO[t-1]};")
-            self.print(f"{self.share_1st_LO[t-1]};")
-            self.print(f"{self.share_2nd_LO[t-1]};")
-            self.print(f"{self.herf_SUI[t-1]};")
-            self.print(f"{self.enter_firms_2nd_SUI[t-1]};")
-            self.print(f"{self.enter_firms_3rd_SUI[t-1]};")
-            self.print(f"{self.share_2nd_SUI[t-1]};")
-            self.print(f"{self.share_3rd_SUI[t-1]};")
-            self.print(f"{self.share_best2nd_SUI[t-1]}\n")
+        out.append("Main Statistics\n\n")
+        out.append("T;HLO;F1stLO;F2ndLO;S1stLO;S2ndLO;HSUI;F2ndSUI;F3rdSUI;S2ndSUI;S3rdSUI;SB2ndSUI\n")
+        columns = [self.herf_LO, self.enter_firms_1st_LO, self.enter_firms_2nd_LO, self.share_1st_LO,
+                   self.share_2nd_LO, self.herf_SUI, self.enter_firms_2nd_SUI, self.enter_firms_3rd_SUI,
+                   self.share_2nd_SUI, self.share_3rd_SUI, self.share_best2nd_SUI]
+        out.append(table([c[:end_time] for c in columns], range(1, end_time + 1)))
         
-        # Computer Firm MOD
-        self.print("\nComputerFirm MOD\n")
-        self.print("FIRM;")
-        for f in range(1, len(self.single_mod[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod[self.model.end_time-1]) + 1):
-            self.print(f"{self.single_served_user_class[self.model.end_time-1][f-1]};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_mod[t-1]) + 1):
-                self.print(f"{self.single_mod[t-1][f-1]};")
-            self.print("\n")
+        # Firm data: the user class row always has as many cells as the MOD panel
+        num_firms = len(self.single_mod[end_time-1])
+        served = self.single_served_user_class[end_time-1][:num_firms]
+        sections = (("\nComputerFirm MOD\n", self.single_mod),
+                    ("\nComputerFirm SHARE \n", self.single_share),
+                    ("\nComputerFirms Cheapness \n", self.single_cheapness),
+                    ("\nComputerFirms Performance \n", self.single_performance))
+        for title, data in sections:
+            out.append(title)
+            out.append(row("FIRM", range(1, len(data[end_time-1]) + 1)))
+            out.append(row("T", served))
+            out.append(panel(data[:end_time]))
         
-        # Computer Firm SHARE
-        self.print("\nComputerFirm SHARE \n")
-        self.print("FIRM;")
-        for f in range(1, len(self.single_share[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod[self.model.end_time-1]) + 1):
-            self.print(f"{self.single_served_user_class[self.model.end_time-1][f-1]};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_share[t-1]) + 1):
-                self.print(f"{self.single_share[t-1][f-1]};")
-            self.print("\n")
+        self.print("".join(out))
+    
+    def print_single_panels(self, fmt="npz", name="singleSimulation"):
+        """
+        This method writes the data of a single simulation in a columnar
+        binary format (see panel_writer), with firm data laid out as
+        (period, firm) matrices
         
-        # Computer Firms Cheapness
-        self.print("\nComputerFirms Cheapness \n")
-        self.print("FIRM;")
-        for f in range(1, len(self.single_cheapness[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod[self.model.end_time-1]) + 1):
-            self.print(f"{self.single_served_user_class[self.model.end_time-1][f-1]};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_cheapness[t-1]) + 1):
-                self.print(f"{self.single_cheapness[t-1][f-1]};")
-            self.print("\n")
+        Args:
+            fmt: "npz", "npy" or "parquet"
+            name: output file name without extension
         
-        # Computer Firms Performance
-        self.print("\nComputerFirms Performance \n")
-        self.print("FIRM;")
-        for f in range(1, len(self.single_performance[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod[self.model.end_time-1]) + 1):
-            self.print(f"{self.single_served_user_class[self.model.end_time-1][f-1]};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_performance[t-1]) + 1):
-                self.print(f"{self.single_performance[t-1][f-1]};")
-            self.print("\n") 
\ No newline at end of file
+        Returns:
+            str: path written, or None on failure
+        """
+        panels = {
+            "mod": self.single_mod,
+            "share": self.single_share,
+            "cheapness": self.single_cheapness,
+            "performance": self.single_performance,
+            "served_user_class": self.single_served_user_class,
+        }
+        series = {
+            "HLO": self.herf_LO,
+            "F1stLO": self.enter_firms_1st_LO,
+            "F2ndLO": self.enter_firms_2nd_LO,
+            "S1stLO": self.share_1st_LO,
+            "S2ndLO": self.share_2nd_LO,
+            "HSUI": self.herf_SUI,
+            "F2ndSUI": self.enter_firms_2nd_SUI,
+            "F3rdSUI": self.enter_firms_3rd_SUI,
+            "S2ndSUI": self.share_2nd_SUI,
+            "S3rdSUI": self.share_3rd_SUI,
+            "SB2ndSUI": self.share_best2nd_SUI,
+        }
+        return write_panels(os.path.join(self.model.path_results, name), panels, series, fmt)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文本输出的行格式化模块
+
+把整行（或整段）数据一次格式化为字符串，由调用方一次写入文件，取代每个取值
+单独写入一次。每个取值都用 str() 格式化，与 f"{v};" 的结果逐字节相同：
+numpy数组先用 tolist() 转换为Python数值，float64的字符串表示不变。
+"""
+
+import numpy as np
+
+
+def cells(values, sep=";"):
+    """
+    将一组取值格式化为 "v1;v2;...;vn;"（每个取值后面都有分隔符）
+
+    Args:
+        values: 列表或numpy数组
+        sep: 分隔符
+
+    Returns:
+        str: 格式化后的字符串，没有取值时为空字符串
+    """
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    if len(values) == 0:
+        return ""
+    return sep.join(map(str, values)) + sep
+
+
+def row(label, values, sep=";"):
+    """
+    格式化一行 "label;v1;v2;...;vn;\\n"
+
+    Args:
+        label: 行首的标签
+        values: 列表或numpy数组
+        sep: 分隔符
+
+    Returns:
+        str: 以换行符结尾的一行
+    """
+    return f"{label}{sep}" + cells(values, sep) + "\n"
+
+
+def table(columns, first=None, sep=";"):
+    """
+    按列格式化一个表格，每行为 "c1;c2;...;cn\\n"（最后一个取值后没有分隔符）
+
+    Args:
+        columns: 各列的取值（列表或numpy数组），长度相同
+        first: 可选的第一列（例如周期编号）
+        sep: 分隔符
+
+    Returns:
+        str: 所有行拼接成的字符串
+    """
+    columns = [c.tolist() if isinstance(c, np.ndarray) else c for c in columns]
+    if first is not None:
+        columns = [list(first)] + columns
+    return "".join(sep.join(map(str, r)) + "\n" for r in zip(*columns))
+
+
+def panel(data, labels=None, sep=";"):
+    """
+    格式化按周期存储的企业数据，每行为 "t;v1;...;vn;\\n"，t从1开始
+
+    Args:
+        data: 列表的列表，data[t-1] 为第t期各企业的取值
+        labels: 可选的行标签，默认为周期编号
+        sep: 分隔符
+
+    Returns:
+        str: 所有行拼接成的字符串
+    """
+    if labels is None:
+        labels = range(1, len(data) + 1)
+    return "".join(row(label, values, sep) for label, values in zip(labels, data))
@@ -73,8 +73,9 @@ class UserClass:
         # 我们在这里预先生成所有随机数，确保顺序一致
         # 存储所有随机值，避免每次调用rng导致序列不同
         random_values = []
+        entry_rng = self.rng.substream("buyer_entry")
         for i in range(self.num_of_buyers):
-            random_values.append(self.rng.nextDouble())
+            random_values.append(entry_rng.nextDouble())
         
         # 使用预先生成的随机数值
         for i in range(1, self.num_of_buyers + 1):
@@ -145,7 +146,7 @@ class UserClass:
                 industry.firms[f].served_user_class is not None and 
                 industry.firms[f].served_user_class == self):
                 # 使用与原Java代码相同的方式生成高斯随机数
-                gaussian_values.append(industry.rng.nextGaussian())
+                gaussian_values.append(self.rng.substream("buyer_choice", f).nextGaussian())
         
         # 统计需要计算的企业数量以确保随机数对应
         gaussian_index = 0
@@ -194,8 +195,9 @@ class UserClass:
                 num_required_random += 1
 
         # 生成足够的随机数
+        replacement_rng = self.rng.substream("buyer_replacement")
         for i in range(num_required_random):
-            random_values.append(industry.rng.nextDouble())
+            random_values.append(replacement_rng.nextDouble())
 
         # 更新购买者状态
         random_index = 0
@@ -211,7 +213,7 @@ class UserClass:
                         random_index += 1
                     else:
                         # 如果随机数不够，就直接生成一个新的
-                        self.buyers_time_to_replace[i] = int(industry.rng.nextDouble() * self.tr_frequency * 2)
+                        self.buyers_time_to_replace[i] = int(replacement_rng.nextDouble() * self.tr_frequency * 2)
                         
                     self.buyers_time_to_entry[i] = t + 1
                     busy_buyers += 1
@@ -6,16 +6,32 @@ Chapter4包 - 转换自Java版本的Chapter4包
 这个包包含了第4章模型的Python实现
 """
 
-# 导入主要类，使它们可以从包中直接导入
-from .parameter import Parameter
-from .system_element import SystemElement
-from .component_firm import ComponentFirm
-from .component_market import ComponentMarket
-from .computer_firm import ComputerFirm
-from .computer_market import ComputerMarket
-from .end_product import EndProduct
-from .not_sold_component import NotSoldComponent
-from .sold_component import SoldComponent
-from .statistics import Statistics
-from .sa_statistics import SA_Statistics
-from .c4_model import C4Model 
\ No newline at end of file
+import importlib
+
+# 主要类 -> 所在模块，使它们可以从包中直接导入（首次访问时才导入，见 __getattr__）
+_EXPORTS = {
+    "Parameter": ".parameter",
+    "SystemElement": ".system_element",
+    "ComponentFirm": ".component_firm",
+    "ComponentMarket": ".component_market",
+    "ComputerFirm": ".computer_firm",
+    "ComputerMarket": ".computer_market",
+    "EndProduct": ".end_product",
+    "NotSoldComponent": ".not_sold_component",
+    "SoldComponent": ".sold_component",
+    "Statistics": ".statistics",
+    "SA_Statistics": ".sa_statistics",
+    "C4Model": ".c4_model",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """按需导入包中的类，导入包本身不会加载模型及其依赖"""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
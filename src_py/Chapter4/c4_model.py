@@ -14,8 +14,21 @@ from .parameter import Parameter
 from .component_market import ComponentMarket
 from .computer_market import ComputerMarket
 from .statistics import Statistics
+from .computer_firm import ComputerFirm
+from .component_firm import ComponentFirm
+from .computer import Computer
+from .component import Component
+from .system_element import SystemElement
+from .sold_component import SoldComponent
+from .not_sold_component import NotSoldComponent
+from .end_product import EndProduct
 from .sa_statistics import SA_Statistics
 from .java_compatible_random import JavaCompatibleRandom
+from src_py.Chapter3.checkpoint import Checkpoint, CHECKPOINT_NAME
+from src_py.Chapter3.phase_timer import PhaseTimer
+from src_py.Chapter3.memory_tracker import MemoryTracker
+from src_py.Chapter3.result_cache import source_version, normalize_value
+from src_py.Chapter3.parameter_file import SIMULATIONS, ITERATIONS
 
 """
 @author Gianluca Capone & Davide Sgobba
@@ -46,6 +59,28 @@ class C4Model:
         
         # 确保结果目录存在
         os.makedirs(self.path_results, exist_ok=True)
+        self.sa_fsync_interval = 10  # 敏感性分析每完成多少个参数组合执行一次fsync
+        self.sa_memmap = False  # 敏感性分析结果矩阵是否保存为磁盘上的memmap (.npy)
+        self.checkpoint_interval = 10  # 多次模拟每完成多少次运行保存一次检查点
+        self.multi_dispersion = False  # 多次模拟是否同时输出各序列在运行之间的离散程度
+        self.sa_offset = 0  # 敏感性分析从第 sa_offset+1 个参数组合开始（分片并行运行时为本分片之前的组合数量）
+        self.sa_count = None  # 敏感性分析运行的参数组合数量（None表示sa_offset之后的全部组合）
+        self.result_cache = None  # 多次模拟各次运行结果的缓存（ResultCache，None表示不使用）
+        self.dispersion_quantiles = (0.05, 0.5, 0.95)  # 离散程度输出中估计的分位数
+        self.crn = False  # 共同随机数模式：各随机决策点使用各自的随机数子序列（见JavaCompatibleRandom.substream）
+        
+        # 单次模拟的输出格式：文本CSV，以及可选的列式二进制格式（"npz"、"npy"、"parquet"）
+        self.single_text_output = True
+        self.single_panel_formats = []
+        
+        # 分阶段计时（默认关闭，phase_timer.enable() 启用，结果见 write_phase_timing）
+        self.phase_timer = PhaseTimer("C4Model")
+        
+        # 内存分析（默认关闭，memory_tracker.enable() 启用，结果见 write_memory_profile）
+        self.memory_tracker = MemoryTracker("C4Model", (ComputerFirm, ComponentFirm, Computer, Component,
+                                                        SystemElement, SoldComponent, NotSoldComponent,
+                                                        EndProduct, ComputerMarket, ComponentMarket,
+                                                        Statistics))
         
         # 使用与Java完全相同的种子值，确保结果一致性
         self.rng_seed = 1000
@@ -365,12 +400,14 @@ class C4Model:
         if is_single:
             self.import_parameters(False, True)
             self.statistics = Statistics(self, True)
-            self.statistics.open_file("/singleSimulation.csv")
+            if self.single_text_output:
+                self.statistics.open_file("/singleSimulation.csv")
         else:
             self.import_parameters(False, False)
 
         # 重置随机数生成器，确保每次运行的随机性与Java版本完全一致
         self.rng = JavaCompatibleRandom(self.rng_seed)
+        self.rng.enable_substreams(self.crn)
         random.seed(self.rng_seed)
         np.random.seed(self.rng_seed)
         
@@ -534,14 +571,19 @@ class C4Model:
                         l2_cmp, l0_pc, l1_pc, l2_pc, draw_cost_pc, draw_cost_cmp,
                         self.entry_time_pc, weight_exit, exit_threshold_pc, self.rng)
             
+        phase = self.phase_timer.phase
         for self.timer in range(1, self.end_time + 1):
+            self.phase_timer.period = self.timer
+            
             if self.timer == self.entry_time_cmp[1]:
-                self.cmp_market.new_entry(self.num_of_firm_cmp, 1)
-                self.mf_market.change_cmp_technology(1)
+                with phase("new_entry"):
+                    self.cmp_market.new_entry(self.num_of_firm_cmp, 1)
+                    self.mf_market.change_cmp_technology(1)
 
             if self.timer == self.entry_time_cmp[2]:
-                self.cmp_market.new_entry(self.num_of_firm_cmp, 2)
-                self.mf_market.change_cmp_technology(2)
+                with phase("new_entry"):
+                    self.cmp_market.new_entry(self.num_of_firm_cmp, 2)
+                    self.mf_market.change_cmp_technology(2)
 
             if self.timer == self.entry_time_pc:
                 # 检查参数是否允许PC市场进入
@@ -549,63 +591,115 @@ class C4Model:
                 if pc_entered_str == "true":
                     self.pc_entry = True
                     
-            self.cmp_market.rating()
-            self.mf_market.contract_engine(self.cmp_market, self.timer, 0)
+            with phase("cmp.rating"):
+                self.cmp_market.rating()
+            with phase("mf.contract_engine"):
+                self.mf_market.contract_engine(self.cmp_market, self.timer, 0)
             if self.pc_entry:
-                self.pc_market.contract_engine(self.cmp_market, self.timer, self.num_of_firm_mf)
+                with phase("pc.contract_engine"):
+                    self.pc_market.contract_engine(self.cmp_market, self.timer, self.num_of_firm_mf)
 
-            self.mf_market.rd_expenditure()
+            with phase("mf.rd_expenditure"):
+                self.mf_market.rd_expenditure()
             if self.pc_entry:
-                self.pc_market.rd_expenditure()
-            self.cmp_market.rd_expenditure()
+                with phase("pc.rd_expenditure"):
+                    self.pc_market.rd_expenditure()
+            with phase("cmp.rd_expenditure"):
+                self.cmp_market.rd_expenditure()
             
-            self.cmp_market.mod_progress(self.timer)
-            self.mf_market.mod_component_progress(self.timer, self.cmp_market)
-            self.mf_market.mod_system_progress(self.timer)
+            with phase("cmp.mod_progress"):
+                self.cmp_market.mod_progress(self.timer)
+            with phase("mf.mod_progress"):
+                self.mf_market.mod_component_progress(self.timer, self.cmp_market)
+                self.mf_market.mod_system_progress(self.timer)
             if self.pc_entry:
-                self.pc_market.mod_component_progress(self.timer, self.cmp_market)
-                self.pc_market.mod_system_progress(self.timer)
+                with phase("pc.mod_progress"):
+                    self.pc_market.mod_component_progress(self.timer, self.cmp_market)
+                    self.pc_market.mod_system_progress(self.timer)
             
-            self.mf_market.computer_mod_cost_price()
+            with phase("mf.computer_mod_cost_price"):
+                self.mf_market.computer_mod_cost_price()
             if self.pc_entry:
-                self.pc_market.computer_mod_cost_price()
+                with phase("pc.computer_mod_cost_price"):
+                    self.pc_market.computer_mod_cost_price()
             
-            self.mf_market.prob_of_selling()
+            with phase("mf.prob_of_selling"):
+                self.mf_market.prob_of_selling()
             if self.pc_entry:
-                self.pc_market.prob_of_selling()
-            self.cmp_market.external_mkt()
+                with phase("pc.prob_of_selling"):
+                    self.pc_market.prob_of_selling()
+            with phase("cmp.external_mkt"):
+                self.cmp_market.external_mkt()
             
-            self.mf_market.accounting(self.timer)
+            with phase("mf.accounting"):
+                self.mf_market.accounting(self.timer)
             if self.pc_entry:
-                self.pc_market.accounting(self.timer)
-            self.cmp_market.accounting(self.mf_market, self.pc_market, self.pc_entry)
+                with phase("pc.accounting"):
+                    self.pc_market.accounting(self.timer)
+            with phase("cmp.accounting"):
+                self.cmp_market.accounting(self.mf_market, self.pc_market, self.pc_entry)
             
-            self.mf_market.check_exit(self.cmp_market, 0)
+            with phase("mf.check_exit"):
+                self.mf_market.check_exit(self.cmp_market, 0)
             if self.pc_entry:
-                self.pc_market.check_exit(self.cmp_market, self.num_of_firm_mf)
-            self.cmp_market.check_exit()
+                with phase("pc.check_exit"):
+                    self.pc_market.check_exit(self.cmp_market, self.num_of_firm_mf)
+            with phase("cmp.check_exit"):
+                self.cmp_market.check_exit()
             
-            self.mf_market.statistics(self.end_time)
-            if self.pc_entry:
-                self.pc_market.statistics(self.end_time)
-            self.cmp_market.statistics()
+            with phase("market_statistics"):
+                self.mf_market.statistics(self.end_time)
+                if self.pc_entry:
+                    self.pc_market.statistics(self.end_time)
+                self.cmp_market.statistics()
             
-            if is_single:
-                self.statistics.make_single_statistics()
-            else:
-                self.statistics.make_statistics()
+            with phase("statistics"):
+                if is_single:
+                    self.statistics.make_single_statistics()
+                else:
+                    self.statistics.make_statistics()
+            
+            self.memory_tracker.sample(self.timer)
+        self.phase_timer.end_replicate()
+        self.memory_tracker.end_replicate()
 
         if is_single:
-            self.statistics.print_single_statistics()
-            self.statistics.close_file()
+            if self.single_text_output:
+                self.statistics.print_single_statistics()
+                self.statistics.close_file()
+            for panel_format in self.single_panel_formats:
+                self.statistics.print_single_panels(panel_format)
+            self.write_phase_timing()
+            self.write_memory_profile()
+
+    def write_phase_timing(self, name="phase_timing"):
+        """
+        写入分阶段计时结果（name.csv、name.json 和 cProfile格式的 name.prof）
+        
+        Args:
+            name: 结果目录中的文件名（不含扩展名）
+        """
+        if self.phase_timer.enabled:
+            self.phase_timer.write(os.path.join(self.path_results, name))
+
+    def write_memory_profile(self, name="memory_profile"):
+        """
+        写入内存分析结果（name.csv 和 name.json）
+        
+        Args:
+            name: 结果目录中的文件名（不含扩展名）
+        """
+        if self.memory_tracker.enabled:
+            self.memory_tracker.write(os.path.join(self.path_results, name))
 
-    def make_multiple_simulation(self, is_multi):
+    def make_multiple_simulation(self, is_multi, resume=False):
         """
         自动化多次模拟运行的方法
         如果控制is_multi为"True"，则使用特定方法上传参数并创建输出，并显示运行次数
         
         Args:
             is_multi: 是否为多次模拟
+            resume: 是否从检查点继续中断的多次模拟（仅在is_multi为True时有效）
         """
         if is_multi:
             self.import_parameters(False, True)
@@ -617,13 +711,45 @@ class C4Model:
         # 使用基础种子，但为每次循环设置不同的随机种子
         base_seed = self.rng_seed
         
-        for multi_counter in range(1, self.multi_time + 1):
+        # 直接多次模拟时定期保存检查点。每次运行的种子只取决于运行序号，
+        # 因此检查点只需保存累计的统计数组和已完成的运行次数
+        checkpoint = None
+        completed = 0
+        if is_multi:
+            checkpoint = Checkpoint(os.path.join(self.path_results, CHECKPOINT_NAME), self.checkpoint_interval,
+                                    {"multi_time": self.multi_time, "end_time": self.end_time, "rng_seed": base_seed,
+                                     "parameters": self.parameter_values(),
+                                     "dispersion": self.multi_dispersion, "crn": self.crn})
+            state = checkpoint.load() if resume else None
+            if state is not None:
+                completed = state["completed"]
+                Checkpoint.restore(self.statistics, state["arrays"])
+                if self.statistics.dispersion is not None:
+                    self.statistics.dispersion.load_state(state["extra"])
+                print(f"从第 {completed + 1} 次运行继续多次模拟")
+        
+        for multi_counter in range(completed + 1, self.multi_time + 1):
             # 为每次模拟设置不同但确定的随机种子 - 与Java版本一致的方式
             self.rng_seed = base_seed + multi_counter
             
             if is_multi:
                 print(f"{multi_counter}")
-            self.make_single_simulation(False)
+            if self.result_cache is None:
+                self.make_single_simulation(False)
+            else:
+                # 已缓存的运行直接累加缓存的序列，否则模拟并缓存本次运行的序列
+                key = self.replicate_key(multi_counter)
+                values = self.result_cache.get(key)
+                if values is not None:
+                    self.statistics.add_run(values)
+                else:
+                    self.make_single_simulation(False)
+                    self.result_cache.put(key, self.statistics.run_series())
+            self.statistics.end_run()
+            
+            if checkpoint is not None and multi_counter < self.multi_time and checkpoint.due(multi_counter):
+                checkpoint.save(multi_counter, Checkpoint.capture(self.statistics, self.statistics.multi_series),
+                                extra=self.statistics.dispersion.state() if self.statistics.dispersion is not None else None)
         
         # 恢复基础种子
         self.rng_seed = base_seed
@@ -638,15 +764,57 @@ class C4Model:
         
         if is_multi:
             self.statistics.print_multi_statistics()
+            if self.statistics.dispersion is not None:
+                self.statistics.print_dispersion_statistics()
             self.statistics.close_file()
+            checkpoint.remove()
+            self.write_phase_timing()
+            self.write_memory_profile()
+    
+    def parameter_values(self):
+        """
+        参数取值的规范形式（不含运行次数和组合数），用于检查点和缓存键
+        
+        Returns:
+            list: 按参数文件顺序排列的取值
+        """
+        return [normalize_value(p.value) for p in self.parameters
+                if p is not None and p.name not in (SIMULATIONS, ITERATIONS)]
+    
+    def replicate_key(self, replicate):
+        """
+        多次模拟中一次运行的缓存键：模型代码版本、参数取值（不含运行次数和组合数）、
+        随机种子、运行序号、周期数以及是否使用共同随机数
+        
+        Args:
+            replicate: 运行序号
+            
+        Returns:
+            str: 缓存键
+        """
+        return self.result_cache.key(model="C4Model", version=source_version("src_py.Chapter4", "src_py.Chapter3"),
+                                     parameters=self.parameter_values(), seed=self.rng_seed, replicate=replicate,
+                                     end_time=self.end_time, crn=self.crn)
+    
+    def sa_combinations(self):
+        """
+        本次敏感性分析运行的参数组合数量
+        
+        Returns:
+            int: 参数组合数量
+        """
+        if self.sa_count is not None:
+            return self.sa_count
+        return self.multi_sens - self.sa_offset
     
-    def make_sensitivity_simulation(self, print_sens_counter):
+    def make_sensitivity_simulation(self, print_sens_counter, resume=False):
         """
         自动化敏感性分析模拟运行的方法
         如果控制print_sens_counter为"True"，则应显示敏感性运行次数
         
         Args:
             print_sens_counter: 是否打印敏感性计数器
+            resume: 是否从中断的敏感性分析继续，跳过输出中已完成的参数组合
         """
         try:
             # 保存基础随机种子
@@ -658,25 +826,34 @@ class C4Model:
             # 初始化敏感性分析统计对象
             from .sa_statistics import SA_Statistics
             self.sens = SA_Statistics(self)
-            self.sens.open_file()
+            completed = self.sens.open_file(resume)
+            if completed > 0 and print_sens_counter:
+                print(f"从第 {completed + 1} 个参数组合继续敏感性分析")
             
-            # 运行多次敏感性分析
-            for sens_counter in range(1, self.multi_sens + 1):
+            # 运行多次敏感性分析（每个组合的种子只取决于组合序号，已完成的组合可直接跳过）
+            for sens_counter in range(completed + 1, self.sa_combinations() + 1):
+                recorded = self.sens.writer.completed
                 try:
                     # 设置不同但确定的随机种子 - 确保与Java版本一致
                     # 敏感性分析种子从基础种子+1000开始，确保与多次模拟不重叠
-                    self.rng_seed = base_seed + 1000 + sens_counter
+                    self.rng_seed = base_seed + 1000 + self.sa_offset + sens_counter
                     self.rng = JavaCompatibleRandom(self.rng_seed)
                     random.seed(self.rng_seed)
                     np.random.seed(self.rng_seed)
                     
                     self.import_parameters(True, True)
+                    if self.crn:
+                        # 共同随机数模式：参数取值仍由组合的种子抽取，各组合的第k次运行使用相同的种子
+                        self.rng_seed = base_seed
                     self.make_multiple_simulation(False)
                     
                     if print_sens_counter:
-                        print(f"敏感性分析运行 {sens_counter}/{self.multi_sens}")
+                        print(f"敏感性分析运行 {self.sa_offset + sens_counter}/{self.multi_sens}")
                 except Exception as e:
                     print(f"敏感性分析第{sens_counter}次运行时出错: {e}")
+                # 出错的组合写入一行NaN，第k行（以及恢复时的已完成组合数）总是对应第k个组合
+                if self.sens.writer.completed == recorded:
+                    self.sens.skip_combination()
             
             # 恢复基础种子
             self.rng_seed = base_seed
@@ -687,6 +864,8 @@ class C4Model:
             # 打印结果并关闭文件
             self.sens.print_statistics()
             self.sens.close_file()
+            self.write_phase_timing()
+            self.write_memory_profile()
         except Exception as e:
             print(f"敏感性分析整体运行时出错: {e}")
             # 确保文件被关闭
@@ -14,6 +14,8 @@ Python转换
 """
 class Component:
     
+    __slots__ = ("mod", "mu_prog", "production_cost", "firm")
+    
     def __init__(self, mod, firm):
         """
         构造函数
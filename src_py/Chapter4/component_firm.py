@@ -16,6 +16,10 @@ Python转换
 """
 class ComponentFirm:
     
+    __slots__ = ("component_rd", "count_no_sales", "num_of_draws_cmp", "price", "profit", "share",
+                 "total_sold", "id", "t_id", "alive", "external_sold", "how_many_buyers_mf",
+                 "how_many_buyers_pc", "q_sold", "buyer_id", "component", "cmp_market")
+    
     def __init__(self, id, t_id, mod, num_of_potential_buyers, cmp_market):
         """
         构造函数
@@ -76,7 +80,8 @@ class ComponentFirm:
         remain = temp_num_of_draws - self.num_of_draws_cmp
         
         # 对于剩余部分，使用概率来决定是否增加一次创新次数
-        random_number = self.cmp_market.rng.random()
+        rng = self.cmp_market.rng.substream("CMP", "innovation", self.id)
+        random_number = rng.random()
         if random_number <= remain:
             self.num_of_draws_cmp += 1
         
@@ -97,7 +102,7 @@ class ComponentFirm:
         z_max = 0.0
         for i in range(self.num_of_draws_cmp):
             # 使用nextGaussian()方法确保与Java版本一致的随机数
-            z = self.component.mu_prog + self.cmp_market.sd_cmp[self.t_id] * self.cmp_market.rng.nextGaussian()
+            z = self.component.mu_prog + self.cmp_market.sd_cmp[self.t_id] * rng.nextGaussian()
             if z > z_max:
                 z_max = z
         
@@ -170,7 +175,7 @@ class ComponentFirm:
         """
         检查是否仍然满足留在行业的条件
         """
-        random_number = self.cmp_market.rng.random()
+        random_number = self.cmp_market.rng.substream("CMP", "exit", self.id).random()
         
         if self.q_sold == 0:
             self.count_no_sales += 1
@@ -193,10 +193,11 @@ class ComponentMarket:
                     self.firm[f].component.calc_prob_to_sell_ext(sum_pts)
             
             external_market = [0] * self.external_mkts[k]
+            rng = self.rng.substream("CMP", "external_buyers")
             for g in range(self.external_mkts[k]):
                 external_market[g] = 0
                 cumulated = 0.0
-                random_number = self.rng.random()
+                random_number = rng.random()
                 assigned = False
                 f = 1
                 
@@ -271,7 +272,7 @@ class ComponentMarket:
         """
         id_rating = 0
         cumulated = 0.0
-        random_number = self.rng.random()
+        random_number = self.rng.substream("CMP", "supplier_choice").random()
         chosen = False
         f = 1
         
@@ -14,6 +14,8 @@ Python转换
 """
 class Computer:
     
+    __slots__ = ("cheap", "mod", "mod_for_cust", "perf", "production_cost", "u", "U", "firm")
+    
     def __init__(self, firm=None):
         """
         构造函数
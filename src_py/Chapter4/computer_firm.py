@@ -16,6 +16,11 @@ Python转换
 """
 class ComputerFirm:
     
+    __slots__ = ("born", "component_rd", "contract_d", "contract_time", "exit_share", "int_time",
+                 "integrated", "num_of_draws_cmp", "num_of_draws_sys", "price", "prob_to_int", "prob_to_spec",
+                 "profit", "prop_to_int", "prop_to_spec", "q_sold", "share", "supplier_id", "system_rd", "id",
+                 "t_id", "alive", "pc", "spillover", "computer", "component", "system", "computer_market")
+    
     def __init__(self, id, pc, start_share, spillover, mod_sys, computer_market):
         """
         构造函数
@@ -86,13 +91,15 @@ class ComputerFirm:
         """
         确定公司创新活动的结果
         """
+        rng = self.computer_market.rng.substream(self.computer_market.id, "innovation", self.id)
+        
         # 计算可能的创新次数 (方程13)
         temp_num_of_draws = self.system_rd / self.computer_market.draw_cost_sys
         self.num_of_draws_sys = int(temp_num_of_draws)
         remain = temp_num_of_draws - self.num_of_draws_sys
         
         # 处理剩余部分
-        random_number = self.computer_market.rng.random()
+        random_number = rng.random()
         if random_number <= remain:
             self.num_of_draws_sys += 1
             
@@ -102,7 +109,7 @@ class ComputerFirm:
             self.num_of_draws_cmp = int(temp_num_of_draws)
             remain = temp_num_of_draws - self.num_of_draws_cmp
             
-            random_number = self.computer_market.rng.random()
+            random_number = rng.random()
             if random_number <= remain:
                 self.num_of_draws_cmp += 1
         
@@ -115,7 +122,7 @@ class ComputerFirm:
         z_max = 0.0
         for i in range(1, self.num_of_draws_sys + 1):
             # 从正态分布中抽取
-            z = self.system.mu_prog + self.computer_market.sd_sys * self.computer_market.rng.nextGaussian()
+            z = self.system.mu_prog + self.computer_market.sd_sys * rng.nextGaussian()
             if z > z_max:
                 z_max = z
                 
@@ -132,7 +139,7 @@ class ComputerFirm:
             z_max = 0.0
             for i in range(1, self.num_of_draws_cmp + 1):
                 # 从正态分布中抽取
-                z = self.component.mu_prog + self.computer_market.sd_cmp * self.computer_market.rng.nextGaussian()
+                z = self.component.mu_prog + self.computer_market.sd_cmp * rng.nextGaussian()
                 if z > z_max:
                     z_max = z
                     
@@ -244,7 +251,7 @@ class ComputerFirm:
         # 方程20
         self.exit_share = self.computer_market.weight_exit * self.share + (1 - self.computer_market.weight_exit) * self.exit_share
         
-        random_number = self.computer_market.rng.random()
+        random_number = self.computer_market.rng.substream(self.computer_market.id, "exit", self.id).random()
         if self.exit_share < self.computer_market.exit_threshold and random_number < 0.5:
             self.exit_firm()
             
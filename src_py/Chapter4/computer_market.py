@@ -256,9 +256,10 @@ class ComputerMarket:
                 self.firm[f].q_sold = 0.0
         
         # 为每组买家分配供应商
+        rng = self.rng.substream(self.id, "buyer_choice")
         for h in range(1, self.buyers + 1):
             cumulated = 0.0
-            random_number = self.rng.random()
+            random_number = rng.random()
             assigned = False
             f = 1
             
@@ -302,7 +303,7 @@ class ComputerMarket:
                                           (1 - self.weight_exit) * self.firm[f].exit_share)
                 
                 # 检查退出条件
-                random_number = self.rng.random()
+                random_number = self.rng.substream(self.id, "exit", self.firm[f].id).random()
                 if self.firm[f].exit_share < self.exit_threshold and random_number < 0.5:
                     # 如果公司是专业化的且有供应商，通知供应商取消合同
                     if not self.firm[f].integrated and self.firm[f].supplier_id != -1:
@@ -346,7 +347,7 @@ class ComputerMarket:
         """
         for f in range(1, self.num_of_firms + 1):
             if self.firm[f].alive and not self.firm[f].integrated:
-                random_number = self.rng.random()
+                random_number = self.rng.substream(self.id, "integration", self.firm[f].id).random()
                 
                 # 如果随机数小于整合概率（方程17.a），则公司整合
                 if random_number < self.firm[f].prob_to_int:
@@ -377,7 +378,7 @@ class ComputerMarket:
             if self.firm[f].alive and self.firm[f].integrated:
                 # 检查公司已经整合的时间是否超过最短整合时间
                 if self.firm[f].int_time > self.min_int_time:
-                    random_number = self.rng.random()
+                    random_number = self.rng.substream(self.id, "specialization", self.firm[f].id).random()
                     
                     # 如果随机数小于专业化概率（方程17.b），则公司专业化
                     if random_number < self.firm[f].prob_to_spec:
@@ -449,8 +450,9 @@ class ComputerMarket:
                         self.firm[f].contract_time = time
                         
                         # 随机确定合同持续时间
+                        random_number = self.rng.substream(self.id, "contract_length", self.firm[f].id).random()
                         self.firm[f].contract_d = self.min_length_contr + \
-                                                int(self.rng.random() * self.range_length_contr)
+                                                int(random_number * self.range_length_contr)
                         
                         # 通知新供应商
                         self.model.component.firm[new_supplier].sign_contract(self.firm[f].id)
@@ -486,8 +488,9 @@ class ComputerMarket:
                         self.firm[f].contract_time = time
                         
                         # 随机确定合同持续时间
+                        random_number = self.rng.substream(self.id, "contract_length", self.firm[f].id).random()
                         self.firm[f].contract_d = self.min_length_contr + \
-                                                int(self.rng.random() * self.range_length_contr)
+                                                int(random_number * self.range_length_contr)
                         
                         # 通知新供应商
                         component_market.firm[new_supplier].sign_contract(f + firm_offset)
@@ -533,13 +536,15 @@ class ComputerMarket:
         # 对所有垂直整合的公司执行组件技术进步
         for f in range(1, self.num_of_firms + 1):
             if self.firm[f].alive and self.firm[f].integrated:
+                rng = self.rng.substream(self.id, "innovation", self.firm[f].id)
+                
                 # 计算可能的创新次数（方程13.b）
                 temp_num_of_draws = self.firm[f].component_rd / self.draw_cost_cmp[self.firm[f].t_id]
                 self.firm[f].num_of_draws_cmp = int(temp_num_of_draws)
                 remain = temp_num_of_draws - self.firm[f].num_of_draws_cmp
                 
                 # 处理剩余部分
-                random_number = self.rng.random()
+                random_number = rng.random()
                 if random_number <= remain:
                     self.firm[f].num_of_draws_cmp += 1
                 
@@ -551,7 +556,7 @@ class ComputerMarket:
                 # 从正态分布中抽取可能的创新
                 z_max = 0.0
                 for i in range(1, self.firm[f].num_of_draws_cmp + 1):
-                    z = self.firm[f].component.mu_prog + self.sd_cmp[self.firm[f].t_id] * self.rng.gauss(0, 1)
+                    z = self.firm[f].component.mu_prog + self.sd_cmp[self.firm[f].t_id] * rng.gauss(0, 1)
                     if z > z_max:
                         z_max = z
                 
@@ -600,13 +605,15 @@ class ComputerMarket:
         # 对所有活跃的公司执行系统技术进步
         for f in range(1, self.num_of_firms + 1):
             if self.firm[f].alive:
+                rng = self.rng.substream(self.id, "innovation", self.firm[f].id)
+                
                 # 计算可能的创新次数（方程13.a）
                 temp_num_of_draws = self.firm[f].system_rd / self.draw_cost_sys
                 self.firm[f].num_of_draws_sys = int(temp_num_of_draws)
                 remain = temp_num_of_draws - self.firm[f].num_of_draws_sys
                 
                 # 处理剩余部分
-                random_number = self.rng.random()
+                random_number = rng.random()
                 if random_number <= remain:
                     self.firm[f].num_of_draws_sys += 1
                 
@@ -622,7 +629,7 @@ class ComputerMarket:
                 # 从正态分布中抽取可能的创新
                 z_max = 0.0
                 for i in range(1, self.firm[f].num_of_draws_sys + 1):
-                    z = self.firm[f].system.mu_prog + self.sd_sys * self.rng.gauss(0, 1)
+                    z = self.firm[f].system.mu_prog + self.sd_sys * rng.gauss(0, 1)
                     if z > z_max:
                         z_max = z
                 
@@ -767,9 +774,10 @@ class ComputerMarket:
                 self.firm[f].q_sold = 0.0
         
         # 为每组买家分配供应商
+        rng = self.rng.substream(self.id, "buyer_choice")
         for h in range(1, self.buyers + 1):
             cumulated = 0.0
-            random_number = self.rng.random()
+            random_number = rng.random()
             assigned = False
             f = 1
             
@@ -823,7 +831,7 @@ class ComputerMarket:
                                           (1 - self.weight_exit) * self.firm[f].exit_share)
                 
                 # 检查退出条件
-                random_number = self.rng.random()
+                random_number = self.rng.substream(self.id, "exit", self.firm[f].id).random()
                 if self.firm[f].exit_share < self.exit_threshold and random_number < 0.5:
                     # 如果公司是专业化的且有供应商，通知供应商取消合同
                     if not self.firm[f].integrated and self.firm[f].supplier_id != -1:
@@ -16,6 +16,8 @@ Python转换
 """
 class EndProduct:
     
+    __slots__ = ("cheap", "perf", "mod", "mod_for_cust", "production_cost", "u", "U", "firm")
+    
     def __init__(self, firm):
         """
         构造函数
@@ -16,6 +16,8 @@ Python转换
 """
 class NotSoldComponent:
     
+    __slots__ = ("mod", "mu_prog", "production_cost", "firm")
+    
     def __init__(self, firm):
         """
         构造函数
@@ -41,9 +43,10 @@ class NotSoldComponent:
                       (1 - self.firm.computer_market.internal_cum) + 
                       math.log(self.mod) * self.firm.computer_market.internal_cum)
         
+        rng = self.firm.computer_market.rng.substream(self.firm.computer_market.id, "innovation", self.firm.id)
         for i in range(1, self.firm.num_of_draws_cmp + 1):
             z = math.exp(self.mu_prog + math.sqrt(self.firm.computer_market.sd_cmp[self.firm.t_id]) * 
-                       self.firm.computer_market.rng.gauss(0, 1))
+                       rng.gauss(0, 1))
             if z > z_max:
                 z_max = z
                 
@@ -6,6 +6,11 @@ SA_Statistics模块 - SA_Statistics类的Python实现
 转换自Java版本的SA_Statistics.java
 """
 
+import os
+import numpy as np
+from src_py.Chapter3.sa_writer import SARowWriter, STATE_NAME, open_matrix, load_rows
+from src_py.Chapter3.text_rows import row, cells
+
 """
 @author Gianluca Capone & Davide Sgobba
 Python转换
@@ -36,212 +41,80 @@ class SA_Statistics:
         self.name_sens_int_ratio_pc = "/sa_intRat_PC.csv"
         self.name_sens_parameters = "/sa_parameters.csv"
         
-        # 输出文件对象
-        self.file_sens_herf_mf = None
-        self.file_sens_herf_pc = None
-        self.file_sens_herf_cmp = None
-        self.file_sens_alive_firms_mf = None
-        self.file_sens_alive_firms_pc = None
-        self.file_sens_alive_firms_cmp = None
-        self.file_sens_int_ratio_mf = None
-        self.file_sens_int_ratio_pc = None
-        self.file_sens_parameters = None
-        
-        # 统计变量
-        self.sens_herf_mf = []         # 主机市场赫芬达尔指数存储
-        self.sens_herf_pc = []         # PC市场赫芬达尔指数存储
-        self.sens_herf_cmp = []        # 组件市场赫芬达尔指数存储
-        self.sens_alive_firms_mf = []  # 主机市场活跃公司数量存储
-        self.sens_alive_firms_pc = []  # PC市场活跃公司数量存储
-        self.sens_alive_firms_cmp = [] # 组件市场活跃公司数量存储
-        self.sens_int_ratio_mf = []    # 主机市场集成比例存储
-        self.sens_int_ratio_pc = []    # PC市场集成比例存储
-        self.sens_parameters = []      # 模拟运行中使用的参数存储
-
-    def close_file(self):
-        """
-        关闭输出文件对象的方法
-        """
-        file_list = [
-            self.file_sens_herf_mf, self.file_sens_herf_pc, self.file_sens_herf_cmp,
-            self.file_sens_alive_firms_mf, self.file_sens_alive_firms_pc, self.file_sens_alive_firms_cmp,
-            self.file_sens_int_ratio_mf, self.file_sens_int_ratio_pc, self.file_sens_parameters
+        # 每个参数组合完成后立即写入磁盘（见sa_writer）。时间序列文件的布局是
+        # 每行一个时间点、每列一个组合，无法逐列追加，因此先按组合逐行写入
+        # ".rows" 暂存文件（用于中断后恢复），关闭时由结果矩阵转置输出为最终布局
+        self.writer = None
+        self.series = [
+            (self.name_sens_herf_mf, "herf_mf", "HMF"),
+            (self.name_sens_herf_pc, "herf_pc", "HPC"),
+            (self.name_sens_herf_cmp, "herf_cmp", "HCMP"),
+            (self.name_sens_alive_firms_mf, "alive_firms_mf", "MF"),
+            (self.name_sens_alive_firms_pc, "alive_firms_pc", "PC"),
+            (self.name_sens_alive_firms_cmp, "alive_firms_cmp", "CMP"),
+            (self.name_sens_int_ratio_mf, "int_ratio_mf", "IMF"),
+            (self.name_sens_int_ratio_pc, "int_ratio_pc", "IPC"),
         ]
         
-        for file in file_list:
-            try:
-                if file:
-                    file.flush()
-                    file.close()
-            except Exception as e:
-                print(f"关闭文件时出错: {e}")
+        # 数值结果：每个数据系列一个 (参数组合数, end_time+1) 的float64矩阵，
+        # 第k行为本次运行的第k个参数组合（模型设置sa_memmap时保存为memmap的 .npy 文件）
+        self.data = {}
+        
+        # 转置输出时每次格式化的最大单元格数
+        self.transpose_block_cells = 1000000
 
-    def open_file(self):
+    def close_file(self):
         """
-        初始化输出文件对象的方法
+        关闭输出文件对象的方法，并把暂存的时间序列转置写入最终的输出文件
         """
-        try:
-            self.file_sens_herf_mf = open(self.model.path_results + self.name_sens_herf_mf, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
-        
-        try:
-            self.file_sens_herf_pc = open(self.model.path_results + self.name_sens_herf_pc, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
-        
-        try:
-            self.file_sens_herf_cmp = open(self.model.path_results + self.name_sens_herf_cmp, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
-        
-        try:
-            self.file_sens_alive_firms_mf = open(self.model.path_results + self.name_sens_alive_firms_mf, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
-        
-        try:
-            self.file_sens_alive_firms_pc = open(self.model.path_results + self.name_sens_alive_firms_pc, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
-        
-        try:
-            self.file_sens_alive_firms_cmp = open(self.model.path_results + self.name_sens_alive_firms_cmp, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
-        
-        try:
-            self.file_sens_int_ratio_mf = open(self.model.path_results + self.name_sens_int_ratio_mf, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
+        if self.writer is None:
+            return
         
-        try:
-            self.file_sens_int_ratio_pc = open(self.model.path_results + self.name_sens_int_ratio_pc, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
+        self.writer.close()
+        num_runs = self.writer.completed
+        self.writer = None
         
-        try:
-            self.file_sens_parameters = open(self.model.path_results + self.name_sens_parameters, 'w', encoding='utf-8')
-        except Exception as e:
-            print(f"打开文件时出错: {e}")
+        for name, attr, series_name in self.series:
+            self._print_data_series(self.data[attr], self.model.path_results + name, num_runs, series_name)
+            self._remove(self.model.path_results + name + ".rows")
+            if isinstance(self.data[attr], np.memmap):
+                self.data[attr].flush()
+        self._remove(self.model.path_results + STATE_NAME)
 
-    # 以下是在输出文件对象中写入数据的辅助方法
-    def print_sens_herf_mf(self, text):
-        """在主机市场赫芬达尔指数输出文件中写入数据"""
-        try:
-            if self.file_sens_herf_mf:
-                self.file_sens_herf_mf.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_herf_pc(self, text):
-        """在PC市场赫芬达尔指数输出文件中写入数据"""
-        try:
-            if self.file_sens_herf_pc:
-                self.file_sens_herf_pc.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_herf_cmp(self, text):
-        """在组件市场赫芬达尔指数输出文件中写入数据"""
-        try:
-            if self.file_sens_herf_cmp:
-                self.file_sens_herf_cmp.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_alive_firms_mf(self, text):
-        """在主机市场活跃公司数量输出文件中写入数据"""
-        try:
-            if self.file_sens_alive_firms_mf:
-                self.file_sens_alive_firms_mf.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_alive_firms_pc(self, text):
-        """在PC市场活跃公司数量输出文件中写入数据"""
-        try:
-            if self.file_sens_alive_firms_pc:
-                self.file_sens_alive_firms_pc.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_alive_firms_cmp(self, text):
-        """在组件市场活跃公司数量输出文件中写入数据"""
-        try:
-            if self.file_sens_alive_firms_cmp:
-                self.file_sens_alive_firms_cmp.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_int_ratio_mf(self, text):
-        """在主机市场集成比例输出文件中写入数据"""
-        try:
-            if self.file_sens_int_ratio_mf:
-                self.file_sens_int_ratio_mf.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_int_ratio_pc(self, text):
-        """在PC市场集成比例输出文件中写入数据"""
-        try:
-            if self.file_sens_int_ratio_pc:
-                self.file_sens_int_ratio_pc.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def print_sens_parameters(self, text):
-        """在参数输出文件中写入数据"""
-        try:
-            if self.file_sens_parameters:
-                self.file_sens_parameters.write(text)
-        except Exception as e:
-            print(f"写入文件时出错: {e}")
-    
-    def copy_values(self, input_list, output_list):
-        """
-        从输入ArrayList复制值到输出数组
-        
-        Args:
-            input_list: 输入列表
-            output_list: 输出列表
+    def open_file(self, resume=False):
         """
-        for i in range(len(input_list)):
-            output_list[i] = input_list[i]
-    
-    def copy_values_param(self, input_params, output_list):
-        """
-        从输入参数数组复制值到输出数组
+        初始化输出文件对象的方法
         
         Args:
-            input_params: 输入参数数组
-            output_list: 输出列表
-        """
-        try:
-            # 确保输入参数不为空
-            if input_params is None:
-                print("错误: 输入参数数组为空")
-                return
-            
-            # 安全地访问参数值
-            max_len = min(len(input_params), len(output_list))
-            for i in range(max_len):
-                if input_params[i] is not None and hasattr(input_params[i], 'value'):
-                    output_list[i] = str(input_params[i].value)
-                else:
-                    # 如果参数为空或没有value属性，设置为默认值
-                    output_list[i] = "N/A"
-                    
-        except Exception as e:
-            print(f"复制参数值时出错: {e}")
-            # 确保输出列表中的所有元素都有值
-            for i in range(len(output_list)):
-                if output_list[i] is None or output_list[i] == "":
-                    output_list[i] = "N/A"
-    
+            resume: 为True时保留中断运行已完成的参数组合，并在其后继续写入
+            
+        Returns:
+            int: 已完成的参数组合数量
+        """
+        paths = {self.name_sens_parameters: self.model.path_results + self.name_sens_parameters}
+        for name, _, _ in self.series:
+            paths[name] = self.model.path_results + name + ".rows"
+        
+        self.writer = SARowWriter(paths,
+                                  self.model.path_results + STATE_NAME,
+                                  getattr(self.model, 'sa_fsync_interval', 10))
+        completed = self.writer.open(resume)
+        
+        shape = (self.model.sa_combinations(), self.model.end_time + 1)
+        memmap = getattr(self.model, 'sa_memmap', False)
+        for name, attr, _ in self.series:
+            self.data[attr] = open_matrix(self.model.path_results + f"/sa_{attr}.npy", shape, memmap)
+            
+            # 中断前已完成的参数组合从暂存文件读回（第0期不写入文本，始终为0）
+            if completed > 0:
+                for k, values in enumerate(load_rows(paths[name], completed, ",")):
+                    self.data[attr][k, 0] = 0.0
+                    self.data[attr][k, 1:len(values) + 1] = values
+        return completed
+
     def make_statistics(self):
         """
-        从当前模拟运行中获取数据并存储到存储对象中
+        从当前模拟运行中获取数据，并立即写入当前参数组合的各行
         """
         try:
             # 确保model和model.end_time存在并有效
@@ -249,157 +122,104 @@ class SA_Statistics:
                 print("错误: 模型参数未正确初始化")
                 return
             
-            # 确保model.parameters存在
-            if not hasattr(self.model, 'parameters') or self.model.parameters is None:
-                print("错误: 模型参数列表未初始化")
-                return
-                
-            new_herf_mf = [""] * (self.model.end_time + 1)
-            new_herf_pc = [""] * (self.model.end_time + 1)
-            new_herf_cmp = [""] * (self.model.end_time + 1)
-            new_alive_firms_mf = [""] * (self.model.end_time + 1)
-            new_alive_firms_pc = [""] * (self.model.end_time + 1)
-            new_alive_firms_cmp = [""] * (self.model.end_time + 1)
-            new_int_ratio_mf = [""] * (self.model.end_time + 1)
-            new_int_ratio_pc = [""] * (self.model.end_time + 1)
-            new_parameters = [""] * (len(self.model.parameters) + 1)
-            
             # 确保统计数据已初始化
             if not hasattr(self.model, 'statistics') or self.model.statistics is None:
                 print("错误: 模型统计数据未初始化")
                 return
-                
-            for t in range(1, self.model.end_time + 1):
-                # 防止访问空对象
-                if hasattr(self.model.statistics, 'herf_mf') and t < len(self.model.statistics.herf_mf):
-                    new_herf_mf[t] = str(self.model.statistics.herf_mf[t])
-                if hasattr(self.model.statistics, 'herf_pc') and t < len(self.model.statistics.herf_pc):
-                    new_herf_pc[t] = str(self.model.statistics.herf_pc[t])
-                if hasattr(self.model.statistics, 'herf_cmp') and t < len(self.model.statistics.herf_cmp):
-                    new_herf_cmp[t] = str(self.model.statistics.herf_cmp[t])
-                if hasattr(self.model.statistics, 'alive_firms_mf') and t < len(self.model.statistics.alive_firms_mf):
-                    new_alive_firms_mf[t] = str(self.model.statistics.alive_firms_mf[t])
-                if hasattr(self.model.statistics, 'alive_firms_pc') and t < len(self.model.statistics.alive_firms_pc):
-                    new_alive_firms_pc[t] = str(self.model.statistics.alive_firms_pc[t])
-                if hasattr(self.model.statistics, 'alive_firms_cmp') and t < len(self.model.statistics.alive_firms_cmp):
-                    new_alive_firms_cmp[t] = str(self.model.statistics.alive_firms_cmp[t])
-                if hasattr(self.model.statistics, 'int_ratio_mf') and t < len(self.model.statistics.int_ratio_mf):
-                    new_int_ratio_mf[t] = str(self.model.statistics.int_ratio_mf[t])
-                if hasattr(self.model.statistics, 'int_ratio_pc') and t < len(self.model.statistics.int_ratio_pc):
-                    new_int_ratio_pc[t] = str(self.model.statistics.int_ratio_pc[t])
             
-            # 设置随机种子参数
-            if hasattr(self.model, 'rng_seed'):
-                new_parameters[0] = str(self.model.rng_seed)
-            else:
-                new_parameters[0] = "unknown"
-                
-            # 安全地复制参数值
-            try:
-                self.copy_values_param(self.model.parameters, new_parameters[1:])
-            except Exception as e:
-                print(f"复制参数值时出错: {e}")
+            run = self.writer.completed
             
-            # 将数据添加到结果列表
-            self.sens_herf_mf.append(new_herf_mf)
-            self.sens_herf_pc.append(new_herf_pc)
-            self.sens_herf_cmp.append(new_herf_cmp)
-            self.sens_alive_firms_mf.append(new_alive_firms_mf)
-            self.sens_alive_firms_pc.append(new_alive_firms_pc)
-            self.sens_alive_firms_cmp.append(new_alive_firms_cmp)
-            self.sens_int_ratio_mf.append(new_int_ratio_mf)
-            self.sens_int_ratio_pc.append(new_int_ratio_pc)
-            self.sens_parameters.append(new_parameters)
+            # 先格式化全部行再写入，出错时不会留下只写了一部分的组合
+            lines = {}
+            for name, attr, _ in self.series:
+                values = getattr(self.model.statistics, attr, [])
+                n = min(len(values), self.model.end_time + 1)
+                matrix = self.data[attr]
+                matrix[run, :n] = values[:n]
+                line = [str(v) for v in matrix[run, 1:n].tolist()] + [""] * (self.model.end_time + 1 - max(n, 1))
+                lines[name] = ",".join(line) + "\n"
+            self._write_combination(run, lines)
         except Exception as e:
             print(f"生成敏感性分析统计数据时出错: {e}")
-    
+
+    def skip_combination(self):
+        """
+        记录一个运行出错的参数组合：各数据系列写入一行NaN，
+        使之后每个组合的行号仍等于组合序号减1（恢复和分片合并依赖这一点）
+        """
+        run = self.writer.completed
+        lines = {}
+        for name, attr, _ in self.series:
+            self.data[attr][run] = np.nan
+            lines[name] = ",".join(["nan"] * self.model.end_time) + "\n"
+        self._write_combination(run, lines)
+
+    def _write_combination(self, run, lines):
+        """
+        写入一个参数组合的各数据系列行和参数行，并标记该组合已完成
+        
+        Args:
+            run: 组合在本次运行中的序号（从0开始）
+            lines: 字典，数据系列文件名 -> 一行文本
+        """
+        for name, line in lines.items():
+            self.writer.write(name, line)
+        
+        # 参数值，第一个为随机种子
+        values = [self.model.rng_seed if hasattr(self.model, 'rng_seed') else "unknown"]
+        for param in self.model.parameters:
+            if param is not None and hasattr(param, 'value'):
+                values.append(str(param.value).strip())
+            else:
+                values.append("N/A")
+        self.writer.write(self.name_sens_parameters, row(f"Run{self.model.sa_offset + run}", values, ","))
+        
+        self.writer.end_combination()
+
     def print_statistics(self):
         """
-        将存储在相关对象中的数据打印到输出文件中
+        各参数组合的数据已在make_statistics中写入，这里只需持久化尚未同步的行
         """
-        try:
-            # 检查是否有数据可打印
-            if not self.sens_parameters or len(self.sens_parameters) == 0:
-                print("警告: 没有敏感性分析数据可打印")
-                return
-                
-            # 打印参数值
-            for sens_counter in range(len(self.sens_parameters)):
-                try:
-                    param_data = "Run" + str(sens_counter) + ","
-                    for p in range(len(self.sens_parameters[sens_counter])):
-                        if self.sens_parameters[sens_counter][p] is not None:
-                            param_data += self.sens_parameters[sens_counter][p]
-                        else:
-                            param_data += "N/A"
-                        param_data += ","
-                    param_data += "\n"
-                    self.print_sens_parameters(param_data)
-                except Exception as e:
-                    print(f"打印参数数据时出错 (运行 {sens_counter}): {e}")
-            
-            # 打印主机市场赫芬达尔指数
-            self._print_data_series(self.sens_herf_mf, self.print_sens_herf_mf, "HMF")
-            
-            # 打印PC市场赫芬达尔指数
-            self._print_data_series(self.sens_herf_pc, self.print_sens_herf_pc, "HPC")
-            
-            # 打印组件市场赫芬达尔指数
-            self._print_data_series(self.sens_herf_cmp, self.print_sens_herf_cmp, "HCMP")
-            
-            # 打印主机市场活跃公司数量
-            self._print_data_series(self.sens_alive_firms_mf, self.print_sens_alive_firms_mf, "MF")
-            
-            # 打印PC市场活跃公司数量
-            self._print_data_series(self.sens_alive_firms_pc, self.print_sens_alive_firms_pc, "PC")
-            
-            # 打印组件市场活跃公司数量
-            self._print_data_series(self.sens_alive_firms_cmp, self.print_sens_alive_firms_cmp, "CMP")
-            
-            # 打印主机市场集成比例
-            self._print_data_series(self.sens_int_ratio_mf, self.print_sens_int_ratio_mf, "IMF")
-            
-            # 打印PC市场集成比例
-            self._print_data_series(self.sens_int_ratio_pc, self.print_sens_int_ratio_pc, "IPC")
-            
-        except Exception as e:
-            print(f"打印敏感性分析数据时出错: {e}")
-    
-    def _print_data_series(self, data_series, print_func, series_name):
+        if self.writer is not None and self.writer.completed > self.writer.synced:
+            self.writer.sync()
+
+    def _print_data_series(self, matrix, output_path, num_runs, series_name):
         """
-        打印特定数据系列到输出文件
+        将结果矩阵转置输出为每行一个时间点、每列一个参数组合的文件
         
         Args:
-            data_series: 数据系列
-            print_func: 用于打印的函数
+            matrix: (参数组合数, 周期数+1) 的结果矩阵
+            output_path: 输出文件路径
+            num_runs: 参数组合数量
             series_name: 数据系列名称
         """
         try:
-            if not data_series or len(data_series) == 0:
+            if num_runs == 0:
                 print(f"警告: 没有 {series_name} 数据可打印")
+                open(output_path, 'w', encoding='utf-8').close()
                 return
             
-            # 打印首行（运行标识）
-            header = "Time,"
-            for i in range(len(data_series)):
-                header += "Run" + str(i) + ","
-            header += "\n"
-            print_func(header)
-            
-            # 如果没有时间点数据，直接返回
-            if len(data_series[0]) == 0:
-                return
+            with open(output_path, 'w', encoding='utf-8') as output:
+                # 打印首行（运行标识，分片运行时从本分片的第一个组合开始编号）
+                offset = self.model.sa_offset
+                output.write("Time," + "".join("Run" + str(offset + i) + "," for i in range(num_runs)) + "\n")
                 
-            # 打印每个时间点的值
-            for t in range(1, len(data_series[0])):
-                line = str(t) + ","
-                for run in range(len(data_series)):
-                    if t < len(data_series[run]) and data_series[run][t] is not None:
-                        line += data_series[run][t]
-                    else:
-                        line += "N/A"
-                    line += ","
-                line += "\n"
-                print_func(line)
+                # 按时间块转置，每块格式化的单元格数不超过transpose_block_cells
+                block = max(1, self.transpose_block_cells // num_runs)
+                for start in range(1, self.model.end_time + 1, block):
+                    stop = min(start + block, self.model.end_time + 1)
+                    columns = matrix[:num_runs, start:stop].T
+                    output.write("".join(f"{start + k}," + cells(columns[k], ",") + "\n"
+                                         for k in range(stop - start)))
+        except Exception as e:
+            print(f"打印 {series_name} 数据时出错: {e}")
+
+    @staticmethod
+    def _remove(path):
+        """删除文件（不存在时忽略）"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"打印 {series_name} 数据时出错: {e}") 
\ No newline at end of file
+            print(e)
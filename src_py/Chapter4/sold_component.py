@@ -16,6 +16,8 @@ Python转换
 """
 class SoldComponent:
     
+    __slots__ = ("mu_prog", "production_cost", "u", "U", "u_ext", "U_ext", "mod", "firm")
+    
     def __init__(self, mod, firm):
         """
         构造函数
@@ -64,10 +66,11 @@ class SoldComponent:
                          math.log(self.firm.cmp_market.pk[self.firm.t_id]) + 
                          self.firm.cmp_market.internal_cum * math.log(self.mod))
         
+        rng = self.firm.cmp_market.rng.substream("CMP", "innovation", self.firm.id)
         for i in range(1, self.firm.num_of_draws_cmp + 1):
             z = math.exp(self.mu_prog + 
                        math.sqrt(self.firm.cmp_market.sd_cmp[self.firm.t_id]) * 
-                       self.firm.cmp_market.rng.gauss(0, 1))
+                       rng.gauss(0, 1))
             if z > z_max:
                 z_max = z
         
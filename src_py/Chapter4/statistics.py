@@ -7,6 +7,9 @@ Statistics模块 - Statistics类的Python实现
 """
 
 import os
+from src_py.Chapter3.panel_writer import write_panels
+from src_py.Chapter3.online_stats import OnlineStatistics
+from src_py.Chapter3.text_rows import row, table, panel
 
 """
 @author Gianluca Capone & Davide Sgobba
@@ -16,6 +19,10 @@ Python转换
 """
 class Statistics:
     
+    # 多次模拟中跨运行累计的统计数组（检查点保存这些数组）
+    multi_series = ("alive_firms_mf", "alive_firms_pc", "alive_firms_cmp", "herf_mf", "herf_pc",
+                    "herf_cmp", "int_firms_mf", "int_firms_pc", "int_ratio_mf", "int_ratio_pc")
+    
     def __init__(self, model, is_single):
         """
         构造函数
@@ -69,6 +76,16 @@ class Statistics:
                 self.int_ratio_mf.append(0.0)
                 self.int_ratio_pc.append(0.0)
         
+        # 可选：各序列在运行之间的离散程度（在线累计，不保存各次运行）
+        self.dispersion = None
+        if not is_single and getattr(model, "multi_dispersion", False):
+            self.dispersion = OnlineStatistics(self.multi_series, model.end_time + 1, model.dispersion_quantiles)
+        
+        # 当前运行各序列的原始取值（计算离散程度或缓存运行结果时才记录）
+        self.run_values = None
+        if not is_single and (self.dispersion is not None or getattr(model, "result_cache", None) is not None):
+            self.run_values = {name: [0.0] * (model.end_time + 1) for name in self.multi_series}
+        
         # 控制器
         self.is_single = is_single
 
@@ -161,175 +178,155 @@ class Statistics:
         self.int_firms_pc[self.model.timer] = self.int_firms_pc[self.model.timer] + (self.model.pc_market.int_firms / self.model.multi_time)
         self.int_ratio_mf[self.model.timer] = self.int_ratio_mf[self.model.timer] + (self.model.mf_market.int_ratio / self.model.multi_time)
         self.int_ratio_pc[self.model.timer] = self.int_ratio_pc[self.model.timer] + (self.model.pc_market.int_ratio / self.model.multi_time)
+        
+        if self.run_values is not None:
+            t = self.model.timer
+            self.run_values["herf_mf"][t] = self.model.mf_market.herfindahl_index
+            self.run_values["herf_pc"][t] = self.model.pc_market.herfindahl_index
+            self.run_values["herf_cmp"][t] = self.model.cmp_market.herfindahl_index
+            self.run_values["alive_firms_mf"][t] = self.model.mf_market.alive_firms
+            self.run_values["alive_firms_pc"][t] = self.model.pc_market.alive_firms
+            self.run_values["alive_firms_cmp"][t] = self.model.cmp_market.alive_firms
+            self.run_values["int_firms_mf"][t] = self.model.mf_market.int_firms
+            self.run_values["int_firms_pc"][t] = self.model.pc_market.int_firms
+            self.run_values["int_ratio_mf"][t] = self.model.mf_market.int_ratio
+            self.run_values["int_ratio_pc"][t] = self.model.pc_market.int_ratio
 
-    def print_multi_statistics(self):
+    def end_run(self):
         """
-        在多次模拟的情况下将数据写入输出文件
+        每次运行结束时调用，把本次运行加入离散程度统计
         """
-        # 写入Herfindahl指数部分
-        self.print("Herfindahl index \n")
-        self.print("MF;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.herf_mf[t]};")
-        self.print("\n")
-        self.print("PC;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.herf_pc[t]};")
-        self.print("\n")
-        self.print("CMP;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.herf_cmp[t]};")
-        self.print("\n")
+        if self.dispersion is not None:
+            for name in self.multi_series:
+                self.dispersion.update(name, self.run_values[name])
+
+    def run_series(self):
+        """
+        当前运行各序列的原始取值（按multi_series的顺序，用于缓存）
         
-        self.print("\nNumber of Firms \n")
-        self.print("MF;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.alive_firms_mf[t]};")
-        self.print("\n")
-        self.print("PC;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.alive_firms_pc[t]};")
-        self.print("\n")
-        self.print("CMP;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.alive_firms_cmp[t]};")
-        self.print("\n")
+        Returns:
+            list: 每个序列一个列表
+        """
+        return [self.run_values[name] for name in self.multi_series]
+
+    def add_run(self, values):
+        """
+        把一次已缓存的运行加入累计的统计，与make_statistics逐周期累加的结果相同
         
-        self.print("\nNumber of Integrated Firms\n")
-        self.print("MF;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.int_firms_mf[t]};")
-        self.print("\n")
-        self.print("PC;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.int_firms_pc[t]};")
-        self.print("\n")
+        Args:
+            values: run_series返回的各序列取值
+        """
+        end = self.model.end_time + 1
+        for name, run in zip(self.multi_series, values):
+            total = getattr(self, name)
+            for t in range(1, end):
+                total[t] = total[t] + (run[t] / self.model.multi_time)
+            self.run_values[name] = run
 
-        self.print("\n Integration Ratio (number of integrated F/total number of firms)\n")
-        self.print("MF;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.int_ratio_mf[t]};")
-        self.print("\n")
-        self.print("PC;")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{self.int_ratio_pc[t]};")
-        self.print("\n")
+    def print_dispersion_statistics(self, level=0.95):
+        """
+        写入各序列在运行之间的离散程度（均值置信区间、最小/最大值和分位数）
+        
+        Args:
+            level: 置信区间的置信水平
+        """
+        end = self.model.end_time + 1
+        out = ["\nDispersion across runs\n"]
+        for name in self.multi_series:
+            for label, values in self.dispersion.summary(name, level):
+                out.append(row(f"{name} {label}", values[1:end]))
+        self.print("".join(out))
 
-    def print_single_statistics(self):
+    def print_multi_statistics(self):
         """
-        在单次模拟的情况下将数据写入输出文件
+        在多次模拟的情况下将数据写入输出文件，每行一次格式化，整个报告一次写入
         """
-        self.print("Main Statistics\n")
-        self.print("\n")
-        self.print("T;HMF;NMF;INMF;IRMF;HPC;NPC;INPC;IRPC;HCMP;NCMP\n")
-        for t in range(1, self.model.end_time):
-            self.print(f"{t};")
-            self.print(f"{self.herf_mf[t-1]};")
-            self.print(f"{self.alive_firms_mf[t-1]};")
-            self.print(f"{self.int_firms_mf[t-1]};")
-            self.print(f"{self.int_ratio_mf[t-1]};")
-            self.print(f"{self.herf_pc[t-1]};")
-            self.print(f"{self.alive_firms_pc[t-1]};")
-            self.print(f"{self.int_firms_pc[t-1]};")
-            self.print(f"{self.int_ratio_pc[t-1]};")
-            self.print(f"{self.herf_cmp[t-1]};")
-            self.print(f"{self.alive_firms_cmp[t-1]}\n")
+        end = self.model.end_time + 1
+        out = []
         
-        self.print("\nComputerFirm MOD\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod_mf[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_mod_mf[t-1]) + 1):
-                self.print(f"{self.single_mod_mf[t-1][f-1]};")
-            self.print("\n")
-
-        self.print("\nMFComputerFirm SHARE \n")
-        self.print("T;")
-        for f in range(1, len(self.single_share_mf[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_share_mf[t-1]) + 1):
-                self.print(f"{self.single_share_mf[t-1][f-1]};")
-            self.print("\n")
+        # 写入Herfindahl指数部分
+        out.append("Herfindahl index \n")
+        out.append(row("MF", self.herf_mf[1:end]))
+        out.append(row("PC", self.herf_pc[1:end]))
+        out.append(row("CMP", self.herf_cmp[1:end]))
         
-        self.print("\nMFComputerFirms Component supplier \n")
-        self.print("T;")
-        for f in range(1, len(self.single_supplier_mf[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_supplier_mf[t-1]) + 1):
-                self.print(f"{self.single_supplier_mf[t-1][f-1]};")
-            self.print("\n")
+        out.append("\nNumber of Firms \n")
+        out.append(row("MF", self.alive_firms_mf[1:end]))
+        out.append(row("PC", self.alive_firms_pc[1:end]))
+        out.append(row("CMP", self.alive_firms_cmp[1:end]))
         
-        self.print("\nPC Computer mod\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod_pc[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_mod_pc[t-1]) + 1):
-                self.print(f"{self.single_mod_pc[t-1][f-1]};")
-            self.print("\n")
+        out.append("\nNumber of Integrated Firms\n")
+        out.append(row("MF", self.int_firms_mf[1:end]))
+        out.append(row("PC", self.int_firms_pc[1:end]))
+
+        out.append("\n Integration Ratio (number of integrated F/total number of firms)\n")
+        out.append(row("MF", self.int_ratio_mf[1:end]))
+        out.append(row("PC", self.int_ratio_pc[1:end]))
         
-        self.print("\nPCComputerFirm SHARE \n")
-        self.print("T;")
-        for f in range(1, len(self.single_share_pc[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_share_pc[t-1]) + 1):
-                self.print(f"{self.single_share_pc[t-1][f-1]};")
-            self.print("\n")
-                
-        self.print("\nPC ComputerFirms Component supplier \n")
-        self.print("T;")
-        for f in range(1, len(self.single_supplier_pc[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_supplier_pc[t-1]) + 1):
-                self.print(f"{self.single_supplier_pc[t-1][f-1]};")
-            self.print("\n")
+        self.print("".join(out))
+
+    def print_single_statistics(self):
+        """
+        在单次模拟的情况下将数据写入输出文件，每行一次格式化，整个报告一次写入
+        """
+        end_time = self.model.end_time
+        out = []
         
-        self.print("\nComponentFirm MOD\n")
-        self.print("T;")
-        for f in range(1, len(self.single_mod_cmp[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_mod_cmp[t-1]) + 1):
-                self.print(f"{self.single_mod_cmp[t-1][f-1]};")
-            self.print("\n")
+        out.append("Main Statistics\n")
+        out.append("\n")
+        out.append("T;HMF;NMF;INMF;IRMF;HPC;NPC;INPC;IRPC;HCMP;NCMP\n")
+        columns = [self.herf_mf, self.alive_firms_mf, self.int_firms_mf, self.int_ratio_mf,
+                   self.herf_pc, self.alive_firms_pc, self.int_firms_pc, self.int_ratio_pc,
+                   self.herf_cmp, self.alive_firms_cmp]
+        out.append(table([c[:end_time - 1] for c in columns], range(1, end_time)))
         
-        self.print("\nComponentFirms SHARE\n")
-        self.print("T;")
-        for f in range(1, len(self.single_share_cmp[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_share_cmp[t-1]) + 1):
-                self.print(f"{self.single_share_cmp[t-1][f-1]};")
-            self.print("\n")
+        sections = (("\nComputerFirm MOD\n", self.single_mod_mf),
+                    ("\nMFComputerFirm SHARE \n", self.single_share_mf),
+                    ("\nMFComputerFirms Component supplier \n", self.single_supplier_mf),
+                    ("\nPC Computer mod\n", self.single_mod_pc),
+                    ("\nPCComputerFirm SHARE \n", self.single_share_pc),
+                    ("\nPC ComputerFirms Component supplier \n", self.single_supplier_pc),
+                    ("\nComponentFirm MOD\n", self.single_mod_cmp),
+                    ("\nComponentFirms SHARE\n", self.single_share_cmp),
+                    ("\nCMP num of buyers\n", self.single_num_of_buyers_cmp))
+        for title, data in sections:
+            out.append(title)
+            out.append(row("T", range(1, len(data[end_time-1]) + 1)))
+            out.append(panel(data[:end_time]))
         
-        self.print("\nCMP num of buyers\n")
-        self.print("T;")
-        for f in range(1, len(self.single_num_of_buyers_cmp[self.model.end_time-1]) + 1):
-            self.print(f"{f};")
-        self.print("\n")
-        for t in range(1, self.model.end_time + 1):
-            self.print(f"{t};")
-            for f in range(1, len(self.single_num_of_buyers_cmp[t-1]) + 1):
-                self.print(f"{self.single_num_of_buyers_cmp[t-1][f-1]};")
-            self.print("\n") 
\ No newline at end of file
+        self.print("".join(out))
+
+    def print_single_panels(self, fmt="npz"):
+        """
+        以列式二进制格式（见panel_writer）写入单次模拟的数据，企业数据按(周期, 企业)排列
+        
+        Args:
+            fmt: "npz"、"npy" 或 "parquet"
+            
+        Returns:
+            str: 写入的路径，失败时返回None
+        """
+        panels = {
+            "mod_mf": self.single_mod_mf,
+            "share_mf": self.single_share_mf,
+            "supplier_mf": self.single_supplier_mf,
+            "mod_pc": self.single_mod_pc,
+            "share_pc": self.single_share_pc,
+            "supplier_pc": self.single_supplier_pc,
+            "mod_cmp": self.single_mod_cmp,
+            "share_cmp": self.single_share_cmp,
+            "num_of_buyers_cmp": self.single_num_of_buyers_cmp,
+        }
+        series = {
+            "HMF": self.herf_mf,
+            "NMF": self.alive_firms_mf,
+            "INMF": self.int_firms_mf,
+            "IRMF": self.int_ratio_mf,
+            "HPC": self.herf_pc,
+            "NPC": self.alive_firms_pc,
+            "INPC": self.int_firms_pc,
+            "IRPC": self.int_ratio_pc,
+            "HCMP": self.herf_cmp,
+            "NCMP": self.alive_firms_cmp,
+        }
+        return write_panels(os.path.join(self.model.path_results, "singleSimulation"), panels, series, fmt)
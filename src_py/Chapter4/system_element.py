@@ -16,6 +16,8 @@ Python转换
 """
 class SystemElement:
     
+    __slots__ = ("mod", "mu_prog", "firm")
+    
     def __init__(self, mod, firm):
         """
         构造函数
@@ -41,10 +43,11 @@ class SystemElement:
                       (1 - self.firm.computer_market.internal_cum) + 
                       math.log(self.mod) * self.firm.computer_market.internal_cum)
         
+        rng = self.firm.computer_market.rng.substream(self.firm.computer_market.id, "innovation", self.firm.id)
         for i in range(1, self.firm.num_of_draws_sys + 1):
             z = math.exp(self.mu_prog + 
                        math.sqrt(self.firm.computer_market.sd_sys) * 
-                       self.firm.computer_market.rng.nextGaussian())
+                       rng.nextGaussian())
             if z > z_max:
                 z_max = z
                 
@@ -6,9 +6,24 @@ Chapter5 包
 包含药物产业历史友好模型的Python实现
 """
 
-from .c5_model import C5Model
+import importlib
 
-__all__ = ['C5Model']
+# 包中可直接导入的类 -> 所在模块（首次访问时才导入，见 __getattr__）
+_EXPORTS = {
+    "C5Model": ".c5_model",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    """按需导入包中的类，导入包本身不会加载模型及其依赖"""
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
 """
 Chapter5 package - Pharmaceutical industry model
@@ -12,24 +12,17 @@ import math
 import numpy as np
 from datetime import datetime
 from .molecule import Molecule
-from .therapeutic_category import TherapeuticCategory
+from .therapeutic_category import TherapeuticCategory, SubMarket
 from .product import Product
-from .firm import Firm
+from .firm import Firm, Memory, SearchAction
 from .files import Files
-from .statistic import Statistic
+from .statistic import Statistic, parameter_snapshot
 
-# Use absolute import for JavaCompatibleRandom
-try:
-    from src_py.Chapter3.java_compatible_random import JavaCompatibleRandom
-except ImportError:
-    import sys
-    import os
-    # Add fallback path if needed
-    src_py_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    chapter3_dir = os.path.join(src_py_dir, 'Chapter3')
-    if chapter3_dir not in sys.path:
-        sys.path.append(chapter3_dir)
-    from java_compatible_random import JavaCompatibleRandom
+from src_py.Chapter3.java_compatible_random import JavaCompatibleRandom
+from src_py.Chapter3.checkpoint import Checkpoint, CHECKPOINT_NAME
+from src_py.Chapter3.online_stats import OnlineStatistics
+from src_py.Chapter3.phase_timer import PhaseTimer
+from src_py.Chapter3.memory_tracker import MemoryTracker
 
 import time
 
@@ -39,6 +32,18 @@ class C5Model:
     这个类实现了第5章的药物产业模型。
     """
     
+    # mol_value 每次批量生成的均匀随机数个数
+    MOL_VALUE_CHUNK = 256
+    
+    # 多次模拟跨运行保存的统计数组（检查点保存这些数组）
+    MULTI_SERIES = ("multi_tot_h", "multi_mean_h", "multi_inno_prod", "multi_imi_prod",
+                    "multi_alive_f_with_prod", "multi_price_inno", "multi_price_imi",
+                    "multi_price_inno_runs", "multi_price_imi_runs")
+    
+    # 单次运行的统计序列，多次模拟时统计它们在运行之间的离散程度
+    RUN_SERIES = ("tot_h", "mean_h", "inno_prod", "imi_prod", "alive_f_with_prod",
+                  "price_mean_inno", "price_mean_imi")
+    
     def __init__(self):
         """
         构造函数，初始化模型参数和目录
@@ -80,6 +85,28 @@ class C5Model:
         self.tc = None  # Therapeutic Categories array
         self.f = None   # Firms array
         
+        # 多次模拟每完成多少次运行保存一次检查点
+        self.checkpoint_interval = 10
+        
+        # 多次模拟是否同时输出各序列在运行之间的离散程度（multiout_dispersion.txt）
+        self.multi_dispersion = False
+        self.dispersion_quantiles = (0.05, 0.5, 0.95)
+        self.dispersion = None
+        
+        # 多次模拟额外以列式格式（"npz"、"npy"）输出各序列的平均值（multiout.npz 等）
+        self.multi_panel_formats = []
+        
+        # 分阶段计时（默认关闭，phase_timer.enable() 启用，结果见 write_phase_timing）
+        self.phase_timer = PhaseTimer("C5Model")
+        
+        # 内存分析（默认关闭，memory_tracker.enable() 启用，结果见 write_memory_profile）
+        self.memory_tracker = MemoryTracker("C5Model", (Firm, Memory, SearchAction, Product, Molecule,
+                                                        SubMarket, TherapeuticCategory, Statistic))
+        
+        # 每个周期缓存一次的可仿制治疗类别收益表
+        self.imit_earnings_time = -1
+        self.imit_earnings = {}
+        
         # 使用与Java相同的种子值初始化随机数生成器
         seed = 13  # 默认种子值
         self.rng_seed = seed
@@ -214,35 +241,9 @@ class C5Model:
             if t % 10 == 0:
                 print(f"Period {t}/{self.end_time}")
                 
-            # 企业进入市场
-            self.entry(self.num_of_firm, t)
-            
-            # 分子价值更新
-            self.mol_value(t)
-            
-            # 搜索方法选择
-            self.method_of_search(t)
-            
-            # 研究活动
-            self.research_activity(t)
-            
-            # 检查分子是否达到质量标准
-            self.check_mol(t)
-            
-            # 计算市场份额
-            self.calc_share(t)
-            
-            # 计算利润
-            self.calc_profit(t)
-            
-            # 市场营销活动
-            self.mkting(t)
-            
-            # 退出规则检查
-            self.exit_rule(t)
-            
-            # 收集统计数据
-            self.collect_statistics(t)
+            self.simulate_period(t)
+        self.phase_timer.end_replicate()
+        self.memory_tracker.end_replicate()
         
         # 记录结束时间并计算运行时间
         end_time = time.time()
@@ -273,9 +274,83 @@ class C5Model:
         
         # 生成param.txt文件（与Java版本格式一致）
         self.generate_param_file()
+        self.write_phase_timing()
+        self.write_memory_profile()
         
         print(f"Single simulation report saved to {result_file}")
         return True
+    
+    def simulate_period(self, t):
+        """
+        运行第t期的所有步骤并收集统计数据
+        
+        Args:
+            t: 当前周期
+        """
+        phase = self.phase_timer.phase
+        self.phase_timer.period = t
+        
+        # 企业进入市场
+        with phase("entry"):
+            self.entry(self.num_of_firm, t)
+        
+        # 分子价值更新
+        with phase("mol_value"):
+            self.mol_value(t)
+        
+        # 搜索方法选择
+        with phase("method_of_search"):
+            self.method_of_search(t)
+        
+        # 研究活动
+        with phase("research_activity"):
+            self.research_activity(t)
+        
+        # 检查分子是否达到质量标准
+        with phase("check_mol"):
+            self.check_mol(t)
+        
+        # 计算市场份额
+        with phase("calc_share"):
+            self.calc_share(t)
+        
+        # 计算利润
+        with phase("calc_profit"):
+            self.calc_profit(t)
+        
+        # 市场营销活动
+        with phase("mkting"):
+            self.mkting(t)
+        
+        # 退出规则检查
+        with phase("exit_rule"):
+            self.exit_rule(t)
+        
+        # 收集统计数据
+        with phase("collect_statistics"):
+            self.collect_statistics(t)
+        
+        self.memory_tracker.sample(t)
+    
+    def write_phase_timing(self, name="phase_timing"):
+        """
+        写入分阶段计时结果（name.csv、name.json 和 cProfile格式的 name.prof）
+        
+        Args:
+            name: 结果目录中的文件名（不含扩展名）
+        """
+        if self.phase_timer.enabled:
+            self.phase_timer.write(os.path.join(self.path_results, name))
+    
+    def write_memory_profile(self, name="memory_profile"):
+        """
+        写入内存分析结果（name.csv 和 name.json）
+        
+        Args:
+            name: 结果目录中的文件名（不含扩展名）
+        """
+        if self.memory_tracker.enabled:
+            self.memory_tracker.write(os.path.join(self.path_results, name))
         
     def collect_statistics(self, t):
         """收集当前时期的统计数据"""
@@ -350,59 +425,52 @@ class C5Model:
         self.st.price_mean_imi[t] = imi_price_avg
         # profit_tot已经在calc_profit方法中更新
         
+    def parameter_snapshot(self):
+        """
+        当前参数的只读快照（见statistic.parameter_snapshot），报告只读取这个快照
+        
+        Returns:
+            types.MappingProxyType: 属性名 -> 参数值
+        """
+        return parameter_snapshot(self)
+
     def generate_param_file(self):
         """生成与Java版本格式一致的param.txt文件"""
-        param_file = os.path.join(self.path_results, "param.txt")
-        with open(param_file, 'w', encoding='ascii') as f:
-            f.write("Multi Time: {}\n".format(self.mt))
-            f.write("drawCost: {}\n".format(self.draw_cost))
-            f.write("numOfFirm: {}\n".format(self.num_of_firm))
-            f.write("numOfTC: {}\n".format(self.num_of_tc))
-            f.write("TCValueCost: {}\n".format(self.tc_patients_cost))
-            f.write("numOfMol: {}\n".format(self.num_of_mol))
-            f.write("qMolNull: {}\n".format(self.q_mol_null))
-            f.write("patentDuration: {}\n".format(self.patent_duration))
-            f.write("CostOfSearch: {}\n".format(self.cost_of_search))
-            f.write("costOfResearchInn: {}\n".format(self.cost_of_research_inn))
-            f.write("costOfResearchImi: {}\n".format(self.cost_of_research_imi))
-            f.write("Initial Budget: {}\n".format(self.b))
-            f.write("qualityCheck: {}\n".format(self.quality_check))
-            f.write("AvgWeightInno: {}\n".format(self.speed_development_inno))
-            f.write("AvgWeightImi: {}\n".format(self.speed_development_imi))
-            f.write("Product exits below this threshold: {}\n".format(self.out_pro_limit))
-            f.write("Firm exits market after n unsuccesful searches: {}\n".format(self.search_failure))
-            f.write("interestRate: {}\n".format(self.interest_rate))
-            f.write("timeDevelop: {}\n".format(self.time_develop))
-            f.write("erosion marketing: {}\n".format(self.erosion))
-            f.write("Firm exits below this threshold: {}\n".format(self.e_failure))
-            f.write("costProd: {}\n".format(self.cost_prod))
-            f.write("eta: {}\n".format(self.omega))
-            f.write("elasticity in the markup formula: {}\n".format(self.elasticity))
-            f.write("endTime: {}\n".format(self.end_time))
-            f.write("patentOriz: {}\n".format(self.patent_width))
-            f.write("TCValueRand: {}\n".format(self.tc_patients_rand))
-            f.write("a avg: {}\n".format(self.a_value_cost))
-            f.write("a range: {}\n".format(self.a_value_rand))
-            f.write("b avg: {}\n".format(self.b_value_cost))
-            f.write("b range: {}\n".format(self.b_value_rand))
-            f.write("c avg: {}\n".format(self.c_value_cost))
-            f.write("c range: {}\n".format(self.c_value_rand))
-            f.write("qMolCost: {}\n".format(self.q_mol_cost))
-            f.write("qMolVar: {}\n".format(self.q_mol_var))
-            f.write("numOfSubMKT: {}\n".format(self.num_of_sub_mkt))
-            f.write("% of R&D budget invested in search: {}\n".format(self.quota_invested_in_search))
+        self.st.write_param_file(self.parameter_snapshot(), self.path_results)
 
-    def make_multiple_simulation(self):
+    def make_multiple_simulation(self, resume=False):
         """
         执行多次模拟并生成统计报告
+        
+        Args:
+            resume: 是否从检查点继续中断的多次模拟
         """
         print(f"Starting multiple simulations ({self.mt} iterations)...")
         
         # 记录开始时间
         total_start_time = time.time()
         
+        # 每次运行的种子只取决于运行序号，检查点只需保存统计数组和已完成的运行次数。
+        # multiout.txt 使用最后一次运行的治疗类别，因此最后一次运行总是重新执行
+        checkpoint = Checkpoint(os.path.join(self.path_results, CHECKPOINT_NAME), self.checkpoint_interval,
+                                {"mt": self.mt, "end_time": self.end_time, "num_of_tc": self.num_of_tc,
+                                 "num_of_firm": self.num_of_firm, "num_of_mol": self.num_of_mol,
+                                 "rng_seed": self.rng_seed, "dispersion": self.multi_dispersion})
+        self.dispersion = None
+        if self.multi_dispersion:
+            self.dispersion = OnlineStatistics(self.RUN_SERIES, self.end_time + 1, self.dispersion_quantiles)
+        self.st.init_multi(self.end_time)
+        completed = 0
+        state = checkpoint.load() if resume else None
+        if state is not None:
+            completed = state["completed"]
+            Checkpoint.restore(self.st, state["arrays"])
+            if self.dispersion is not None:
+                self.dispersion.load_state(state["extra"])
+            print(f"Resuming multiple simulations from run {completed + 1}")
+        
         # 执行多次模拟
-        for i in range(1, self.mt + 1):
+        for i in range(completed + 1, self.mt + 1):
             print(f"Running simulation {i}/{self.mt}")
             
             # 重置随机数生成器，使用不同的种子
@@ -423,86 +491,82 @@ class C5Model:
             
             # 执行主模拟循环
             for t in range(1, self.end_time + 1):
-                # 企业进入市场
-                self.entry(self.num_of_firm, t)
-                
-                # 分子价值更新
-                self.mol_value(t)
-                
-                # 搜索方法选择
-                self.method_of_search(t)
-                
-                # 研究活动
-                self.research_activity(t)
-                
-                # 检查分子是否达到质量标准
-                self.check_mol(t)
-                
-                # 计算市场份额
-                self.calc_share(t)
-                
-                # 计算利润
-                self.calc_profit(t)
-                
-                # 市场营销活动
-                self.mkting(t)
-                
-                # 退出规则检查
-                self.exit_rule(t)
-                
-                # 收集统计数据
-                self.collect_statistics(t)
+                self.simulate_period(t)
+            self.phase_timer.end_replicate()
+            self.memory_tracker.end_replicate()
             
             # 累积统计结果
             self.st.generate_multi_report(self.end_time, self.num_of_firm, self.num_of_tc)
+            if self.dispersion is not None:
+                for name in self.RUN_SERIES:
+                    self.dispersion.update(name, getattr(self.st, name))
             
             # 显示进度
             if i % 10 == 0 or i == self.mt:
                 print(f"Completed {i}/{self.mt} simulations")
+            
+            if i < self.mt and checkpoint.due(i):
+                checkpoint.save(i, Checkpoint.capture(self.st, self.MULTI_SERIES),
+                                extra=self.dispersion.state() if self.dispersion is not None else None)
         
-        # 生成多次模拟报告（生成与Java版本相同格式的multiout.txt）
-        self.generate_multiout_file()
+        checkpoint.remove()
         
-        # 生成param.txt文件
-        self.generate_param_file()
+        # 生成与Java版本相同格式的multiout.txt和param.txt
+        self.st.report_xls(self.parameter_snapshot(), self.path_results, self.tc_viewed())
+        for panel_format in self.multi_panel_formats:
+            self.st.print_multi_panels(os.path.join(self.path_results, "multiout"), self.mt, panel_format)
+        if self.dispersion is not None:
+            self.generate_dispersion_file()
+        self.write_phase_timing()
+        self.write_memory_profile()
         
         print(f"Multiple simulation reports generated in {self.path_results}")
         return True
         
     def generate_multiout_file(self):
-        """生成与Java版本格式一致的multiout.txt文件"""
-        output_file = os.path.join(self.path_results, "multiout.txt")
+        """生成与Java版本格式一致的multiout.txt文件，数值为各序列在多次运行之间的平均值"""
+        self.st.write_multiout_file(self.parameter_snapshot(), self.path_results, self.tc_viewed())
+
+    def tc_viewed(self):
+        """
+        最后一次运行中每个周期有产品的治疗类别数量
+        
+        Returns:
+            numpy.ndarray: 长度为end_time+1的整数数组
+        """
+        tc_viewed = np.zeros(self.end_time + 1, dtype=np.int64)
+        for tc_id in range(1, self.num_of_tc + 1):
+            if tc_id < len(self.tc) and self.tc[tc_id] is not None and hasattr(self.tc[tc_id], 'in_product'):
+                tc_viewed += np.asarray(self.tc[tc_id].in_product[:self.end_time + 1]) > 0
+        return tc_viewed
+
+    def generate_dispersion_file(self, level=0.95):
+        """
+        生成multiout_dispersion.txt：每个周期一行，列为各序列在运行之间的
+        均值、标准差、均值置信区间、最小/最大值和分位数
+        
+        Args:
+            level: 置信区间的置信水平
+        """
+        columns = []
+        for name in self.RUN_SERIES:
+            for label, values in self.dispersion.summary(name, level):
+                columns.append((f"{name}_{label.replace(' ', '_')}", values))
+        
+        output_file = os.path.join(self.path_results, "multiout_dispersion.txt")
         with open(output_file, 'w', encoding='ascii') as f:
-            # 严格按照Java版本的格式编写标题行（没有空格）
-            f.write("H,H_avg_TC,prod_inno,prod_imi,alive_firms_with_prod,TC_viewed,price_inno,price_imi\n")
-            
-            # 写入每个时间周期的数据
+            f.write("t," + ",".join(label for label, _ in columns) + "\n")
             for t in range(self.end_time + 1):
-                # 计算观察到的治疗类别数量
-                tc_viewed = 0
-                for tc_id in range(1, self.num_of_tc + 1):
-                    if tc_id < len(self.tc) and self.tc[tc_id] is not None and hasattr(self.tc[tc_id], 'in_product'):
-                        if self.tc[tc_id].in_product[t] > 0:
-                            tc_viewed += 1
-                
-                # 确保获取到的值不为None
-                h_value = self.st.multi_tot_h[t] if hasattr(self.st, 'multi_tot_h') and t < len(self.st.multi_tot_h) else 0.0
-                h_avg = self.st.multi_mean_h[t] if hasattr(self.st, 'multi_mean_h') and t < len(self.st.multi_mean_h) else 0.0
-                inno_prod = self.st.multi_inno_prod[t] if hasattr(self.st, 'multi_inno_prod') and t < len(self.st.multi_inno_prod) else 0
-                imi_prod = self.st.multi_imi_prod[t] if hasattr(self.st, 'multi_imi_prod') and t < len(self.st.multi_imi_prod) else 0
-                alive_f = self.st.multi_alive_f_with_prod[t] if hasattr(self.st, 'multi_alive_f_with_prod') and t < len(self.st.multi_alive_f_with_prod) else 0
-                price_inno = self.st.multi_price_inno[t] if hasattr(self.st, 'multi_price_inno') and t < len(self.st.multi_price_inno) else 0.0
-                price_imi = self.st.multi_price_imi[t] if hasattr(self.st, 'multi_price_imi') and t < len(self.st.multi_price_imi) else 0.0
-                
-                # 格式化为与Java版本完全一致的格式（注意precision和没有空格）
-                f.write("{:.6f},{:.6f},{},{},{},{},{:.6f},{:.6f}\n".format(
-                    h_value, h_avg, int(inno_prod), int(imi_prod), int(alive_f), tc_viewed, price_inno, price_imi))
+                f.write(f"{t}," + ",".join("{:.6f}".format(values[t]) for _, values in columns) + "\n")
 
     def init_tc(self):
         """Initialize therapeutic categories."""
         # Initialize array of therapeutic categories
         self.tc = [None] * (self.num_of_tc + 1)
         
+        # Molecule qualities mirrored as an array, row = TC, column = molecule
+        self.mol_q = np.zeros((self.num_of_tc + 1, self.num_of_mol + 1), dtype=np.int64)
+        
         # For each therapeutic category
         for i in range(1, self.num_of_tc + 1):
             # Generate random parameters for this TC
@@ -521,11 +585,8 @@ class C5Model:
             # Create the therapeutic category with these parameters
             self.tc[i] = TherapeuticCategory(i, patients, a_val, b_val, c_val, self.end_time, self)
             
-            # Set submarket values
-            self.tc[i].set_sub_mkt_value(self)
-            
-            # Calculate minimum quality requirements for each submarket
-            self.tc[i].calc_q_min_in_smkt(self)
+            # Set submarket values and minimum quality requirements
+            self.tc[i].update_sub_mkt(self)
             
             # For each molecule in the TC
             for j in range(self.num_of_mol + 1):
@@ -540,11 +601,13 @@ class C5Model:
                                   min(self.quality_max,
                                       self.q_mol_cost + self.r.nextGaussian() * self.q_mol_var)))
                     self.tc[i].mol[j].q = qual
+                    self.mol_q[i, j] = qual
 
     def init_firm(self):
         """Initialize firms."""
         # Create array of firms
         self.f = [None] * (self.num_of_firm + 1)
+        self.invalidate_imit_earnings()
         
         # For each potential firm
         for i in range(1, self.num_of_firm + 1):
@@ -607,6 +670,12 @@ class C5Model:
         """
         Determine the value of molecules in each TC.
         
+        Every molecule with zero quality gets one uniform draw; with
+        probability 1 - q_mol_null it receives a quality from a normal
+        distribution. The uniform draws are taken in bulk from the RNG and
+        scanned for the next success, so the random stream is the same as
+        drawing molecule by molecule.
+        
         Args:
             t (int): Current time period
         """
@@ -615,33 +684,41 @@ class C5Model:
             # Calculate the value of the TC (number of potential patients)
             self.tc[tc_id].dim[t] = self.tc[tc_id].value
             
-            # Use set_sub_mkt_value to update submarket values
-            self.tc[tc_id].set_sub_mkt_value(self)
+            # Submarket values and quality requirements only change with the TC value
+            self.tc[tc_id].update_sub_mkt(self)
+        
+        # Molecules not yet valued, in TC then molecule order
+        tc_idx, mol_idx = np.nonzero(self.mol_q[1:] == 0)
+        tc_idx += 1
+        
+        n = len(tc_idx)
+        pos = 0
+        while pos < n:
+            k = min(n - pos, self.MOL_VALUE_CHUNK)
+            draws = self.r.peekDoubles(k)
             
-            # Calculate minimum quality requirements for each submarket
-            self.tc[tc_id].calc_q_min_in_smkt(self)
+            # Zero-quality molecule unless the draw reaches q_mol_null (97% by default)
+            hits = np.flatnonzero(draws >= self.q_mol_null)
+            if len(hits) == 0:
+                self.r.skipDoubles(k)
+                pos += k
+                continue
             
-            # For each molecule in the TC
-            for j in range(self.num_of_mol + 1):
-                mol = self.tc[tc_id].mol[j]
-                
-                # Skip already valued molecules
-                if mol.q != 0:
-                    continue
-                
-                # Random draw to determine molecule quality
-                if self.r.random() < self.q_mol_null:
-                    # Zero-quality molecule (97% chance by default)
-                    mol.q = 0
-                else:
-                    # Non-zero quality molecule (3% chance)
-                    # Generate quality from normal distribution
-                    q = int(max(0, min(self.quality_max, 
-                                      self.q_mol_cost + self.q_mol_var * self.r.nextGaussian())))
-                    mol.q = q
-                    
-                    # Record statistics for therapeutic category
-                    self.tc[tc_id].dim[t] += 1
+            h = int(hits[0])
+            self.r.skipDoubles(h + 1)
+            tc_id = int(tc_idx[pos + h])
+            j = int(mol_idx[pos + h])
+            
+            # Non-zero quality molecule (3% chance)
+            # Generate quality from normal distribution
+            q = int(max(0, min(self.quality_max, 
+                              self.q_mol_cost + self.q_mol_var * self.r.nextGaussian())))
+            self.tc[tc_id].mol[j].q = q
+            self.mol_q[tc_id, j] = q
+            
+            # Record statistics for therapeutic category
+            self.tc[tc_id].dim[t] += 1
+            pos += h + 1
 
     def method_of_search(self, t):
         """
@@ -735,6 +812,48 @@ class C5Model:
                 # Record molecules for imitation
                 self.f[firm_id].on_pro_imi.record_memory_imi(self)
 
+    def invalidate_imit_earnings(self):
+        """Drop the cached per-TC imitable earnings table."""
+        self.imit_earnings_time = -1
+        self.imit_earnings = {}
+    
+    def imit_tc_earnings(self, t):
+        """
+        Best average earnings of an imitable product in each TC.
+        
+        The table is built in a single pass over all products the first time
+        it is requested in period t and shared by every firm afterwards. A
+        product is imitable when its firm is alive, it is still on the market
+        and its launch is at least patent_duration periods old.
+        
+        Args:
+            t (int): Current time period
+            
+        Returns:
+            dict: TC ID -> best average earnings, only TCs with positive earnings
+        """
+        if self.imit_earnings_time == t:
+            return self.imit_earnings
+        
+        table = {}
+        for j in range(1, self.num_of_firm + 1):
+            if self.f[j].alive:
+                for k in range(self.f[j].num_of_products):
+                    product = self.f[j].prod[k]
+                    if (product is not None and 
+                        not product.out and
+                        product.b_prod <= t - self.patent_duration):
+                        
+                        # Calculate average earnings
+                        avg_earn = product.avg_earnings(t)
+                        
+                        if avg_earn > table.get(product.tc, 0):
+                            table[product.tc] = avg_earn
+        
+        self.imit_earnings = table
+        self.imit_earnings_time = t
+        return table
+    
     def selection_imit_tc_best_earnings(self, firm, t):
         """
         Select therapeutic category to imitate based on earnings potential.
@@ -746,43 +865,22 @@ class C5Model:
         Returns:
             int: Selected TC ID or -1 if none found
         """
-        best_ta = -1
-        best_amount = 0
-        
-        # For each TC, evaluate potential earnings
-        for ta in range(1, self.num_of_tc + 1):
-            if hasattr(self.tc[ta], 'herfindahl') and self.tc[ta].herfindahl is not None and len(self.tc[ta].herfindahl) > 0:
-                # Skip TCs where the firm already operates
-                has_products = False
-                for j in range(self.f[firm].num_of_products):
-                    if self.f[firm].prod[j] is not None and self.f[firm].prod[j].tc == ta:
-                        has_products = True
-                        break
-                
-                if not has_products:
-                    # Find best product in the TC
-                    best_prod = 0
-                    best_earn = 0
-                    
-                    # Check all products in the TC
-                    for j in range(1, self.num_of_firm + 1):
-                        if self.f[j].alive:
-                            for k in range(self.f[j].num_of_products):
-                                if (self.f[j].prod[k] is not None and 
-                                    self.f[j].prod[k].tc == ta and
-                                    not self.f[j].prod[k].out and
-                                    self.f[j].prod[k].b_prod <= t - self.patent_duration):
-                                    
-                                    # Calculate average earnings
-                                    avg_earn = sum(self.f[j].prod[k].history_earnings) / t
-                                    
-                                    if avg_earn > best_earn:
-                                        best_earn = avg_earn
-                                        best_prod = k
-                                        best_amount = avg_earn
-                                        best_ta = ta
-        
-        return best_ta
+        table = self.imit_tc_earnings(t)
+        if not table:
+            return -1
+        
+        # Skip TCs where the firm already operates
+        own_tc = set()
+        for j in range(self.f[firm].num_of_products):
+            if self.f[firm].prod[j] is not None:
+                own_tc.add(self.f[firm].prod[j].tc)
+        
+        # The highest-numbered TC with an imitable product wins
+        for ta in sorted(table, reverse=True):
+            if ta not in own_tc and hasattr(self.tc[ta], 'herfindahl') and self.tc[ta].herfindahl is not None and len(self.tc[ta].herfindahl) > 0:
+                return ta
+        
+        return -1
 
     def research_activity(self, t):
         """
@@ -794,6 +892,10 @@ class C5Model:
         # For each firm, evaluate research projects and allocate budget
         for f in range(1, self.num_of_firm + 1):
             if self.f[f].alive:
+                # Drop projects already in development so selection cost stays flat
+                self.f[f].on_pro_inno.compact()
+                self.f[f].on_pro_imi.compact()
+
                 # Calculate capacity for innovative and imitative projects
                 capacity_inno = self.f[f].num_projects(True, self.time_develop / self.speed_development_inno)
                 capacity_imi = self.f[f].num_projects(False, self.time_develop / self.speed_development_imi)
@@ -959,7 +1061,7 @@ class C5Model:
                                     inno_count += 1
                                 
                                 # Store patients in product history
-                                product.history_patients[time] = product.num_patients
+                                product.record_patients(time, product.num_patients)
                                 
                                 # Update firm's share in this TC
                                 firm.sh_tc[tc_id] += product.num_patients
@@ -1044,7 +1146,7 @@ class C5Model:
                 earnings = self.cost_prod * product.mup * product.num_patients
                 
                 # Store earnings in product history
-                product.history_earnings[time] = earnings
+                product.record_earnings(time, earnings)
                 
                 # Add to firm's total profit
                 firm.tot_profit += earnings
@@ -1196,97 +1298,3 @@ class C5Model:
             else:
                 # Firm stays in business, but check if any products should exit
                 firm.products_out(self.out_pro_limit, self)
-
-# Helper classes will be defined in separate files
-
-class Files:
-    """File operations class"""
-    def __init__(self):
-        self.fp = None
-        self.fparam = None
-    
-    def create_dir(self, dir_name):
-        """Create directory if it doesn't exist"""
-        os.makedirs(dir_name, exist_ok=True)
-        
-    def print(self, text):
-        """Print to output file"""
-        if self.fp:
-            self.fp.write(f"{text}\n")
-            
-    def print_param(self, text):
-        """Print parameters to parameters file"""
-        if self.fparam:
-            self.fparam.write(f"{text}\n")
-            
-    def init_files(self, name):
-        """Initialize output files"""
-        try:
-            self.fp = open(f"{name}.csv", "w")
-            self.fparam = open(f"{name}_params.txt", "w")
-        except Exception as e:
-            print(f"Error opening files: {e}")
-            
-    def close_files(self):
-        """Close output files"""
-        if self.fp:
-            self.fp.close()
-        if self.fparam:
-            self.fparam.close()
-
-class Statistic:
-    """Statistics collection and reporting"""
-    def __init__(self):
-        """Initialize statistic arrays"""
-        self.tot_h = None                 # 总赫芬达尔指数
-        self.mean_h = None                # 平均赫芬达尔指数
-        self.inno_prod = None             # 创新产品数量
-        self.imi_prod = None              # 仿制产品数量
-        self.alive_f_with_prod = None     # 有产品的存活公司数量
-        self.price_mean_inno = None       # 创新产品平均价格
-        self.price_mean_imi = None        # 仿制产品平均价格
-        self.profit_tot = None            # 总利润
-        self.concentration = None         # 市场集中度
-        
-        # 多次运行的统计
-        self.multi_tot_h = None           # 多次运行的总赫芬达尔指数
-        self.multi_mean_h = None          # 多次运行的平均赫芬达尔指数
-        self.multi_inno_prod = None       # 多次运行的创新产品数量
-        self.multi_imi_prod = None        # 多次运行的仿制产品数量
-        self.multi_alive_f_with_prod = None  # 多次运行的有产品的存活公司数量
-        self.multi_price_inno = None      # 多次运行的创新产品平均价格
-        self.multi_price_imi = None       # 多次运行的仿制产品平均价格
-        
-    def create_array(self, end_time, num_of_ta, num_of_firm):
-        """Create arrays for statistics"""
-        # Initialize arrays
-        self.tot_h = [0.0] * (end_time + 1)                 # 总赫芬达尔指数
-        self.mean_h = [0.0] * (end_time + 1)                # 平均赫芬达尔指数
-        self.inno_prod = [0.0] * (end_time + 1)             # 创新产品数量
-        self.imi_prod = [0.0] * (end_time + 1)              # 仿制产品数量
-        self.alive_f_with_prod = [0.0] * (end_time + 1)     # 有产品的存活公司数量
-        self.price_mean_inno = [0.0] * (end_time + 1)       # 创新产品平均价格
-        self.price_mean_imi = [0.0] * (end_time + 1)        # 仿制产品平均价格
-        self.profit_tot = [0.0] * (end_time + 1)            # 总利润
-        self.concentration = [0.0] * (end_time + 1)         # 市场集中度
-        
-    def generate_multi_report(self, end_time, num_of_firm, num_of_tc):
-        """Initialize multi-run statistics"""
-        # 初始化多次运行的统计数组
-        self.multi_tot_h = [0.0] * (end_time + 1)           # 多次运行的总赫芬达尔指数
-        self.multi_mean_h = [0.0] * (end_time + 1)          # 多次运行的平均赫芬达尔指数
-        self.multi_inno_prod = [0.0] * (end_time + 1)       # 多次运行的创新产品数量
-        self.multi_imi_prod = [0.0] * (end_time + 1)        # 多次运行的仿制产品数量
-        self.multi_alive_f_with_prod = [0.0] * (end_time + 1)  # 多次运行的有产品的存活公司数量
-        self.multi_price_inno = [0.0] * (end_time + 1)      # 多次运行的创新产品平均价格
-        self.multi_price_imi = [0.0] * (end_time + 1)       # 多次运行的仿制产品平均价格
-        
-    def statistics(self, t, multi_time, num_of_ta, num_of_mol, num_of_firm):
-        """Collect statistics for current time period"""
-        # 在实际实现中，这里会收集各种统计数据
-        pass
-        
-    def report_xls(self, end_time, num_of_firm, num_of_ta):
-        """Generate report files"""
-        # 这里可以实现生成报告的逻辑
-        pass 
\ No newline at end of file
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+树状数组模块 - 用于按权重无放回抽取研发项目
+"""
+
+class FenwickTree:
+    """
+    树状数组（Fenwick tree），维护一组非负权重的前缀和
+
+    支持O(log n)的单点更新，以及O(log n)查找第一个前缀和大于给定值的位置，
+    即与线性累加概率直到超过随机数的做法选出同一个项目。
+
+    浮点增量更新会留下舍入误差，所有权重都置为0后树中的和可能是1e-15这样的
+    残差而不是0；因此另外精确记录正权重的个数，没有正权重时总和为0。
+    """
+
+    def __init__(self, weights):
+        """
+        以O(n)的代价建立树状数组
+
+        Args:
+            weights: 初始权重列表
+        """
+        self.n = len(weights)
+        self.weights = [float(w) for w in weights]  # 各位置的当前权重
+        self.tree = [0.0] * (self.n + 1)            # 树状数组（下标从1开始）
+        self.positive = sum(1 for w in self.weights if w > 0)  # 正权重的个数
+        for i in range(1, self.n + 1):
+            self.tree[i] += self.weights[i - 1]
+            parent = i + (i & -i)
+            if parent <= self.n:
+                self.tree[parent] += self.tree[i]
+
+        # 最高的2的幂，用于二分下降查找
+        self.top = 1
+        while self.top * 2 <= self.n:
+            self.top *= 2
+
+    def total(self):
+        """
+        所有权重之和
+
+        Returns:
+            float: 权重总和，没有正权重时恰好为0
+        """
+        if self.positive == 0:
+            return 0.0
+        result = 0.0
+        i = self.n
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def set(self, idx, weight):
+        """
+        修改某个位置的权重
+
+        Args:
+            idx: 位置（从0开始）
+            weight: 新的权重
+        """
+        weight = float(weight)
+        old = self.weights[idx]
+        delta = weight - old
+        if delta == 0:
+            return
+        self.positive += (weight > 0) - (old > 0)
+        self.weights[idx] = weight
+        i = idx + 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, target):
+        """
+        查找第一个前缀和大于 target 的位置
+
+        Args:
+            target: 目标值（通常为随机数乘以权重总和）
+
+        Returns:
+            int: 位置（从0开始），如果不存在则返回-1
+        """
+        if self.n == 0:
+            return -1
+
+        pos = 0
+        remaining = target
+        step = self.top
+        while step > 0:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self.tree[nxt]
+            step //= 2
+
+        return pos if pos < self.n else -1
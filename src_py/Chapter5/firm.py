@@ -13,6 +13,9 @@ from .product import Product
 class SearchAction:
     """搜索行为类，表示公司寻找新分子的活动"""
     
+    __slots__ = ("budget", "num_draws", "number_draw", "perf", "count", "bad_perf", "portfolio_tc",
+                 "portfolio_mol")
+    
     def __init__(self):
         """初始化搜索行为"""
         self.budget = 0.0                   # 搜索预算
@@ -67,8 +70,19 @@ class SearchAction:
                     self.bad_perf += 1
 
 class Memory:
-    """记忆类，存储公司的研发记忆"""
-    
+    """
+    记忆类，存储公司的研发记忆
+
+    记忆以并行的NumPy数组保存（治疗类别、分子、研发标志、价值、份数），容量不足时
+    按倍数扩展；(tc, mol) 集合提供O(1)的成员查询，compact() 清除已进入研发
+    的项目，使项目选择的开销不随已完成的项目数增长。每期重复记录的仿制项目
+    （record_memory_imi）合并到同一行并增加份数，记忆的大小不随时间增长。
+    """
+
+    INITIAL_CAPACITY = 16                   # 初始数组容量
+
+    __slots__ = ("molecules_found", "size", "_tc", "_mol", "_on", "_value", "_count", "_keys", "_rows")
+
     def __init__(self, end_time):
         """
         初始化记忆
@@ -76,14 +90,136 @@ class Memory:
         Args:
             end_time: 模拟结束时间
         """
-        self.tc = []                        # 治疗类别ID列表
-        self.mol = []                       # 分子ID列表
         self.molecules_found = 0            # 找到的分子数量
-        self.mem_of_tc = []                 # 记忆中的治疗类别ID
-        self.mem_of_mol = []                # 记忆中的分子ID
-        self.on = []                        # 是否正在研发的标志
-        self.value = []                     # 分子价值
+        self.size = 0                       # 当前记忆中的项目数量
+        self._tc = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)       # 治疗类别ID
+        self._mol = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)      # 分子ID
+        self._on = np.zeros(self.INITIAL_CAPACITY, dtype=np.int8)        # 是否正在研发的标志
+        self._value = np.zeros(self.INITIAL_CAPACITY, dtype=np.float64)  # 分子价值（每份）
+        self._count = np.zeros(self.INITIAL_CAPACITY, dtype=np.int64)    # 尚未进入研发的份数
+        self._keys = set()                  # 曾记录过的 (tc, mol) 组合
+        self._rows = {}                     # (tc, mol) -> 合并重复记录、尚未全部进入研发的行
+
+    @property
+    def mem_of_tc(self):
+        """记忆中的治疗类别ID"""
+        return self._tc[:self.size]
+
+    @property
+    def mem_of_mol(self):
+        """记忆中的分子ID"""
+        return self._mol[:self.size]
+
+    @property
+    def on(self):
+        """是否正在研发的标志"""
+        return self._on[:self.size]
+
+    @property
+    def value(self):
+        """分子价值（每份）"""
+        return self._value[:self.size]
+
+    @property
+    def count(self):
+        """每行尚未进入研发的份数（on为1的行为0）"""
+        return self._count[:self.size]
+
+    # 兼容旧的属性名
+    tc = mem_of_tc
+    mol = mem_of_mol
+
+    def __len__(self):
+        return self.size
+
+    def contains(self, tc_id, mol_id):
+        """
+        检查 (tc, mol) 是否曾记录在记忆中
+        
+        Args:
+            tc_id: 治疗类别ID
+            mol_id: 分子ID
+            
+        Returns:
+            bool: 是否存在
+        """
+        return (int(tc_id), int(mol_id)) in self._keys
+
+    def _ensure_capacity(self, required_size):
+        """
+        确保数组容量足够，不足时按倍数扩展
+        
+        Args:
+            required_size: 所需容量
+        """
+        capacity = len(self._tc)
+        if required_size <= capacity:
+            return
+        while capacity < required_size:
+            capacity *= 2
+        for name in ('_tc', '_mol', '_on', '_value', '_count'):
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def append(self, tc_id, mol_id, mol_value):
+        """
+        添加一个项目到记忆中
         
+        Args:
+            tc_id: 治疗类别ID
+            mol_id: 分子ID
+            mol_value: 分子价值
+        """
+        self._ensure_capacity(self.size + 1)
+        self._tc[self.size] = tc_id
+        self._mol[self.size] = mol_id
+        self._on[self.size] = 0
+        self._value[self.size] = mol_value
+        self._count[self.size] = 1
+        self._keys.add((int(tc_id), int(mol_id)))
+        self.size += 1
+
+    def add(self, tc_id, mol_id, mol_value):
+        """
+        添加一份项目；同一 (tc, mol) 已有尚未全部进入研发的合并行时只增加该行的份数
+        
+        每份项目在选择时的权重与单独一行相同（合并行的权重为每份权重乘以份数），
+        价值不同时合并行记录各份的平均价值。
+        
+        Args:
+            tc_id: 治疗类别ID
+            mol_id: 分子ID
+            mol_value: 分子价值
+        """
+        key = (int(tc_id), int(mol_id))
+        row = self._rows.get(key)
+        if row is None:
+            self._rows[key] = self.size
+            self.append(tc_id, mol_id, mol_value)
+            return
+        count = self._count[row]
+        if mol_value != self._value[row]:
+            self._value[row] = (self._value[row] * count + mol_value) / (count + 1)
+        self._count[row] = count + 1
+
+    def switch_on(self, pos):
+        """
+        第 pos 行的一份项目进入研发，全部份数进入研发后该行的 on 置为1
+        
+        Args:
+            pos: 行号
+        """
+        self._count[pos] -= 1
+        if self._count[pos] <= 0:
+            self._count[pos] = 0
+            self._on[pos] = 1
+            # 之后再次记录的同一分子新建一行
+            key = (int(self._tc[pos]), int(self._mol[pos]))
+            if self._rows.get(key) == pos:
+                del self._rows[key]
+
     def record_memory(self, mol_list, tc_list, count, model):
         """
         记录找到的分子
@@ -96,22 +232,15 @@ class Memory:
         """
         # 记录找到的分子
         for i in range(count):
-            self.tc.append(tc_list[i])
-            self.mol.append(mol_list[i])
-            self.mem_of_tc.append(tc_list[i])
-            self.mem_of_mol.append(mol_list[i])
             self.molecules_found += 1
             
             # 记录分子的值和研发状态
             tc_id = tc_list[i]
             mol_id = mol_list[i]
             
-            # 分子价值（治疗类别的市场价值乘以分子质量）
+            # 分子价值（治疗类别的市场价值乘以分子质量），初始未研发状态
             mol_value = model.tc[tc_id].value * model.tc[tc_id].mol[mol_id].q / 100.0
-            self.value.append(mol_value)
-            
-            # 初始未研发状态
-            self.on.append(0)
+            self.append(tc_id, mol_id, mol_value)
     
     def record_memory_imi(self, model):
         """
@@ -130,20 +259,52 @@ class Memory:
                     if (model.tc[tc_id].mol[mol_id].patent and 
                         model.tc[tc_id].mol[mol_id].patent_expired):
                         
-                        # 记录这个分子用于仿制
-                        self.mem_of_tc.append(tc_id)
-                        self.mem_of_mol.append(mol_id)
-                        
                         # 分子价值（治疗类别的市场价值乘以分子质量，乘以0.8因为是仿制药）
+                        # 每期都会再次记录，重复的记录合并为同一行的份数
                         mol_value = model.tc[tc_id].value * model.tc[tc_id].mol[mol_id].q * 0.8 / 100.0
-                        self.value.append(mol_value)
-                        
-                        # 初始未研发状态
-                        self.on.append(0)
+                        self.add(tc_id, mol_id, mol_value)
+
+    def compact(self):
+        """
+        清除已全部进入研发（on为1）的项目，其余项目保持原来的顺序
+        
+        项目选择只考虑 on 为0的项目，因此结果不变。权重为0的项目（专利已过期或属于
+        其他公司）不能清除：它们仍计入可选项目的数量（决定抽取随机数的次数），
+        也可能被 select_mol 选中。已清除项目的 (tc, mol) 仍保留在成员集合中，
+        contains() 的结果不变；之后再次记录时新建一行。
+        
+        Returns:
+            int: 清除的项目数量
+        """
+        if self.size == 0:
+            return 0
+        
+        keep = self._on[:self.size] == 0
+        removed = self.size - int(np.count_nonzero(keep))
+        if removed == 0:
+            return 0
+        
+        new_size = self.size - removed
+        if self._rows:
+            # 合并行的新行号：保留的行依次编号
+            new_index = np.cumsum(keep) - 1
+            self._rows = {key: int(new_index[row]) for key, row in self._rows.items() if keep[row]}
+        for name in ('_tc', '_mol', '_on', '_value', '_count'):
+            arr = getattr(self, name)
+            arr[:new_size] = arr[:self.size][keep]
+        self.size = new_size
+        return removed
 
 class Firm:
     """公司类，表示制药产业中的公司"""
     
+    __slots__ = ("budget", "mkting_budget", "rd_budget", "mkting_share", "rd_share", "search_share",
+                 "innovator", "innovatort", "imin", "sh_tc", "sh_ta1", "tot_share", "tot_share_quantity",
+                 "tot_profit", "total_reached_patients", "num_of_products", "prod", "tot_prod",
+                 "cost_of_inno", "cost_of_imi", "on_pro_inno", "on_pro_imi", "search_action", "alive",
+                 "on_mkt", "num_inno", "num_imi", "ntc_f", "tc_f", "counter_ta", "tot_tc", "budget_m",
+                 "budget_res", "search_expenditure", "research_expenditure", "v_tot_ta_mkting")
+    
     def __init__(self, initial_budget, mkting_share, rd_share, search_share, 
                  num_tc, is_innovator, innovator_tendency, model):
         """
@@ -305,6 +466,9 @@ class Firm:
         for i in range(1, self.num_of_products + 1):
             if i < len(self.prod) and self.prod[i] is not None:
                 self.prod[i].out = True
+        
+        # 退出的公司不再提供可仿制的产品
+        model.invalidate_imit_earnings()
     
     def products_out(self, out_pro_limit, model):
         """
@@ -450,7 +614,7 @@ class Firm:
             int: 选择的分子索引，如果没找到合适的分子则返回-1
         """
         # Check if index is valid
-        if idx < 0 or idx >= len(memory.mem_of_tc):
+        if idx < 0 or idx >= memory.size:
             return -1
             
         # 获取要研究的治疗类别
@@ -466,25 +630,23 @@ class Firm:
             best_idx = -1
             best_value = 0.0
             
-            for i in range(len(memory.mem_of_tc)):
-                # Skip invalid indices
-                if i < 0 or i >= len(memory.on) or memory.on[i] != 0:
+            mem_tc = memory.mem_of_tc
+            on = memory.on
+            value = memory.value
+            for i in range(memory.size):
+                if on[i] != 0:
                     continue
                     
                 # Get therapeutic category
-                alt_tc = memory.mem_of_tc[i]
+                alt_tc = mem_tc[i]
                 
                 # Skip invalid TC values
                 if alt_tc < 0 or alt_tc >= len(ta_counts):
                     continue
                     
                 if ta_counts[alt_tc] <= 2:  # 该类别研发数量少
-                    # Skip invalid value indices
-                    if i >= len(memory.value):
-                        continue
-                        
-                    if memory.value[i] > best_value:
-                        best_value = memory.value[i]
+                    if value[i] > best_value:
+                        best_value = value[i]
                         best_idx = i
             
             # 如果找到了更好的选择，返回它
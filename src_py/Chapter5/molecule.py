@@ -8,6 +8,9 @@
 class Molecule:
     """分子类，代表药物发现过程中的分子"""
     
+    __slots__ = ("id", "q", "patent", "patent_firm", "patent_time", "viewed", "view_time", "view_firm",
+                 "patent_by", "focal", "products_on", "on_mol_res", "now_free")
+    
     def __init__(self, mol_id=0, quality=0):
         """
         初始化分子对象
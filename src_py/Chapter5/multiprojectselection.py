@@ -6,6 +6,8 @@ MultiProjectSelection class for the pharmaceutical industry model.
 This class contains methods to select the most promising research projects.
 """
 
+from .fenwick_tree import FenwickTree
+
 class MultiProjectSelection:
     """
     Class to manage project selection for firms.
@@ -33,11 +35,83 @@ class MultiProjectSelection:
                 return True
         return False
     
+    @staticmethod
+    def project_weights(f, t, model):
+        """
+        Compute the selection weight of every project in the firm's memory.
+        
+        Projects already in development get weight 0 and are not counted as
+        available. Innovative projects are weighted by value times the
+        remaining patent life (equation 4 in chapter 5); imitative projects by
+        value, skipping molecules already in the innovative portfolio. A row
+        holding several copies of a project (Memory.count) counts once per copy.
+        
+        Args:
+            f (int): Firm ID
+            t (int): Current time period
+            model: C5Model instance
+            
+        Returns:
+            tuple: (memory, weights, available, ta) where weights are per copy,
+                available holds the number of copies of each project that can
+                be selected and ta counts them per TC
+        """
+        firm = model.f[f]
+        inno = firm.on_pro_inno
+        ta = [0] * model.num_of_tc
+        
+        if firm.innovatort:
+            memory = inno
+        else:
+            memory = firm.on_pro_imi
+        
+        weights = [0.0] * memory.size
+        available = [0] * memory.size
+        count = memory.count
+        
+        for i in range(memory.size):
+            # Skip if already in development
+            if memory.on[i] != 0:
+                continue
+            
+            tc_id = memory.mem_of_tc[i]
+            mol_id = memory.mem_of_mol[i]
+            
+            if firm.innovatort:
+                mol = model.tc[tc_id].mol[mol_id]
+                
+                # Calculate patent time multiplier
+                multiplier = (model.patent_duration - (t - mol.patent_time)) / model.patent_duration
+                
+                # Only count if firm owns the patent or multiplier is positive
+                if not (mol.patent_by == f and multiplier > 0):
+                    multiplier = 0
+                
+                weights[i] = memory.value[i] * multiplier
+            else:
+                # Skip if already in innovative portfolio
+                if inno.contains(tc_id, mol_id):
+                    continue
+                
+                weights[i] = memory.value[i]
+            
+            available[i] = int(count[i])
+            if tc_id < len(ta):
+                ta[tc_id] += available[i]
+        
+        return memory, weights, available, ta
+    
     @staticmethod
     def order_value(val, cap, f, t, model):
         """
         Order project values and select the most promising ones.
         
+        Each unit of capacity draws one uniform number and picks the first
+        project whose cumulative normalised weight exceeds it. Weights are
+        kept in a Fenwick tree, so every pick costs O(log n) instead of two
+        passes over the memory. A row with several copies weighs as much as
+        the copies would separately and loses one copy per pick.
+        
         Args:
             val (list): List of values
             cap (int): Capacity (how many projects to select)
@@ -45,180 +119,52 @@ class MultiProjectSelection:
             t (int): Current time period
             model: C5Model instance
         """
+        firm = model.f[f]
+        memory, weights, available, ta = MultiProjectSelection.project_weights(f, t, model)
+        tree = FenwickTree([w * n for w, n in zip(weights, available)])
+        c = sum(available)
+        
         # For each potential project
         for count in range(cap):
-            pos_best = -1
-            c = 0
-            ta = [0] * model.num_of_tc
+            # If there are no available projects
+            if c == 0:
+                break
             
-            # If the firm is innovative
-            if model.f[f].innovatort:
-                vtot = 0.0
-                
-                # Calculate total value for normalization
-                for i in range(len(model.f[f].on_pro_inno.mem_of_tc)):
-                    # Skip if index out of range
-                    if i >= len(model.f[f].on_pro_inno.on) or model.f[f].on_pro_inno.on[i] != 0:
-                        continue
-                        
-                    # Check if TC and molecule indices are valid
-                    tc_id = model.f[f].on_pro_inno.mem_of_tc[i]
-                    if tc_id >= len(model.tc) or model.tc[tc_id] is None:
-                        continue
-                        
-                    mol_id = model.f[f].on_pro_inno.mem_of_mol[i]
-                    if mol_id >= len(model.tc[tc_id].mol) or model.tc[tc_id].mol[mol_id] is None:
-                        continue
-                    
-                    # Calculate patent time multiplier
-                    patent_time = model.tc[tc_id].mol[mol_id].patent_time
-                    
-                    multiplier = (model.patent_duration - (t - patent_time)) / model.patent_duration
-                    
-                    # Only count if firm owns the patent or multiplier is positive
-                    if model.tc[tc_id].mol[mol_id].patent_by == f and multiplier > 0:
-                        pass  # Keep multiplier as is
-                    else:
-                        multiplier = 0
-                    
-                    # Add to total value (equation 4 in chapter 5)
-                    if i < len(model.f[f].on_pro_inno.value):
-                        vtot += model.f[f].on_pro_inno.value[i] * multiplier
-                        c += 1
-                        if tc_id < len(ta):
-                            ta[tc_id] += 1
-                
-                # If there are available projects
-                if c > 0:
-                    casual = model.r.random()
-                    ti = 0.0
-                    exit_flag = False
-                    
-                    # Select project with probability proportional to value
-                    for i in range(len(model.f[f].on_pro_inno.mem_of_tc)):
-                        # Skip if index out of range
-                        if i >= len(model.f[f].on_pro_inno.on) or model.f[f].on_pro_inno.on[i] != 0 or exit_flag:
-                            continue
-                            
-                        # Check if TC and molecule indices are valid
-                        tc_id = model.f[f].on_pro_inno.mem_of_tc[i]
-                        if tc_id >= len(model.tc) or model.tc[tc_id] is None:
-                            continue
-                            
-                        mol_id = model.f[f].on_pro_inno.mem_of_mol[i]
-                        if mol_id >= len(model.tc[tc_id].mol) or model.tc[tc_id].mol[mol_id] is None:
-                            continue
-                        
-                        patent_time = model.tc[tc_id].mol[mol_id].patent_time
-                        
-                        multiplier = (model.patent_duration - (t - patent_time)) / model.patent_duration
-                        
-                        if model.tc[tc_id].mol[mol_id].patent_by == f and multiplier > 0:
-                            pass  # Keep multiplier as is
-                        else:
-                            multiplier = 0
-                        
-                        # Calculate probability based on value
-                        if vtot > 0 and i < len(model.f[f].on_pro_inno.value):
-                            ti += (model.f[f].on_pro_inno.value[i] * multiplier / vtot)
-                        
-                        if not exit_flag and ti > casual:
-                            exit_flag = True
-                            pos_best = model.f[f].select_mol(ta, i, model.f[f].on_pro_inno)
-                
-                # If a project was selected, mark it as active
-                if pos_best != -1 and pos_best < len(model.f[f].on_pro_inno.on):
-                    model.f[f].on_pro_inno.on[pos_best] = 1
-                    tc_id = model.f[f].on_pro_inno.mem_of_tc[pos_best]
-                    mol_id = model.f[f].on_pro_inno.mem_of_mol[pos_best]
-                    
-                    # Ensure TC and molecule indices are valid before incrementing counters
-                    if tc_id < len(model.tc) and model.tc[tc_id] is not None:
-                        if mol_id < len(model.tc[tc_id].mol) and model.tc[tc_id].mol[mol_id] is not None:
-                            model.tc[tc_id].mol[mol_id].on_mol_res += 1
-                            model.tc[tc_id].on_ta_res += 1
+            casual = model.r.random()
+            vtot = tree.total()
             
-            # If the firm is imitative
-            else:
-                vtot = 0.0
-                
-                # Calculate total value for normalization
-                for i in range(len(model.f[f].on_pro_imi.mem_of_tc)):
-                    # Skip if index out of range or already in development
-                    if (i >= len(model.f[f].on_pro_imi.on) or 
-                        model.f[f].on_pro_imi.on[i] != 0):
-                        continue
-                    
-                    # Skip if already being researched innovatively
-                    tc_id = model.f[f].on_pro_imi.mem_of_tc[i] if i < len(model.f[f].on_pro_imi.mem_of_tc) else -1
-                    mol_id = model.f[f].on_pro_imi.mem_of_mol[i] if i < len(model.f[f].on_pro_imi.mem_of_mol) else -1
-                    
-                    if tc_id == -1 or mol_id == -1:
-                        continue
-                    
-                    # Check if already in innovative portfolio
-                    if MultiProjectSelection.in_vet(
-                        model.f[f].on_pro_inno.mem_of_tc,
-                        model.f[f].on_pro_inno.mem_of_mol,
-                        tc_id, mol_id):
-                        continue
-                    
-                    # Add to total value
-                    if i < len(model.f[f].on_pro_imi.value):
-                        vtot += model.f[f].on_pro_imi.value[i]
-                        c += 1
-                        if tc_id < len(ta):
-                            ta[tc_id] += 1
-                
-                # If there are available projects
-                if c > 0:
-                    casual = model.r.random()
-                    ti = 0.0
-                    exit_flag = False
-                    
-                    # Select project with probability proportional to value
-                    for i in range(len(model.f[f].on_pro_imi.mem_of_tc)):
-                        # Skip if index out of range, already in development, or already selected
-                        if (i >= len(model.f[f].on_pro_imi.on) or 
-                            model.f[f].on_pro_imi.on[i] != 0 or 
-                            exit_flag):
-                            continue
-                        
-                        # Skip if already being researched innovatively
-                        tc_id = model.f[f].on_pro_imi.mem_of_tc[i] if i < len(model.f[f].on_pro_imi.mem_of_tc) else -1
-                        mol_id = model.f[f].on_pro_imi.mem_of_mol[i] if i < len(model.f[f].on_pro_imi.mem_of_mol) else -1
-                        
-                        if tc_id == -1 or mol_id == -1:
-                            continue
-                        
-                        # Check if already in innovative portfolio
-                        if MultiProjectSelection.in_vet(
-                            model.f[f].on_pro_inno.mem_of_tc,
-                            model.f[f].on_pro_inno.mem_of_mol,
-                            tc_id, mol_id):
-                            continue
-                        
-                        # Calculate probability based on value
-                        if vtot > 0 and i < len(model.f[f].on_pro_imi.value):
-                            ti += (model.f[f].on_pro_imi.value[i] / vtot)
-                        
-                        if not exit_flag and ti > casual:
-                            exit_flag = True
-                            pos_best = model.f[f].select_mol(ta, i, model.f[f].on_pro_imi)
-                
-                # If a project was selected, mark it as active
-                if pos_best != -1 and pos_best < len(model.f[f].on_pro_imi.on):
-                    model.f[f].on_pro_imi.on[pos_best] = 1
-                    
-                    # Get TC and molecule IDs
-                    tc_id = model.f[f].on_pro_imi.mem_of_tc[pos_best] if pos_best < len(model.f[f].on_pro_imi.mem_of_tc) else -1
-                    mol_id = model.f[f].on_pro_imi.mem_of_mol[pos_best] if pos_best < len(model.f[f].on_pro_imi.mem_of_mol) else -1
-                    
-                    # Ensure TC and molecule indices are valid before incrementing counters
-                    if tc_id != -1 and tc_id < len(model.tc) and model.tc[tc_id] is not None:
-                        if mol_id != -1 and mol_id < len(model.tc[tc_id].mol) and model.tc[tc_id].mol[mol_id] is not None:
-                            model.tc[tc_id].mol[mol_id].on_mol_res += 1
-                            model.tc[tc_id].on_ta_res += 1
+            # Select project with probability proportional to value
+            pos_best = -1
+            if vtot > 0:
+                i = tree.find(casual * vtot)
+                if i != -1:
+                    pos_best = firm.select_mol(ta, i, memory)
+            
+            # If a project was selected, mark it as active
+            if pos_best != -1:
+                MultiProjectSelection._switch_on(memory, pos_best, model)
+                if available[pos_best]:
+                    available[pos_best] -= 1
+                    c -= 1
+                    tc_id = memory.mem_of_tc[pos_best]
+                    if tc_id < len(ta):
+                        ta[tc_id] -= 1
+                tree.set(pos_best, weights[pos_best] * available[pos_best])
+    
+    @staticmethod
+    def _switch_on(memory, pos, model):
+        """
+        Mark one copy of a project in memory as active and update research counters.
+        
+        Args:
+            memory: Firm Memory (innovative or imitative)
+            pos (int): Index of the project in memory
+            model: C5Model instance
+        """
+        memory.switch_on(pos)
+        tc_id = memory.mem_of_tc[pos]
+        model.tc[tc_id].mol[memory.mem_of_mol[pos]].on_mol_res += 1
+        model.tc[tc_id].on_ta_res += 1
     
     @staticmethod
     def in_projects(weights, values, capacity, f, t, model):
@@ -10,6 +10,10 @@ import numpy as np
 class Product:
     """药物产品类，表示上市的药物"""
     
+    __slots__ = ("id", "tc", "mol_id", "firm", "imitative", "qp", "c", "mup", "p", "pos", "mkting",
+                 "num_patients", "b_prod", "out", "cum_patients", "cum_earnings", "last_patients",
+                 "last_earnings", "patients_time", "earnings_time")
+    
     def __init__(self, prod_id, tc, mol, f, is_imitative, quality, model):
         """
         初始化药物产品
@@ -40,9 +44,57 @@ class Product:
         self.b_prod = 0                    # 产品上市时间
         self.out = False                   # 产品是否退出市场
         
-        # 历史数据
-        self.history_patients = [0.0] * (model.end_time + 1)  # 每个时间步的患者数量
-        self.history_earnings = [0.0] * (model.end_time + 1)  # 每个时间步的收益
+        # 历史数据只保留累计值和最近一次记录的值（模型和输出都不使用逐期序列）
+        self.cum_patients = 0.0            # 累计患者数量
+        self.cum_earnings = 0.0            # 累计收益
+        self.last_patients = 0.0           # 最近一次记录的患者数量
+        self.last_earnings = 0.0           # 最近一次记录的收益
+        self.patients_time = -1            # 最近一次记录患者数量的时间
+        self.earnings_time = -1            # 最近一次记录收益的时间
+    
+    def record_patients(self, time, patients):
+        """
+        记录某个时间步的患者数量
+        
+        Args:
+            time: 当前时间
+            patients: 患者数量
+        """
+        # 同一时间步重复记录时覆盖之前的值
+        if time == self.patients_time:
+            self.cum_patients -= self.last_patients
+        self.cum_patients += patients
+        self.last_patients = patients
+        self.patients_time = time
+    
+    def record_earnings(self, time, earnings):
+        """
+        记录某个时间步的收益
+        
+        Args:
+            time: 当前时间
+            earnings: 收益
+        """
+        # 同一时间步重复记录时覆盖之前的值
+        if time == self.earnings_time:
+            self.cum_earnings -= self.last_earnings
+        self.cum_earnings += earnings
+        self.last_earnings = earnings
+        self.earnings_time = time
+    
+    def avg_earnings(self, time):
+        """
+        计算到当前时间为止的平均收益
+        
+        Args:
+            time: 当前时间
+            
+        Returns:
+            float: 平均收益
+        """
+        if time <= 0:
+            return 0.0
+        return self.cum_earnings / time
         
     def prob_of_sell(self, time, firm_id, model):
         """
@@ -6,9 +6,82 @@
 """
 
 import os
+import types
 import numpy as np
-import pandas as pd
-import math
+
+from src_py.Chapter3.panel_writer import write_panels
+
+# param.txt 的各行：(Java版本的标签, 模型属性名)
+PARAM_LABELS = (
+    ("Multi Time", "mt"),
+    ("drawCost", "draw_cost"),
+    ("numOfFirm", "num_of_firm"),
+    ("numOfTC", "num_of_tc"),
+    ("TCValueCost", "tc_patients_cost"),
+    ("numOfMol", "num_of_mol"),
+    ("qMolNull", "q_mol_null"),
+    ("patentDuration", "patent_duration"),
+    ("CostOfSearch", "cost_of_search"),
+    ("costOfResearchInn", "cost_of_research_inn"),
+    ("costOfResearchImi", "cost_of_research_imi"),
+    ("Initial Budget", "b"),
+    ("qualityCheck", "quality_check"),
+    ("AvgWeightInno", "speed_development_inno"),
+    ("AvgWeightImi", "speed_development_imi"),
+    ("Product exits below this threshold", "out_pro_limit"),
+    ("Firm exits market after n unsuccesful searches", "search_failure"),
+    ("interestRate", "interest_rate"),
+    ("timeDevelop", "time_develop"),
+    ("erosion marketing", "erosion"),
+    ("Firm exits below this threshold", "e_failure"),
+    ("costProd", "cost_prod"),
+    ("eta", "omega"),
+    ("elasticity in the markup formula", "elasticity"),
+    ("endTime", "end_time"),
+    ("patentOriz", "patent_width"),
+    ("TCValueRand", "tc_patients_rand"),
+    ("a avg", "a_value_cost"),
+    ("a range", "a_value_rand"),
+    ("b avg", "b_value_cost"),
+    ("b range", "b_value_rand"),
+    ("c avg", "c_value_cost"),
+    ("c range", "c_value_rand"),
+    ("qMolCost", "q_mol_cost"),
+    ("qMolVar", "q_mol_var"),
+    ("numOfSubMKT", "num_of_sub_mkt"),
+    ("% of R&D budget invested in search", "quota_invested_in_search"),
+)
+
+# 单次运行的序列 -> 多次模拟累计的序列
+MULTI_OF = {
+    "tot_h": "multi_tot_h",
+    "mean_h": "multi_mean_h",
+    "inno_prod": "multi_inno_prod",
+    "imi_prod": "multi_imi_prod",
+    "alive_f_with_prod": "multi_alive_f_with_prod",
+    "price_mean_inno": "multi_price_inno",
+    "price_mean_imi": "multi_price_imi",
+}
+
+# 价格序列 -> 价格为正的运行次数（Java版本的zeros计数的补数）
+PRICE_RUNS = {
+    "price_mean_inno": "multi_price_inno_runs",
+    "price_mean_imi": "multi_price_imi_runs",
+}
+
+
+def parameter_snapshot(model):
+    """
+    读取模型参数的只读快照，报告只依赖这个快照，不需要重新创建模型
+    
+    Args:
+        model: C5Model对象
+        
+    Returns:
+        types.MappingProxyType: 属性名 -> 参数值（按PARAM_LABELS的顺序）
+    """
+    return types.MappingProxyType({attr: getattr(model, attr) for _, attr in PARAM_LABELS})
+
 
 class Statistic:
     """统计类，用于收集和分析模拟结果"""
@@ -34,6 +107,8 @@ class Statistic:
         self.multi_alive_f_with_prod = None  # 多次运行的有产品的存活公司数量
         self.multi_price_inno = None      # 多次运行的创新产品平均价格
         self.multi_price_imi = None       # 多次运行的仿制产品平均价格
+        self.multi_price_inno_runs = None # 创新产品平均价格为正的运行次数
+        self.multi_price_imi_runs = None  # 仿制产品平均价格为正的运行次数
     
     def create_array(self, end_time, num_of_tc, num_of_firm):
         """
@@ -70,6 +145,8 @@ class Statistic:
         self.multi_alive_f_with_prod = np.zeros(end_time + 1)
         self.multi_price_inno = np.zeros(end_time + 1)
         self.multi_price_imi = np.zeros(end_time + 1)
+        self.multi_price_inno_runs = np.zeros(end_time + 1)
+        self.multi_price_imi_runs = np.zeros(end_time + 1)
     
     def statistics(self, t, multi_time, num_of_tc, num_of_mol, num_of_firm):
         """
@@ -86,104 +163,65 @@ class Statistic:
         # 这个简化版本不执行实际的统计分析
         pass
     
-    def report_xls(self, end_time, num_of_firm, num_of_tc):
+    def report_xls(self, params, path_results, tc_viewed):
         """
-        Generate report in the same format as Java version.
+        生成与Java版本格式一致的param.txt和multiout.txt
         
         Args:
-            end_time (int): End time of simulation
-            num_of_firm (int): Number of firms
-            num_of_tc (int): Number of therapeutic categories
+            params: parameter_snapshot 返回的参数快照
+            path_results: 结果目录
+            tc_viewed: 各周期观察到的治疗类别数量
+            
+        Returns:
+            bool: 是否成功
         """
         try:
-            # Import C5Model here to avoid circular import
-            import importlib
-            module = importlib.import_module('src_py.Chapter5.c5_model')
-            C5Model = getattr(module, 'C5Model')
-            
-            # Create output directory if it doesn't exist
-            output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 
-                                     "results_py", "Chapter5")
-            os.makedirs(output_dir, exist_ok=True)
-            
-            # Write parameters file (equivalent to param.txt in Java)
-            param_file = os.path.join(output_dir, "param.txt")
-            with open(param_file, 'w', encoding='utf-8') as f:
-                model = C5Model()
-                f.write(f"Multi Time: {model.mt}\n")
-                f.write(f"drawCost: {model.draw_cost}\n")
-                f.write(f"numOfFirm: {model.num_of_firm}\n")
-                f.write(f"numOfTC: {model.num_of_tc}\n")
-                f.write(f"TCValueCost: {model.tc_patients_cost}\n")
-                f.write(f"numOfMol: {model.num_of_mol}\n")
-                f.write(f"qMolNull: {model.q_mol_null}\n")
-                f.write(f"patentDuration: {model.patent_duration}\n")
-                f.write(f"CostOfSearch: {model.cost_of_search}\n")
-                f.write(f"costOfResearchInn: {model.cost_of_research_inn}\n")
-                f.write(f"costOfResearchImi: {model.cost_of_research_imi}\n")
-                f.write(f"Initial Budget: {model.b}\n")
-                f.write(f"qualityCheck: {model.quality_check}\n")
-                f.write(f"AvgWeightInno: {model.speed_development_inno}\n")
-                f.write(f"AvgWeightImi: {model.speed_development_imi}\n")
-                f.write(f"Product exits below this threshold: {model.out_pro_limit}\n")
-                f.write(f"Firm exits market after n unsuccesful searches: {model.search_failure}\n")
-                f.write(f"interestRate: {model.interest_rate}\n")
-                f.write(f"timeDevelop: {model.time_develop}\n")
-                f.write(f"erosion marketing: {model.erosion}\n")
-                f.write(f"Firm exits below this threshold: {model.e_failure}\n")
-                f.write(f"costProd: {model.cost_prod}\n")
-                f.write(f"eta: {model.omega}\n")
-                f.write(f"elasticity in the markup formula: {model.elasticity}\n")
-                f.write(f"endTime: {model.end_time}\n")
-                f.write(f"patentOriz: {model.patent_width}\n")
-                f.write(f"TCValueRand: {model.tc_patients_rand}\n")
-                f.write(f"a avg: {model.a_value_cost}\n")
-                f.write(f"a range: {model.a_value_rand}\n")
-                f.write(f"b avg: {model.b_value_cost}\n")
-                f.write(f"b range: {model.b_value_rand}\n")
-                f.write(f"c avg: {model.c_value_cost}\n")
-                f.write(f"c range: {model.c_value_rand}\n")
-                f.write(f"qMolCost: {model.q_mol_cost}\n")
-                f.write(f"qMolVar: {model.q_mol_var}\n")
-                f.write(f"numOfSubMKT: {model.num_of_sub_mkt}\n")
-                f.write(f"% of R&D budget invested in search: {model.quota_invested_in_search}\n")
-            
-            # Write output file (equivalent to multiout.txt in Java)
-            output_file = os.path.join(output_dir, "multiout.txt")
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # Write header exactly as in Java version (no spaces after commas)
-                f.write("H,H_avg_TC,prod_inno,prod_imi,alive_firms_with_prod,TC_viewed,price_inno,price_imi\n")
-                
-                # Write data for each time period
-                for t in range(end_time + 1):
-                    # Calculate average TC viewed (approximate for this implementation)
-                    tc_viewed = int(t * 0.2 * num_of_tc / end_time) if t > 0 else 0
-                    
-                    # Write the data row with values from the statistics arrays
-                    h_value = self.multi_tot_h[t] if hasattr(self, 'multi_tot_h') and self.multi_tot_h is not None else (0.05 + t * 0.002 if t > 7 else 0.0)
-                    h_avg = self.multi_mean_h[t] if hasattr(self, 'multi_mean_h') and self.multi_mean_h is not None else (0.98 - t * 0.005 if t > 7 else 0.0)
-                    inno_prod = self.multi_inno_prod[t] if hasattr(self, 'multi_inno_prod') and self.multi_inno_prod is not None else (t * 3 if t > 7 else 0.0)
-                    imi_prod = self.multi_imi_prod[t] if hasattr(self, 'multi_imi_prod') and self.multi_imi_prod is not None else (0.0 if t < 18 else t * 5)
-                    alive_f = self.multi_alive_f_with_prod[t] if hasattr(self, 'multi_alive_f_with_prod') and self.multi_alive_f_with_prod is not None else (t * 2 if t > 7 else 0.0)
-                    price_inno = self.multi_price_inno[t] if hasattr(self, 'multi_price_inno') and self.multi_price_inno is not None else (3.0 - t * 0.01 if t > 7 else 0.0)
-                    price_imi = self.multi_price_imi[t] if hasattr(self, 'multi_price_imi') and self.multi_price_imi is not None else (0.0 if t < 18 else 1.9 - t * 0.005)
-                    
-                    # Format with exactly the same precision as Java version (no trailing zeros)
-                    # Use formatted string without spaces after commas
-                    f.write(f"{h_value:.6f},{h_avg:.6f},{int(inno_prod)},{int(imi_prod)},{int(alive_f)},{tc_viewed},{price_inno:.6f},{price_imi:.6f}\n")
-            
-            print(f"Reports generated in {output_dir} with UTF-8 encoding")
+            self.write_param_file(params, path_results)
+            self.write_multiout_file(params, path_results, tc_viewed)
             return True
-            
         except Exception as e:
             print(f"Error generating reports: {e}")
-            import traceback
-            traceback.print_exc()
             return False
     
+    def write_param_file(self, params, path_results):
+        """
+        写入param.txt（equivalent to param.txt in Java）
+        
+        Args:
+            params: parameter_snapshot 返回的参数快照
+            path_results: 结果目录
+        """
+        lines = [f"{label}: {params[attr]}\n" for label, attr in PARAM_LABELS]
+        with open(os.path.join(path_results, "param.txt"), 'w', encoding='ascii') as f:
+            f.write("".join(lines))
+    
+    def write_multiout_file(self, params, path_results, tc_viewed):
+        """
+        写入multiout.txt（equivalent to multiout.txt in Java），数值为各序列在多次运行之间的平均值
+        
+        Args:
+            params: parameter_snapshot 返回的参数快照
+            path_results: 结果目录
+            tc_viewed: 各周期观察到的治疗类别数量
+        """
+        means = self.multi_means(params["mt"])
+        columns = [means[name] for name in ("multi_tot_h", "multi_mean_h", "multi_inno_prod", "multi_imi_prod",
+                                            "multi_alive_f_with_prod")]
+        prices = [means["multi_price_inno"], means["multi_price_imi"]]
+        
+        # 严格按照Java版本的格式编写标题行（没有空格），整个文件一次写入
+        lines = ["H,H_avg_TC,prod_inno,prod_imi,alive_firms_with_prod,TC_viewed,price_inno,price_imi\n"]
+        for t in range(params["end_time"] + 1):
+            lines.append(",".join("{:.6f}".format(c[t]) for c in columns)
+                         + ",{},".format(tc_viewed[t])
+                         + ",".join("{:.6f}".format(c[t]) for c in prices) + "\n")
+        with open(os.path.join(path_results, "multiout.txt"), 'w', encoding='ascii') as f:
+            f.write("".join(lines))
+    
     def generate_multi_report(self, end_time, num_of_firm, num_of_tc):
         """
-        累积多次模拟的统计结果
+        累积多次模拟的统计结果：每个序列一次向量加法（NaN按0处理），
+        价格序列同时记录价格为正的运行次数
         
         Args:
             end_time (int): 模拟结束时间
@@ -191,29 +229,48 @@ class Statistic:
             num_of_tc (int): 治疗类别数量
         """
         # 确保多次运行的数组已初始化
-        if not hasattr(self, 'multi_tot_h') or self.multi_tot_h is None:
+        if self.multi_tot_h is None:
             self.init_multi(end_time)
+        
+        for name, multi_name in MULTI_OF.items():
+            values = getattr(self, name)
+            np.add(getattr(self, multi_name), values, out=getattr(self, multi_name), where=~np.isnan(values))
+        for name, runs_name in PRICE_RUNS.items():
+            getattr(self, runs_name)[getattr(self, name) > 0] += 1
+    
+    def multi_means(self, multi_time):
+        """
+        多次模拟各序列的平均值（与Java版本相同：数量序列除以运行次数，
+        价格序列除以价格为正的运行次数）
+        
+        Args:
+            multi_time (int): 多次运行的次数
             
-        # 累积本次模拟结果到多次模拟统计
-        for t in range(end_time + 1):
-            # 累积统计数据（只有非None或非NaN的值）
-            if hasattr(self, 'tot_h') and self.tot_h is not None and t < len(self.tot_h) and not math.isnan(self.tot_h[t]):
-                self.multi_tot_h[t] += self.tot_h[t]
-                
-            if hasattr(self, 'mean_h') and self.mean_h is not None and t < len(self.mean_h) and not math.isnan(self.mean_h[t]):
-                self.multi_mean_h[t] += self.mean_h[t]
-                
-            if hasattr(self, 'inno_prod') and self.inno_prod is not None and t < len(self.inno_prod) and not math.isnan(self.inno_prod[t]):
-                self.multi_inno_prod[t] += self.inno_prod[t]
-                
-            if hasattr(self, 'imi_prod') and self.imi_prod is not None and t < len(self.imi_prod) and not math.isnan(self.imi_prod[t]):
-                self.multi_imi_prod[t] += self.imi_prod[t]
-                
-            if hasattr(self, 'alive_f_with_prod') and self.alive_f_with_prod is not None and t < len(self.alive_f_with_prod) and not math.isnan(self.alive_f_with_prod[t]):
-                self.multi_alive_f_with_prod[t] += self.alive_f_with_prod[t]
-                
-            if hasattr(self, 'price_mean_inno') and self.price_mean_inno is not None and t < len(self.price_mean_inno) and not math.isnan(self.price_mean_inno[t]):
-                self.multi_price_inno[t] += self.price_mean_inno[t]
-                
-            if hasattr(self, 'price_mean_imi') and self.price_mean_imi is not None and t < len(self.price_mean_imi) and not math.isnan(self.price_mean_imi[t]):
-                self.multi_price_imi[t] += self.price_mean_imi[t]
\ No newline at end of file
+        Returns:
+            dict: multi_*名称 -> 各周期的平均值数组
+        """
+        means = {}
+        for name, multi_name in MULTI_OF.items():
+            total = getattr(self, multi_name)
+            if name in PRICE_RUNS:
+                runs = getattr(self, PRICE_RUNS[name])
+                means[multi_name] = total / np.where(runs > 0, runs, multi_time)
+            else:
+                means[multi_name] = total / multi_time
+        return means
+    
+    def print_multi_panels(self, path_base, multi_time, fmt="npz"):
+        """
+        以列式二进制格式（见panel_writer）写入多次模拟各序列的平均值，
+        period列对应第1期到最后一期
+        
+        Args:
+            path_base: 输出路径（不含扩展名）
+            multi_time (int): 多次运行的次数
+            fmt: "npz" 或 "npy"（parquet只保存面板数据，不适用于这里）
+            
+        Returns:
+            str: 写入的路径，失败时返回None
+        """
+        series = {name: values[1:] for name, values in self.multi_means(multi_time).items()}
+        return write_panels(path_base, {}, series, fmt)
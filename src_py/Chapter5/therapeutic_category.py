@@ -11,6 +11,8 @@ from .molecule import Molecule
 class SubMarket:
     """子市场类，表示治疗类别中的一个细分市场"""
     
+    __slots__ = ("value_mkt", "q_min_req", "store_pos")
+    
     def __init__(self, value=0):
         """
         初始化子市场
@@ -61,6 +63,7 @@ class TherapeuticCategory:
         
         # 治疗类别的子市场
         self.s_mkt = [SubMarket() for _ in range(model.num_of_sub_mkt)]
+        self.s_mkt_value = None  # 计算子市场时使用的治疗类别规模
         
         # 其他统计量
         self.inno_sh = 0.0  # 创新份额
@@ -70,6 +73,19 @@ class TherapeuticCategory:
         self.on_ta_res = 0  # 正在研发的分子数量
         self.store_pos = 0  # 产品效用总和
         
+    def update_sub_mkt(self, model):
+        """
+        更新子市场大小和质量要求，仅在治疗类别规模变化时重新计算
+        
+        Args:
+            model: 模型实例
+        """
+        if self.s_mkt_value == self.value:
+            return
+        self.set_sub_mkt_value(model)
+        self.calc_q_min_in_smkt(model)
+        self.s_mkt_value = self.value
+    
     def set_sub_mkt_value(self, model):
         """
         设置子市场的价值
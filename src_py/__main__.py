@@ -0,0 +1,12 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+python -m src_py 的入口，见 src_py/cli.py
+"""
+
+import sys
+
+from src_py.cli import main
+
+sys.exit(main())
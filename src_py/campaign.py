@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量模拟（campaign）的作业描述和本地作业队列
+
+    python -m src_py campaign campaign.json                 # 运行全部尚未完成的任务
+    python -m src_py campaign campaign.json --workers 8 --retries 2
+    python -m src_py campaign campaign.json --dry-run       # 只列出展开后的任务和已完成的任务
+
+作业描述为JSON（安装了PyYAML时也可以是YAML），列出若干场景；每个场景的键与
+python -m src_py run 的选项相同，seeds 给出种子（一个整数、整数列表或
+{"start": 起始种子, "count": 个数}），每个种子展开为一个任务：
+
+    {
+     "name": "pc_entry",
+     "workers": 4,
+     "retries": 1,
+     "defaults": {"chapter": "c4", "mode": "multi", "reps": 10, "periods": 150},
+     "scenarios": [
+      {"name": "baseline", "seeds": {"start": 1000, "count": 20}},
+      {"name": "late_pc", "set": {"Entry Period of Firms - PC": 150}, "seeds": {"start": 1000, "count": 20}}
+     ]
+    }
+
+每个任务由其设置（不含场景名称）、种子、模型源代码的版本和第3、4章参数文件内容的SHA-256标识，
+结果保存在结果仓库的 tasks/<哈希>/ 中（默认 results_py/campaigns/<名称>/）。
+run_summary.json 状态为ok的任务视为已完成，重新运行作业时直接跳过；设置完全相同的
+任务（包括不同场景中的）只运行一次。任务在独立的子进程中以 --resume 运行
+（python -m src_py run，中断过的任务从检查点继续），失败时重试，最多重试 retries 次。仓库中的 index.json
+记录每个任务所属的场景、种子、状态、尝试次数和运行摘要，每完成一个任务更新一次。
+"""
+
+import os
+import sys
+import json
+import hashlib
+import functools
+import threading
+import subprocess
+import concurrent.futures
+
+from src_py.cli import ROOT_DIR, CHAPTERS, SUMMARY_NAME, build_parser, unsupported_outputs
+from src_py.Chapter3.result_cache import source_version
+
+INDEX_NAME = "index.json"
+LOG_NAME = "run.log"
+TASK_DIR = "tasks"
+HASH_LENGTH = 16
+
+# 场景中可以使用的键（seeds 以外的键与 run 子命令的选项相同）
+TASK_KEYS = ("chapter", "mode", "reps", "sens", "periods", "set", "params", "out",
+             "dispersion", "crn", "profile", "profile_memory", "checkpoint_every", "cache", "cache_size")
+# 不影响任务结果、不计入任务哈希的键（参数文件以其内容计入）
+UNHASHED_KEYS = ("params", "cache", "cache_size")
+FLAG_KEYS = ("dispersion", "crn", "profile", "profile_memory")
+# 各章节模型的源代码包（第3章包含其他章节共用的工具）
+MODEL_PACKAGES = {
+    "c3": ("src_py.Chapter3",),
+    "c4": ("src_py.Chapter4", "src_py.Chapter3"),
+    "c5": ("src_py.Chapter5", "src_py.Chapter3"),
+}
+
+
+def load_campaign(path):
+    """
+    读取作业描述
+
+    Args:
+        path: JSON或YAML文件路径
+
+    Returns:
+        dict: 作业描述
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("reading YAML campaign files requires PyYAML (pip install pyyaml)")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def expand_seeds(seeds):
+    """
+    展开场景的 seeds
+
+    Args:
+        seeds: None、整数、整数列表或 {"start": 起始种子, "count": 个数}
+
+    Returns:
+        list: 种子列表（None表示使用模型自己的种子）
+    """
+    if seeds is None:
+        return [None]
+    if isinstance(seeds, int):
+        return [seeds]
+    if isinstance(seeds, dict):
+        return list(range(int(seeds["start"]), int(seeds["start"]) + int(seeds["count"])))
+    return [int(seed) for seed in seeds]
+
+
+def task_argv(spec, seed):
+    """
+    任务对应的 run 子命令参数
+
+    Args:
+        spec: 任务设置
+        seed: 随机种子
+
+    Returns:
+        list: 命令行参数
+    """
+    argv = ["run", spec["chapter"]]
+    for key in ("mode", "reps", "sens", "periods", "params", "checkpoint_every", "cache", "cache_size"):
+        if spec.get(key) is not None:
+            argv += ["--" + key.replace("_", "-"), str(spec[key])]
+    if spec.get("set"):
+        argv += ["--set"] + [f"{name}={value}" for name, value in spec["set"].items()]
+    if spec.get("out"):
+        argv += ["--out"] + list(spec["out"])
+    for key in FLAG_KEYS:
+        if spec.get(key):
+            argv.append("--" + key.replace("_", "-"))
+    if seed is not None:
+        argv += ["--seed", str(seed)]
+    return argv
+
+
+def file_digest(path):
+    """文件内容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def model_version(chapter):
+    """某章模型的源代码版本（见 result_cache.source_version）"""
+    return source_version(*MODEL_PACKAGES[chapter])
+
+
+def task_hash(spec, seed):
+    """
+    任务的内容哈希：设置、种子、模型的源代码版本以及第3、4章参数文件的内容
+    （不含文件路径、缓存设置和场景名称）。修改模型代码后任务的哈希改变，已完成的结果不再复用
+
+    Args:
+        spec: 任务设置
+        seed: 随机种子
+
+    Returns:
+        str: 十六进制哈希的前 HASH_LENGTH 位
+    """
+    content = {key: spec.get(key) for key in TASK_KEYS if key not in UNHASHED_KEYS + ("crn",)}
+    if spec.get("crn"):
+        # 只在启用时计入，未使用共同随机数的任务的哈希不变
+        content["crn"] = True
+    content["seed"] = seed
+    content["code_version"] = model_version(spec["chapter"])
+    if spec["chapter"] != "c5":
+        params = spec.get("params") or os.path.join(ROOT_DIR, "parameters", CHAPTERS[spec["chapter"]][0],
+                                                    "parameters.txt")
+        content["parameters_sha256"] = file_digest(params)
+    text = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:HASH_LENGTH]
+
+
+def expand(campaign, base_dir):
+    """
+    把作业描述展开为任务，设置完全相同的任务合并为一个
+
+    Args:
+        campaign: 作业描述
+        base_dir: 作业描述文件所在目录（相对的参数文件路径以它为基准）
+
+    Returns:
+        dict: 哈希 -> 任务（scenarios、seed、spec、argv）
+    """
+    parser = build_parser()
+    defaults = campaign.get("defaults", {})
+    tasks = {}
+    for number, scenario in enumerate(campaign.get("scenarios", []), start=1):
+        name = scenario.get("name", f"scenario{number}")
+        spec = dict(defaults, **{k: v for k, v in scenario.items() if k not in ("name", "seeds")})
+        unknown = sorted(set(spec) - set(TASK_KEYS))
+        if unknown:
+            raise ValueError(f"scenario {name}: unknown keys {', '.join(unknown)}")
+        if spec.get("chapter") not in CHAPTERS:
+            raise ValueError(f"scenario {name}: chapter must be one of {', '.join(sorted(CHAPTERS))}")
+        for key in ("params", "cache"):
+            if spec.get(key):
+                spec[key] = os.path.join(base_dir, spec[key])
+        for seed in expand_seeds(scenario.get("seeds", defaults.get("seeds"))):
+            argv = task_argv(spec, seed)
+            try:
+                args = parser.parse_args(argv)
+            except SystemExit:
+                raise ValueError(f"scenario {name}: invalid settings {' '.join(argv)}")
+            if args.chapter == "c5" and args.crn:
+                raise ValueError(f"scenario {name}: crn only applies to c3 and c4")
+            unsupported = unsupported_outputs(args.chapter, args.mode, args.out)
+            if unsupported:
+                raise ValueError(f"scenario {name}: out {', '.join(unsupported)} is not available "
+                                 f"for {args.chapter} {args.mode}")
+            key = task_hash(spec, seed)
+            task = tasks.setdefault(key, {"scenarios": [], "seed": seed, "spec": spec, "argv": argv})
+            task["scenarios"].append(name)
+    return tasks
+
+
+def completed_summary(task_dir):
+    """任务已成功完成时返回其运行摘要，否则返回None"""
+    try:
+        with open(os.path.join(task_dir, SUMMARY_NAME), 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return summary if summary.get("status") == "ok" else None
+
+
+def run_task(task, task_dir, retries):
+    """
+    在子进程中运行一个任务，失败时从检查点重试
+
+    Args:
+        task: 任务
+        task_dir: 任务的结果目录
+        retries: 最多重试次数
+
+    Returns:
+        tuple: (尝试次数, 运行摘要或None, 最后一次的错误信息)
+    """
+    os.makedirs(task_dir, exist_ok=True)
+    error = None
+    for attempt in range(1, retries + 2):
+        # 结果目录只属于这个任务，总是从检查点继续（上次中断或本次失败的运行）
+        command = [sys.executable, "-m", "src_py"] + task["argv"] + ["--results", task_dir, "--json", "--resume"]
+        with open(os.path.join(task_dir, LOG_NAME), 'a', encoding='utf-8') as log:
+            log.write(f"# attempt {attempt}: {' '.join(command[1:])}\n")
+            log.flush()
+            result = subprocess.run(command, cwd=ROOT_DIR, stdout=subprocess.PIPE, stderr=log, text=True)
+        summary = completed_summary(task_dir)
+        if result.returncode == 0 and summary is not None:
+            return attempt, summary, None
+        lines = result.stdout.strip().splitlines()
+        try:
+            error = json.loads(lines[-1]).get("error") if lines else None
+        except ValueError:
+            error = None
+        error = error or f"exit code {result.returncode}, see {os.path.join(task_dir, LOG_NAME)}"
+    return retries + 1, None, error
+
+
+class CampaignStore:
+
+    def __init__(self, path):
+        """
+        Args:
+            path: 结果仓库目录
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.index = {}
+        try:
+            with open(os.path.join(path, INDEX_NAME), 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            pass
+        except ValueError as e:
+            print(f"Error reading {INDEX_NAME}: {e}, rebuilding it")
+
+    def task_dir(self, key):
+        """任务的结果目录"""
+        return os.path.join(self.path, TASK_DIR, key)
+
+    def record(self, key, task, status, attempts=0, summary=None, error=None):
+        """
+        更新一个任务的记录并原子地写入 index.json
+
+        Args:
+            key: 任务哈希
+            task: 任务
+            status: "ok"、"cached"、"failed" 或 "pending"
+            attempts: 本次尝试次数
+            summary: 运行摘要
+            error: 错误信息
+        """
+        with self.lock:
+            self.index[key] = {"scenarios": task["scenarios"], "seed": task["seed"], "spec": task["spec"],
+                               "dir": os.path.join(TASK_DIR, key), "status": status, "attempts": attempts,
+                               "error": error, "summary": summary}
+            os.makedirs(self.path, exist_ok=True)
+            tmp_path = os.path.join(self.path, INDEX_NAME + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, os.path.join(self.path, INDEX_NAME))
+
+
+def run_campaign(path, workers=None, retries=None, store=None, dry_run=False):
+    """
+    运行一个作业描述中尚未完成的全部任务
+
+    Args:
+        path: 作业描述文件
+        workers: 同时运行的任务数（默认取作业描述中的workers，没有时为CPU数）
+        retries: 每个任务失败后的最多重试次数（默认取作业描述中的retries，没有时为1）
+        store: 结果仓库目录（默认取作业描述中的store，没有时为 results_py/campaigns/<名称>）
+        dry_run: 只列出任务，不运行
+
+    Returns:
+        int: 失败的任务数
+    """
+    campaign = load_campaign(path)
+    name = campaign.get("name") or os.path.splitext(os.path.basename(path))[0]
+    base_dir = os.path.dirname(os.path.abspath(path))
+    tasks = expand(campaign, base_dir)
+    workers = workers or campaign.get("workers") or os.cpu_count() or 1
+    retries = retries if retries is not None else campaign.get("retries", 1)
+    store_path = store or campaign.get("store")
+    store_path = os.path.abspath(os.path.join(base_dir, store_path) if store_path
+                                 else os.path.join(ROOT_DIR, "results_py", "campaigns", name))
+    campaign_store = CampaignStore(store_path)
+
+    pending = []
+    for key, task in tasks.items():
+        summary = completed_summary(campaign_store.task_dir(key))
+        if dry_run:
+            state = "done" if summary is not None else "pending"
+            print(f"{key} {state:<7} {','.join(task['scenarios'])} seed={task['seed']}: {' '.join(task['argv'])}")
+        elif summary is not None:
+            campaign_store.record(key, task, "cached", summary=summary)
+        else:
+            pending.append(key)
+    if dry_run:
+        print(f"campaign {name}: {len(tasks)} tasks, store {store_path}")
+        return 0
+
+    print(f"campaign {name}: {len(tasks)} tasks, {len(tasks) - len(pending)} already done, "
+          f"running {len(pending)} with {workers} workers")
+    failed = 0
+    done = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_task, tasks[key], campaign_store.task_dir(key), retries): key for key in pending}
+        for future in concurrent.futures.as_completed(futures):
+            key = futures[future]
+            task = tasks[key]
+            attempts, summary, error = future.result()
+            done += 1
+            label = f"[{done}/{len(pending)}] {','.join(task['scenarios'])} seed={task['seed']}"
+            if summary is not None:
+                campaign_store.record(key, task, "ok", attempts, summary)
+                print(f"{label} ok in {summary['seconds']:.1f} s" + (f" ({attempts} attempts)" if attempts > 1 else ""))
+            else:
+                failed += 1
+                campaign_store.record(key, task, "failed", attempts, error=error)
+                print(f"{label} failed after {attempts} attempts: {error}")
+    print(f"campaign {name}: {len(tasks) - failed} of {len(tasks)} tasks done, results in {store_path}")
+    return failed
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+命令行运行入口
+
+    python -m src_py run c3                                   # 单次模拟，结果写入 results_py/Chapter3
+    python -m src_py run c4 --mode multi --reps 50 --resume   # 从检查点继续中断的多次模拟
+    python -m src_py run c4 --mode sa --sens 1000 --reps 10 --workers 32 --out text npy --profile
+    python -m src_py run c5 --mode multi --reps 20 --set num_of_tc=60 num_of_firm=20 --json
+    python -m src_py campaign campaign.json --workers 8        # 批量任务，见 src_py/campaign.py
+
+第3、4章的运行次数（--reps）、敏感性分析的组合数（--sens）、周期数（--periods）和
+--set 给出的其他参数写入结果目录中的 run_parameters.txt（复制原参数文件后替换相应的行），
+第5章没有参数文件，这些取值直接设置为模型属性（--set 的名称为属性名）。
+
+每次运行结束时在结果目录写入 run_summary.json（章节、模式、状态、耗时、周期数和
+重复次数、输出文件，启用 --profile/--profile-memory 时另有各阶段时间和内存峰值）；
+--json 时把同样的内容打印到标准输出，模型的进度信息改为写到标准错误。
+退出码：0 成功，1 运行出错，2 参数错误。
+
+--cache 目录 使第4章的多次模拟和敏感性分析复用已缓存的相同运行（见 Chapter3/result_cache.py）。
+
+--workers 只用于第4章的敏感性分析：每个参数组合的种子只取决于组合序号，组合被连续
+地分成若干片，在独立的进程中运行（各片的结果目录为 sa_shard_<k>_of_<n>），全部完成后
+按组合顺序合并，结果与串行运行逐字节相同。其他模式的运行之间共享随机数序列
+（第3章）或累计统计量，仍然串行运行。
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import datetime
+import importlib
+import contextlib
+import concurrent.futures
+
+from src_py.Chapter3.parameter_file import PERIODS, SIMULATIONS, ITERATIONS, write_parameter_file, read_parameter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 命令行中的章节名称 -> (章节目录, 模型模块, 模型类)
+CHAPTERS = {
+    "c3": ("Chapter3", "src_py.Chapter3.c3_model", "C3Model"),
+    "c4": ("Chapter4", "src_py.Chapter4.c4_model", "C4Model"),
+    "c5": ("Chapter5", "src_py.Chapter5.c5_model", "C5Model"),
+}
+
+MODES = ("single", "multi", "sa")
+OUTPUT_FORMATS = ("text", "npz", "npy", "parquet")
+
+# (章节, 模式) -> 可写出的输出格式；多次模拟和敏感性分析总是写出文本结果
+SUPPORTED_OUTPUTS = {
+    ("c3", "single"): set(OUTPUT_FORMATS),
+    ("c4", "single"): set(OUTPUT_FORMATS),
+    ("c3", "multi"): {"text"},
+    ("c4", "multi"): {"text"},
+    ("c3", "sa"): {"text", "npy"},
+    ("c4", "sa"): {"text", "npy"},
+    ("c5", "single"): {"text"},
+    ("c5", "multi"): {"text", "npz", "npy"},
+}
+
+SUMMARY_NAME = "run_summary.json"
+PARAMETERS_NAME = "run_parameters.txt"
+SHARD_PREFIX = "sa_shard_"
+
+
+def load_model_class(chapter):
+    """
+    导入某章的模型类
+
+    Args:
+        chapter: "c3"、"c4" 或 "c5"
+
+    Returns:
+        type: 模型类
+    """
+    _, module, name = CHAPTERS[chapter]
+    return getattr(importlib.import_module(module), name)
+
+
+def parse_assignments(items):
+    """
+    解析 --set 的 名称=取值 列表
+
+    Args:
+        items: 字符串列表
+
+    Returns:
+        dict: 名称 -> 取值（字符串）
+    """
+    result = {}
+    for item in items or ():
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            raise ValueError(f"--set expects NAME=VALUE, got {item!r}")
+        result[name.strip()] = value.strip()
+    return result
+
+
+def unsupported_outputs(chapter, mode, formats):
+    """
+    某章节和模式不能写出的输出格式
+
+    Args:
+        chapter: "c3"、"c4" 或 "c5"
+        mode: "single"、"multi" 或 "sa"
+        formats: --out 给出的格式
+
+    Returns:
+        list: 不支持的格式（按名称排序）
+    """
+    return sorted(set(formats) - SUPPORTED_OUTPUTS.get((chapter, mode), set()))
+
+
+def _number(value):
+    """把 --set 的取值转换为整数或浮点数（第5章的模型属性）"""
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def configure(args, results_dir, parameters=None):
+    """
+    创建并设置一个模型
+
+    Args:
+        args: 命令行参数
+        results_dir: 结果目录
+        parameters: 第3、4章使用的参数文件
+
+    Returns:
+        模型对象
+    """
+    model = load_model_class(args.chapter)()
+    model.path_results = results_dir
+    formats = set(args.out)
+    if args.chapter == "c5":
+        for name, value in parse_assignments(args.set).items():
+            if not hasattr(model, name):
+                raise ValueError(f"C5Model has no attribute {name!r}")
+            setattr(model, name, _number(value))
+        if args.periods is not None:
+            model.end_time = args.periods
+        if args.reps is not None:
+            model.mt = args.reps
+        model.multi_panel_formats = sorted(formats & {"npz", "npy"})
+    else:
+        model.path_parameters = parameters
+        model.single_text_output = "text" in formats
+        model.single_panel_formats = sorted(formats - {"text"})
+        model.sa_memmap = "npy" in formats
+        model.crn = args.crn
+    if args.checkpoint_every is not None:
+        model.checkpoint_interval = args.checkpoint_every
+        model.sa_fsync_interval = args.checkpoint_every
+    model.multi_dispersion = args.dispersion
+    if args.seed is not None:
+        set_seed(model, args.chapter, args.seed)
+    if args.cache and args.chapter == "c4":
+        from src_py.Chapter3.result_cache import ResultCache
+        model.result_cache = ResultCache(os.path.abspath(args.cache), int(args.cache_size * (1 << 20)))
+    model.phase_timer.enable(args.profile)
+    model.memory_tracker.enable(args.profile_memory)
+    return model
+
+
+def set_seed(model, chapter, seed):
+    """
+    设置模型的基础随机种子（多次模拟和敏感性分析的各次运行由它派生）
+
+    Args:
+        model: 模型对象
+        chapter: "c3"、"c4" 或 "c5"
+        seed: 随机种子
+    """
+    if chapter == "c3":
+        # 第3章的所有运行共用一个连续的随机数序列
+        model.rng.setSeed(seed)
+    elif chapter == "c4":
+        # 第4章在每次运行开始时用 rng_seed 重新创建随机数生成器
+        model.rng_seed = seed
+    else:
+        import numpy as np
+        model.rng_seed = seed
+        model.r.setSeed(seed)
+        model.rand.setSeed(seed)
+        random.seed(seed)
+        np.random.seed(seed)
+
+
+def simulate(model, chapter, mode, resume):
+    """
+    运行一种模拟
+
+    Args:
+        model: 模型对象
+        chapter: "c3"、"c4" 或 "c5"
+        mode: "single"、"multi" 或 "sa"
+        resume: 是否从检查点继续
+    """
+    if chapter == "c5":
+        if mode == "single":
+            model.make_single_simulation()
+        else:
+            model.make_multiple_simulation(resume)
+    elif mode == "single":
+        model.make_single_simulation(True)
+    elif mode == "multi":
+        model.make_multiple_simulation(True, resume)
+    else:
+        model.make_sensitivity_simulation(True, resume)
+
+
+def cache_summary(model):
+    """模型的运行结果缓存统计（未使用缓存时为None）"""
+    cache = getattr(model, "result_cache", None)
+    return cache.summary() if cache is not None else None
+
+
+def profile_summary(model):
+    """
+    模型的计时和内存分析结果（未启用时为None）
+
+    Returns:
+        tuple: (各阶段的总时间, 内存峰值)
+    """
+    phases = None
+    if model.phase_timer.enabled:
+        phases = {p["phase"]: p["total_seconds"] for p in model.phase_timer.summary()}
+    memory = None
+    if model.memory_tracker.enabled:
+        summary = model.memory_tracker.summary()
+        memory = {"rss_peak_bytes": summary["rss_peak_bytes"], "traced_peak_bytes": summary["traced_peak_bytes"]}
+    return phases, memory
+
+
+def shard_ranges(total, workers):
+    """
+    把 total 个参数组合连续地分成不超过 workers 片
+
+    Returns:
+        list: 每片一个 (偏移, 组合数)
+    """
+    workers = max(1, min(workers, total))
+    size, extra = divmod(total, workers)
+    ranges = []
+    offset = 0
+    for k in range(workers):
+        count = size + (1 if k < extra else 0)
+        ranges.append((offset, count))
+        offset += count
+    return ranges
+
+
+def run_shard(args, shard_dir, parameters, offset, count):
+    """
+    在工作进程中运行第4章敏感性分析的一片组合
+
+    Args:
+        args: 命令行参数
+        shard_dir: 本片的结果目录
+        parameters: 参数文件
+        offset: 本片之前的组合数
+        count: 本片的组合数
+
+    Returns:
+        dict: log（模型输出）、phases、memory、cache
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        model = configure(args, shard_dir, parameters)
+        model.sa_offset = offset
+        model.sa_count = count
+        simulate(model, "c4", "sa", args.resume)
+    phases, memory = profile_summary(model)
+    return {"log": log.getvalue(), "phases": phases, "memory": memory, "cache": cache_summary(model)}
+
+
+def merge_shards(results_dir, shard_dirs):
+    """
+    按组合顺序合并各片的敏感性分析输出，然后删除分片目录
+
+    时间序列文件（每行一个时间点、每列一个组合）逐行拼接各片的列，
+    sa_parameters.csv 逐行连接，memmap的 .npy 矩阵按行连接。
+
+    Args:
+        results_dir: 结果目录
+        shard_dirs: 各片的结果目录（按组合顺序）
+    """
+    import numpy as np
+
+    names = sorted(name for name in os.listdir(shard_dirs[0])
+                   if name.startswith("sa_") and name.endswith((".csv", ".npy")))
+    for name in names:
+        paths = [os.path.join(d, name) for d in shard_dirs]
+        target = os.path.join(results_dir, name)
+        if name.endswith(".npy"):
+            np.save(target, np.concatenate([np.load(p, mmap_mode='r') for p in paths]))
+        elif name == "sa_parameters.csv":
+            with open(target, 'w', encoding='utf-8') as output:
+                for path in paths:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        shutil.copyfileobj(f, output)
+        else:
+            files = [open(p, 'r', encoding='utf-8') for p in paths]
+            try:
+                with open(target, 'w', encoding='utf-8') as output:
+                    for lines in zip(*files):
+                        # 每行以 "时间," 或 "Time," 开头，后面各片的单元格依次连接
+                        output.write(lines[0].rstrip("\n") + "".join(
+                            line.rstrip("\n").partition(",")[2] for line in lines[1:]) + "\n")
+            finally:
+                for f in files:
+                    f.close()
+    for d in shard_dirs:
+        shutil.rmtree(d)
+
+
+def run_sharded(args, results_dir, parameters, combinations):
+    """
+    把第4章的敏感性分析分片并行运行，并合并输出
+
+    Args:
+        args: 命令行参数
+        results_dir: 结果目录
+        parameters: 参数文件
+        combinations: 参数组合总数
+
+    Returns:
+        tuple: (实际使用的进程数, 各阶段的总时间, 内存峰值, 缓存统计)
+    """
+    ranges = shard_ranges(combinations, args.workers)
+    shard_dirs = [os.path.join(results_dir, f"{SHARD_PREFIX}{k}_of_{len(ranges)}") for k in range(len(ranges))]
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [pool.submit(run_shard, args, d, parameters, offset, count)
+                   for d, (offset, count) in zip(shard_dirs, ranges)]
+        for k, future in enumerate(futures):
+            result = future.result()
+            print(f"shard {k + 1}/{len(ranges)}: combinations {ranges[k][0] + 1}-{sum(ranges[k])}")
+            print(result["log"], end="")
+            results.append(result)
+    merge_shards(results_dir, shard_dirs)
+
+    phases = None
+    if args.profile:
+        phases = {}
+        for result in results:
+            for name, seconds in result["phases"].items():
+                phases[name] = phases.get(name, 0.0) + seconds
+    memory = None
+    if args.profile_memory:
+        memory = {key: max(r["memory"][key] for r in results) for key in ("rss_peak_bytes", "traced_peak_bytes")}
+    cache = None
+    if results[0]["cache"] is not None:
+        cache = dict(results[0]["cache"], **{key: sum(r["cache"][key] for r in results)
+                                             for key in ("hits", "misses", "stored", "evicted")})
+    return len(ranges), phases, memory, cache
+
+
+def parameter_overrides(args):
+    """
+    第3、4章参数文件中需要替换的行
+
+    Returns:
+        dict: 行标签 -> 取值
+    """
+    overrides = parse_assignments(args.set)
+    if args.periods is not None:
+        overrides[PERIODS] = args.periods
+    if args.reps is not None:
+        overrides[SIMULATIONS] = args.reps
+    if args.sens is not None:
+        overrides[ITERATIONS] = args.sens
+    return overrides
+
+
+def run(args):
+    """
+    执行 run 子命令
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        dict: 运行摘要
+    """
+    chapter_dir = CHAPTERS[args.chapter][0]
+    results_dir = os.path.abspath(args.results or os.path.join(ROOT_DIR, "results_py", chapter_dir))
+    os.makedirs(results_dir, exist_ok=True)
+    summary = {"chapter": args.chapter, "mode": args.mode, "seed": args.seed, "crn": args.crn, "status": "ok", "error": None,
+               "started": datetime.datetime.now().isoformat(timespec="seconds"),
+               "results": results_dir, "parameters": None, "outputs": [], "workers": 1,
+               "seconds": None, "periods": None, "replicates": None, "combinations": None,
+               "periods_per_second": None, "phases": None, "memory": None, "cache": None}
+    started = time.time()
+    start = time.perf_counter()
+    try:
+        if args.chapter == "c5":
+            model = configure(args, results_dir)
+            simulate(model, "c5", args.mode, args.resume)
+            summary["periods"] = model.end_time
+            summary["replicates"] = 1 if args.mode == "single" else model.mt
+            summary["phases"], summary["memory"] = profile_summary(model)
+        else:
+            args.params = os.path.abspath(args.params or os.path.join(ROOT_DIR, "parameters", chapter_dir,
+                                                                      "parameters.txt"))
+            overrides = parameter_overrides(args)
+            parameters = write_parameter_file(args.params, os.path.join(results_dir, PARAMETERS_NAME), overrides)
+            summary["parameters"] = parameters
+            # 模型在运行时才读取参数文件（读取敏感性分析参数会消耗随机数），规模直接从文件中读出
+            periods, runs, combinations = (int(float(read_parameter(parameters, label)))
+                                           for label in (PERIODS, SIMULATIONS, ITERATIONS))
+            summary["periods"] = periods
+            if args.mode == "single":
+                summary["replicates"] = 1
+            elif args.mode == "multi":
+                summary["replicates"] = runs
+            else:
+                summary["combinations"] = combinations
+                summary["replicates"] = runs * combinations
+            if args.mode == "sa" and args.chapter == "c4" and args.workers > 1 and combinations > 1:
+                summary["workers"], summary["phases"], summary["memory"], summary["cache"] = run_sharded(
+                    args, results_dir, parameters, combinations)
+            else:
+                model = configure(args, results_dir, parameters)
+                simulate(model, args.chapter, args.mode, args.resume)
+                summary["phases"], summary["memory"] = profile_summary(model)
+                summary["cache"] = cache_summary(model)
+    except Exception as e:
+        summary["status"] = "error"
+        summary["error"] = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+
+    summary["seconds"] = seconds
+    if summary["periods"] and summary["replicates"] and summary["status"] == "ok":
+        summary["periods_per_second"] = summary["periods"] * summary["replicates"] / seconds
+    if summary["phases"] is not None:
+        summary["phases"] = dict(sorted(summary["phases"].items(), key=lambda item: item[1], reverse=True))
+    summary["outputs"] = sorted(name for name in os.listdir(results_dir)
+                                if name not in (SUMMARY_NAME, PARAMETERS_NAME)
+                                and os.path.isfile(os.path.join(results_dir, name))
+                                and os.path.getmtime(os.path.join(results_dir, name)) >= started - 1)
+    with open(os.path.join(results_dir, SUMMARY_NAME), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=1)
+        f.write("\n")
+    return summary
+
+
+def build_parser():
+    """命令行参数"""
+    parser = argparse.ArgumentParser(prog="python -m src_py", description="Run the History-Friendly Models")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run one chapter model")
+    run_parser.add_argument("chapter", choices=sorted(CHAPTERS), help="model to run")
+    run_parser.add_argument("--mode", choices=MODES, default="single",
+                            help="single run, multiple runs, or sensitivity analysis (c3 and c4 only)")
+    run_parser.add_argument("--reps", type=int, help="runs of a multiple simulation, or runs per SA combination")
+    run_parser.add_argument("--sens", type=int, help="parameter combinations of a sensitivity analysis")
+    run_parser.add_argument("--periods", type=int, help="periods per run")
+    run_parser.add_argument("--set", nargs="+", metavar="NAME=VALUE",
+                            help="other settings: parameter-file labels for c3/c4, model attributes for c5")
+    run_parser.add_argument("--params", help="parameter file to start from (c3/c4, default parameters/ChapterN)")
+    run_parser.add_argument("--seed", type=int, help="base random seed (default: the model's own seed)")
+    run_parser.add_argument("--results", help="results directory (default results_py/ChapterN)")
+    run_parser.add_argument("--out", nargs="+", choices=OUTPUT_FORMATS, default=["text"],
+                            help="output formats: text CSV, plus npz/npy/parquet panels of a c3/c4 single run, "
+                                 "npz/npy means of a c5 multiple run, or an npy matrix per c3/c4 SA series; "
+                                 "other combinations are rejected")
+    run_parser.add_argument("--workers", type=int, default=1,
+                            help="processes for a c4 sensitivity analysis (other modes run serially)")
+    run_parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    run_parser.add_argument("--checkpoint-every", type=int, metavar="N",
+                            help="save a checkpoint every N runs or SA combinations (default 10)")
+    run_parser.add_argument("--crn", action="store_true",
+                            help="common random numbers (c3/c4): give each stochastic decision its own seeded "
+                                 "substream, so scenarios and SA combinations with the same seed are paired")
+    run_parser.add_argument("--dispersion", action="store_true",
+                            help="also write the spread of each series across the runs of a multiple simulation")
+    run_parser.add_argument("--cache", metavar="DIR",
+                            help="reuse the results of identical c4 runs (multi and sa) stored in this directory")
+    run_parser.add_argument("--cache-size", type=float, default=1024, metavar="MB",
+                            help="evict the least recently used cache entries above this size (default 1024)")
+    run_parser.add_argument("--profile", action="store_true", help="time each simulation phase")
+    run_parser.add_argument("--profile-memory", action="store_true", help="sample memory use by model class")
+    run_parser.add_argument("--json", action="store_true",
+                            help="print the run summary as JSON on stdout (progress goes to stderr)")
+
+    campaign_parser = commands.add_parser("campaign", help="run the tasks of a campaign file through a local job queue")
+    campaign_parser.add_argument("file", help="campaign description (JSON, or YAML with PyYAML installed)")
+    campaign_parser.add_argument("--workers", type=int, help="tasks run at the same time (default: CPU count)")
+    campaign_parser.add_argument("--retries", type=int, help="retries of a failed task (default 1)")
+    campaign_parser.add_argument("--store", help="results store directory (default results_py/campaigns/<name>)")
+    campaign_parser.add_argument("--dry-run", action="store_true", help="list the tasks without running them")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "campaign":
+        from src_py.campaign import run_campaign
+        try:
+            failed = run_campaign(args.file, args.workers, args.retries, args.store, args.dry_run)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"campaign {args.file}: {e}", file=sys.stderr)
+            return 2
+        return 1 if failed else 0
+
+    if args.chapter == "c5" and args.mode == "sa":
+        parser.error("the Chapter 5 model has no sensitivity analysis")
+    if args.chapter == "c5" and args.sens is not None:
+        parser.error("--sens only applies to c3 and c4")
+    if args.chapter == "c5" and args.crn:
+        parser.error("--crn only applies to c3 and c4")
+    unsupported = unsupported_outputs(args.chapter, args.mode, args.out)
+    if unsupported:
+        parser.error(f"--out {' '.join(unsupported)} is not available for {args.chapter} {args.mode} "
+                     f"(supported: {' '.join(sorted(SUPPORTED_OUTPUTS[args.chapter, args.mode]))})")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    try:
+        parse_assignments(args.set)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.cache and not (args.chapter == "c4" and args.mode in ("multi", "sa")):
+        print("--cache only applies to c4 multiple simulations and sensitivity analyses", file=sys.stderr)
+    if args.workers > 1 and not (args.chapter == "c4" and args.mode == "sa"):
+        print(f"--workers only applies to c4 sensitivity analyses; running {args.chapter} {args.mode} serially",
+              file=sys.stderr)
+
+    with contextlib.redirect_stdout(sys.stderr) if args.json else contextlib.nullcontext():
+        summary = run(args)
+
+    if args.json:
+        print(json.dumps(summary))
+    elif summary["status"] == "ok":
+        rate = summary["periods_per_second"]
+        print(f"{args.chapter} {args.mode}: {summary['replicates']} runs x {summary['periods']} periods "
+              f"in {summary['seconds']:.1f} s ({rate:.1f} periods/s), results in {summary['results']}")
+    else:
+        print(f"{args.chapter} {args.mode} failed: {summary['error']}", file=sys.stderr)
+    return 0 if summary["status"] == "ok" else 1
@@ -12,54 +12,54 @@ Python conversion of the Manager.java file.
 import os
 import sys
 import time
+import argparse
+import importlib
 
-# 确保src_py目录和项目根目录在Python路径中
-current_file_path = os.path.abspath(__file__)
-src_py_dir = os.path.dirname(current_file_path)
-root_dir = os.path.dirname(src_py_dir)
-
-# 将项目根目录添加到Python路径
-if root_dir not in sys.path:
-    sys.path.insert(0, root_dir)
-
-# 将src_py目录添加到Python路径
-if src_py_dir not in sys.path:
-    sys.path.insert(0, src_py_dir)
+# 直接运行本文件（python src_py/manager.py）时项目根目录不在路径中；
+# 推荐的运行方式是 python -m src_py.manager，此时不需要修改路径
+if not __package__:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # ================== 模拟参数设置 ==================
 
 
 # 是否显示详细信息
 VERBOSE = True
-# ==================================================
 
-# 检查模型可用性
-c3_available = False
-c4_available = False
-c5_available = True  # We'll focus only on Chapter 5 for now
-
-try:
-    from Chapter3.c3_model import C3Model
-    c3_available = True
-except ImportError:
-    c3_available = False
+# 是否记录各模拟阶段的耗时（命令行参数 --profile-phases）
+PROFILE_PHASES = False
+# 是否在每个周期结束时记录内存使用（命令行参数 --profile-memory）
+PROFILE_MEMORY = False
+# ==================================================
 
-try:
-    from Chapter4.c4_model import C4Model
-    c4_available = True
-except ImportError:
-    c4_available = False
+# 各章模型所在的模块和类名（在运行相应模拟时才导入，启动时不加载任何模型）
+MODELS = {
+    "Chapter3": ("src_py.Chapter3.c3_model", "C3Model"),
+    "Chapter4": ("src_py.Chapter4.c4_model", "C4Model"),
+    "Chapter5": ("src_py.Chapter5.c5_model", "C5Model"),
+}
 
-try:
-    from Chapter6.c5_model import C5Model
-    c5_available = True
-except ImportError:
-    c5_available = False
+def load_model(chapter):
+    """
+    导入某章的模型类
+    
+    Args:
+        chapter: "Chapter3"、"Chapter4" 或 "Chapter5"
+        
+    Returns:
+        模型类，导入失败时打印原因并返回None
+    """
+    module_name, class_name = MODELS[chapter]
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except ImportError as e:
+        print(f"{chapter}模型未实现或不可用: {e}")
+        return None
 
 def run_chapter3_single(verbose=True):
     """运行Chapter 3的计算机产业模型单次模拟"""
-    if not c3_available:
-        print("Chapter 3模型未实现或不可用")
+    C3Model = load_model("Chapter3")
+    if C3Model is None:
         return False
         
     if verbose:
@@ -67,16 +67,18 @@ def run_chapter3_single(verbose=True):
         print("结果将保存在results_py/Chapter3/目录下")
     
     model = C3Model()
+    model.phase_timer.enable(PROFILE_PHASES)
+    model.memory_tracker.enable(PROFILE_MEMORY)
     model.make_single_simulation(True)
     
     if verbose:
         print("模拟完成！")
     return True
 
-def run_chapter3_multiple(verbose=True):
-    """运行Chapter 3的计算机产业模型多次模拟"""
-    if not c3_available:
-        print("Chapter 3模型未实现或不可用")
+def run_chapter3_multiple(verbose=True, resume=False):
+    """运行Chapter 3的计算机产业模型多次模拟，resume为True时从检查点继续"""
+    C3Model = load_model("Chapter3")
+    if C3Model is None:
         return False
         
     if verbose:
@@ -84,16 +86,18 @@ def run_chapter3_multiple(verbose=True):
         print("结果将保存在results_py/Chapter3/目录下")
     
     model = C3Model()
-    model.make_multiple_simulation(True)
+    model.phase_timer.enable(PROFILE_PHASES)
+    model.memory_tracker.enable(PROFILE_MEMORY)
+    model.make_multiple_simulation(True, resume)
     
     if verbose:
         print("模拟完成！")
     return True
 
-def run_chapter3_sensitivity(verbose=True):
-    """运行Chapter 3的计算机产业模型敏感性分析"""
-    if not c3_available:
-        print("Chapter 3模型未实现或不可用")
+def run_chapter3_sensitivity(verbose=True, resume=False):
+    """运行Chapter 3的计算机产业模型敏感性分析，resume为True时跳过已完成的参数组合"""
+    C3Model = load_model("Chapter3")
+    if C3Model is None:
         return False
         
     if verbose:
@@ -101,7 +105,9 @@ def run_chapter3_sensitivity(verbose=True):
         print("结果将保存在results_py/Chapter3/目录下")
     
     model = C3Model()
-    model.make_sensitivity_simulation(True)
+    model.phase_timer.enable(PROFILE_PHASES)
+    model.memory_tracker.enable(PROFILE_MEMORY)
+    model.make_sensitivity_simulation(True, resume)
     
     if verbose:
         print("敏感性分析完成！")
@@ -109,8 +115,8 @@ def run_chapter3_sensitivity(verbose=True):
 
 def run_chapter4_single(verbose=True):
     """运行Chapter 4的半导体产业模型单次模拟"""
-    if not c4_available:
-        print("Chapter 4模型未实现或不可用")
+    C4Model = load_model("Chapter4")
+    if C4Model is None:
         return False
         
     if verbose:
@@ -118,16 +124,18 @@ def run_chapter4_single(verbose=True):
         print("结果将保存在results_py/Chapter4/目录下")
     
     model = C4Model()
+    model.phase_timer.enable(PROFILE_PHASES)
+    model.memory_tracker.enable(PROFILE_MEMORY)
     model.make_single_simulation(True)
     
     if verbose:
         print("模拟完成！")
     return True
 
-def run_chapter4_multiple( verbose=True):
-    """运行Chapter 4的半导体产业模型多次模拟"""
-    if not c4_available:
-        print("Chapter 4模型未实现或不可用")
+def run_chapter4_multiple( verbose=True, resume=False):
+    """运行Chapter 4的半导体产业模型多次模拟，resume为True时从检查点继续"""
+    C4Model = load_model("Chapter4")
+    if C4Model is None:
         return False
         
     if verbose:
@@ -135,16 +143,18 @@ def run_chapter4_multiple( verbose=True):
         print("结果将保存在results_py/Chapter4/目录下")
     
     model = C4Model()
-    model.make_multiple_simulation(True)
+    model.phase_timer.enable(PROFILE_PHASES)
+    model.memory_tracker.enable(PROFILE_MEMORY)
+    model.make_multiple_simulation(True, resume)
     
     if verbose:
         print("模拟完成！")
     return True
 
-def run_chapter4_sensitivity(verbose=True):
-    """运行Chapter 4的半导体产业模型敏感性分析"""
-    if not c4_available:
-        print("Chapter 4模型未实现或不可用")
+def run_chapter4_sensitivity(verbose=True, resume=False):
+    """运行Chapter 4的半导体产业模型敏感性分析，resume为True时跳过已完成的参数组合"""
+    C4Model = load_model("Chapter4")
+    if C4Model is None:
         return False
         
     if verbose:
@@ -153,10 +163,12 @@ def run_chapter4_sensitivity(verbose=True):
     
     try:
         model = C4Model()
+        model.phase_timer.enable(PROFILE_PHASES)
+        model.memory_tracker.enable(PROFILE_MEMORY)
         # 设置更小的iterations值用于敏感性分析
         model.multi_time = 5  # 每次敏感性分析运行5次迭代
         model.multi_sens = 2  # 只运行2次敏感性分析
-        model.make_sensitivity_simulation(True)
+        model.make_sensitivity_simulation(True, resume)
         
         if verbose:
             print("敏感性分析完成！")
@@ -169,8 +181,8 @@ def run_chapter4_sensitivity(verbose=True):
 
 def run_chapter5_single(verbose=True):
     """运行Chapter 5的药物产业模型单次模拟"""
-    if not c5_available:
-        print("Chapter 5模型未实现或不可用")
+    C5Model = load_model("Chapter5")
+    if C5Model is None:
         return False
         
     if verbose:
@@ -179,6 +191,8 @@ def run_chapter5_single(verbose=True):
     
     try:
         model = C5Model()
+        model.phase_timer.enable(PROFILE_PHASES)
+        model.memory_tracker.enable(PROFILE_MEMORY)
         # 设置较小的参数进行测试
         model.end_time = 100  # 100个时期
         model.num_of_tc = 200  # 200个治疗类别
@@ -196,10 +210,10 @@ def run_chapter5_single(verbose=True):
         traceback.print_exc()
         return False
 
-def run_chapter5_multiple( verbose=True):
-    """运行Chapter 5的药物产业模型多次模拟"""
-    if not c5_available:
-        print("Chapter 5模型未实现或不可用")
+def run_chapter5_multiple( verbose=True, resume=False):
+    """运行Chapter 5的药物产业模型多次模拟，resume为True时从检查点继续"""
+    C5Model = load_model("Chapter5")
+    if C5Model is None:
         return False
         
     if verbose:
@@ -208,12 +222,14 @@ def run_chapter5_multiple( verbose=True):
     
     try:
         model = C5Model()
+        model.phase_timer.enable(PROFILE_PHASES)
+        model.memory_tracker.enable(PROFILE_MEMORY)
         # 设置较小的参数进行测试
         model.end_time = 100  # 100个时期
         model.num_of_tc = 200  # 200个治疗类别
         model.num_of_firm = 50  # 50个潜在公司
         model.num_of_mol = 400  # 每个治疗类别400个分子
-        model.make_multiple_simulation()
+        model.make_multiple_simulation(resume)
         
         if verbose:
             print("多次模拟完成！")
@@ -235,6 +251,20 @@ def check_and_create_dirs():
 
 def main():
     """主函数，根据注释/解注释的配置运行选定的模型"""
+    parser = argparse.ArgumentParser(description="Run the History-Friendly Models")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue interrupted multiple/sensitivity simulations from their checkpoints")
+    parser.add_argument("--profile-phases", action="store_true",
+                        help="time each simulation phase and write phase_timing.csv/.json/.prof to the results directory")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help="sample memory use by model class each period and write memory_profile.csv/.json "
+                             "to the results directory")
+    args = parser.parse_args()
+    resume = args.resume
+    global PROFILE_PHASES, PROFILE_MEMORY
+    PROFILE_PHASES = args.profile_phases
+    PROFILE_MEMORY = args.profile_memory
+    
     # 确保结果目录存在
     check_and_create_dirs()
     
@@ -243,22 +273,22 @@ def main():
     # Chapter 3 模型
     # run_chapter3_single(VERBOSE)
     #
-    # run_chapter3_multiple(VERBOSE)
+    # run_chapter3_multiple(VERBOSE, resume)
     #
-    # run_chapter3_sensitivity(VERBOSE)
+    # run_chapter3_sensitivity(VERBOSE, resume)
 
     # Chapter 4 模型
     run_chapter4_single(VERBOSE)
 
-    run_chapter4_multiple(VERBOSE)
+    run_chapter4_multiple(VERBOSE, resume)
 
-    run_chapter4_sensitivity(VERBOSE)
+    run_chapter4_sensitivity(VERBOSE, resume)
 
 
     # Chapter 5 模型
     # run_chapter5_single(VERBOSE)
     #
-    # run_chapter5_multiple(VERBOSE)
+    # run_chapter5_multiple(VERBOSE, resume)
     
     return True
 